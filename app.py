@@ -1,7 +1,9 @@
-from flask import Flask, render_template, jsonify
+from flask import Flask, Response, render_template, jsonify, request, g
 from flask_cors import CORS
+import io
 import os
-import pandas as pd
+import sys
+import pyarrow.compute as pc
 
 # ===============================
 # PATH CONFIG
@@ -9,8 +11,25 @@ import pandas as pd
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 TEMPLATE_DIR = os.path.join(BASE_DIR, "frontend", "templates")
 STATIC_DIR = os.path.join(BASE_DIR, "frontend", "static")
-DATA_DIR = os.path.join(BASE_DIR, "data", "processed")
-VIS_DIR = os.path.join(DATA_DIR, "visuals")
+SCRIPTS_DIR = os.path.join(BASE_DIR, "backend", "scripts")
+
+# Shared engine modules (forest_engine, model_backends, ...) live with the
+# pipeline scripts
+sys.path.insert(0, SCRIPTS_DIR)
+
+from run_config import load_config
+
+# Serve the run selected by $GLACIER_RUN_CONFIG (default: data/processed)
+cfg = load_config(argv=[])
+DATA_DIR = cfg.processed_dir
+
+from backend.serving.predictor import PredictError, Overloaded
+from backend.serving.stats import StatsError
+from backend.serving.grid import GridError
+from backend.serving.heatmap import HeatmapError
+from charts import ChartError
+from exposure import ExposureError
+from backend.serving.releases import ReleaseManager
 
 print("🚀 Starting Flask app...")
 print("TEMPLATE_DIR:", TEMPLATE_DIR)
@@ -19,6 +38,28 @@ print("STATIC_DIR:", STATIC_DIR)
 app = Flask(__name__, template_folder=TEMPLATE_DIR, static_folder=STATIC_DIR)
 CORS(app)
 
+# Live release (14_publish_release.py): memory-mapped tables shared by all
+# worker processes, memoized aggregates, grid lookups and the melt model.
+# A newly published release is warmed in the background and swapped in.
+releases = ReleaseManager(DATA_DIR)
+
+def release():
+    """Release serving this request (the same one for the whole request)."""
+    if "release" not in g:
+        g.release = releases.current()
+    return g.release
+
+@app.after_request
+def add_data_version(response):
+    if "release" in g:
+        response.headers["X-Data-Version"] = g.release.version
+    return response
+
+@app.errorhandler(FileNotFoundError)
+def not_published(e):
+    missing = os.path.basename(e.filename) if e.filename else str(e)
+    return jsonify({"error": f"data not published: {missing}"}), 503
+
 # ===============================
 # PAGE ROUTES
 # ===============================
@@ -59,71 +100,287 @@ def flood_risk():
 # ===============================
 @app.route("/api/glaciers")
 def api_glaciers():
-    FILE = os.path.join(
-        BASE_DIR, "data", "processed", "glacier_explorer_merged.csv"
-    )
-
-    df = pd.read_csv(FILE)
+    table = release().datasets.table("glaciers")
 
     # Drop invalid geometry
-    df = df.dropna(subset=["lat", "lon"])
+    table = table.filter(pc.and_(pc.is_valid(table["lat"]), pc.is_valid(table["lon"])))
+
+    print(f"✅ Serving glaciers: {table.num_rows}")
+
+    # Arrow nulls (missing values) serialize as JSON null
+    return jsonify(table.to_pylist())
+
+# ===============================
+# MAP POINT LAYER
+# ===============================
+@app.route("/api/glaciers/points")
+def api_glacier_points():
+    # Packed typed arrays for the canvas map (backend/serving/points.py)
+    points = release().points
+    response = Response(points.payload(), mimetype="application/octet-stream")
+    response.set_etag(points.token())
+    response.headers["Cache-Control"] = "no-cache"
+    return response.make_conditional(request)
+
+@app.route("/api/glaciers/points/<int:row>")
+def api_glacier_point(row):
+    points = release().points
+    # Row numbers only mean something within the version they came from
+    version = request.args.get("v")
+    if version is not None and version != points.token():
+        return jsonify({"error": "data version changed; reload the points"}), 409
+
+    record = points.record(row)
+    if record is None:
+        return jsonify({"error": f"no glacier at row {row}"}), 404
+    return jsonify(record)
+
+# ===============================
+# PER-GLACIER TIMESERIES
+# ===============================
+def _json_series(arr):
+    return [None if v != v else round(v, 6) for v in arr.tolist()]
 
-    # 🚨 FORCE JSON-SAFE VALUES (THIS IS THE KEY FIX)
-    df = df.replace({pd.NA: None, float("nan"): None})
+@app.route("/api/glaciers/<glacier_id>/timeseries")
+def api_glacier_timeseries(glacier_id):
+    try:
+        store = release().timeseries()
+    except FileNotFoundError:
+        return jsonify({"error": "timeseries store not built; run 11_timeseries_store.py"}), 503
 
-    print(f"✅ Serving glaciers: {len(df)}")
+    series = store.get(glacier_id)
+    if series is None:
+        return jsonify({"error": f"unknown glacier_id: {glacier_id}"}), 404
 
-    return jsonify(df.to_dict(orient="records"))
+    return jsonify({
+        "glacier_id": glacier_id,
+        **{
+            name: {
+                col: arr.tolist() if col == "year" else _json_series(arr)
+                for col, arr in cols.items()
+            }
+            for name, cols in series.items()
+        },
+    })
 
 # ===============================
-# OTHER DATA APIs (SAFE)
+# OTHER DATA APIs
 # ===============================
+def records(name):
+    # A missing dataset is a 503 (not_published), not an empty list
+    return jsonify(release().datasets.table(name).to_pylist())
+
 @app.route("/api/historical_melt")
 def api_historical_melt():
-    try:
-        df = pd.read_csv(os.path.join(VIS_DIR, "historical_melt_summary.csv"))
-        return jsonify(df.to_dict(orient="records"))
-    except:
-        return jsonify([])
+    return records("historical_melt_summary")
 
 @app.route("/api/future_melt")
 def api_future_melt():
-    try:
-        df = pd.read_csv(os.path.join(VIS_DIR, "future_melt_summary.csv"))
-        return jsonify(df.to_dict(orient="records"))
-    except:
-        return jsonify([])
+    return records("future_melt_summary")
 
 @app.route("/api/flood_risk")
 def api_flood_risk():
-    try:
-        df = pd.read_csv(os.path.join(VIS_DIR, "flood_risk_summary.csv"))
-        return jsonify(df.to_dict(orient="records"))
-    except:
-        return jsonify([])
+    return records("flood_risk_summary")
 
 @app.route("/api/feature_importance")
 def api_feature_importance():
-    try:
-        df = pd.read_csv(os.path.join(DATA_DIR, "feature_importance.csv"))
-        return jsonify(df.to_dict(orient="records"))
-    except:
-        return jsonify([])
+    return records("feature_importance")
 
 @app.route("/api/basin_runoff")
 def api_basin_runoff():
-    try:
-        df = pd.read_csv(os.path.join(DATA_DIR, "basin_runoff_timeseries.csv"))
-        return jsonify(df.to_dict(orient="records"))
-    except:
-        return jsonify([])
+    return records("basin_runoff")
+
+@app.route("/api/outlet_flow")
+def api_outlet_flow():
+    return records("outlet_flow")
+
+@app.route("/api/outlet_peak_flow")
+def api_outlet_peak_flow():
+    return records("outlet_peak_flow")
+
 @app.route("/api/partial_effects")
 def api_partial_effects():
+    return records("partial_effects")
+
+# ===============================
+# AGGREGATE STATS APIs
+# ===============================
+@app.errorhandler(StatsError)
+def stats_error(e):
+    return jsonify({"error": str(e)}), 400
+
+@app.route("/api/stats/risk_counts")
+def api_risk_counts():
+    return jsonify(release().stats.risk_counts(request.args.get("col", "risk_level")))
+
+@app.route("/api/stats/histogram")
+def api_histogram():
+    col = request.args.get("col")
+    if not col:
+        raise StatsError("'col' is required")
+    return jsonify(release().stats.histogram(
+        col,
+        bins=request.args.get("bins", 20, type=int),
+        lo=request.args.get("min", type=float),
+        hi=request.args.get("max", type=float),
+    ))
+
+@app.route("/api/stats/summary")
+def api_summary():
+    return jsonify(release().stats.summary(
+        request.args.get("by", "region"),
+        request.args.get("col", "predicted_melt"),
+    ))
+
+@app.route("/api/stats/top")
+def api_top():
+    return jsonify(release().stats.top(
+        request.args.get("col", "predicted_melt"),
+        n=request.args.get("n", 10, type=int),
+        ascending=request.args.get("order", "asc") != "desc",
+    ))
+
+# ===============================
+# GRID PYRAMID (MAP CLUSTERS)
+# ===============================
+@app.errorhandler(GridError)
+def grid_error(e):
+    return jsonify({"error": str(e)}), 400
+
+@app.route("/api/grid")
+def api_grid():
+    level = request.args.get("z", type=int)
+    bbox = request.args.get("bbox", "-180,-85,180,85")
+    try:
+        west, south, east, north = (float(v) for v in bbox.split(","))
+    except ValueError:
+        raise GridError("bbox must be 'west,south,east,north'")
+    if level is None:
+        raise GridError("'z' is required")
+
+    try:
+        return jsonify(release().grid.cells(level, west, south, east, north))
+    except FileNotFoundError:
+        return jsonify({"error": "grid pyramid not built; run 13_grid_pyramid.py"}), 503
+
+@app.route("/api/grid/<int:z>/<int:x>/<int:y>")
+def api_grid_cell(z, x, y):
+    try:
+        cell = release().grid.cell(z, x, y)
+    except FileNotFoundError:
+        return jsonify({"error": "grid pyramid not built; run 13_grid_pyramid.py"}), 503
+    if cell is None:
+        return jsonify({"error": "no glaciers in this cell"}), 404
+    return jsonify(cell)
+
+# ===============================
+# HEATMAP RASTERS
+# ===============================
+@app.errorhandler(HeatmapError)
+def heatmap_error(e):
+    return jsonify({"error": str(e)}), 400
+
+@app.route("/api/heatmap")
+def api_heatmap():
+    bbox = request.args.get("bbox", "")
+    try:
+        west, south, east, north = (float(v) for v in bbox.split(","))
+    except ValueError:
+        raise HeatmapError("bbox must be 'west,south,east,north'")
+
+    raster = release().heatmap.render(
+        west, south, east, north,
+        width=request.args.get("width", 512, type=int),
+        height=request.args.get("height", 512, type=int),
+        metric=request.args.get("metric", "count"),
+        blur=request.args.get("blur", 2.0, type=float),
+        fmt=request.args.get("format", "png"),
+    )
+    response = Response(raster["data"], mimetype=raster["mimetype"])
+    response.set_etag(raster["etag"])
+    response.headers["Cache-Control"] = "no-cache"
+    # Value span of the PNG colour ramp, for the legend
+    response.headers["X-Value-Range"] = "{:g},{:g}".format(*raster["range"])
+    return response.make_conditional(request)
+
+# ===============================
+# CHARTS
+# ===============================
+@app.errorhandler(ChartError)
+def chart_error(e):
+    return jsonify({"error": str(e)}), 400
+
+@app.route("/api/charts")
+def api_charts():
+    return jsonify(release().charts.catalog())
+
+@app.route("/api/charts/<name>.png")
+def api_chart(name):
+    # ?basin= / ?scenario= / ?outlet=, &start=&end= (years); rendered on
+    # demand in the chart pool unless cached
+    png, etag = release().charts.png(name, request.args.to_dict())
+    response = Response(png, mimetype="image/png")
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "no-cache"
+    return response.make_conditional(request)
+
+# ===============================
+# LOCATION EXPOSURE
+# ===============================
+@app.errorhandler(ExposureError)
+def exposure_error(e):
+    return jsonify({"error": str(e)}), 400
+
+@app.route("/api/exposure")
+def api_exposure():
+    # Configured locations, precomputed by 11_location_exposure.py
+    return records("location_exposure")
+
+@app.route("/api/exposure", methods=["POST"])
+def api_exposure_query():
+    # Body: a locations CSV (lat, lon, any other columns), sent raw or as
+    # the multipart file field "file"
+    upload = request.files.get("file")
+    source = io.BytesIO(upload.read() if upload else request.get_data())
+    mode = request.args.get("mode", "radius")
+    radius_km = request.args.get("radius_km", 25.0, type=float)
+    k = request.args.get("k", 5, type=int)
+
+    results = release().exposure.query(source, mode, radius_km, k)
+    return jsonify({
+        "mode": mode,
+        **({"radius_km": radius_km} if mode == "radius" else {"k": k}),
+        "locations": results,
+    })
+
+# ===============================
+# WHAT-IF PREDICTION API
+# ===============================
+@app.route("/api/predict", methods=["POST"])
+def api_predict():
+    payload = request.get_json(silent=True)
+    predictor = release().predictor
     try:
-        df = pd.read_csv(os.path.join(DATA_DIR, "partial_effects.csv"))
-        return jsonify(df.to_dict(orient="records"))
-    except:
-        return jsonify([])
+        results = predictor.predict(payload)
+    except PredictError as e:
+        return jsonify({"error": str(e)}), 400
+    except Overloaded as e:
+        return jsonify({"error": str(e)}), 503
+    except FileNotFoundError as e:
+        return jsonify({"error": str(e)}), 503
+
+    return jsonify({"model": predictor.model_kind, "predictions": results})
+
+@app.route("/api/predict", methods=["GET"])
+def api_predict_stats():
+    return jsonify(release().predictor.stats())
+
+# ===============================
+# DATA VERSION
+# ===============================
+@app.route("/api/version")
+def api_version():
+    return jsonify(release().describe())
 
 # ===============================
 # RUN
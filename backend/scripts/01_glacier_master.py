@@ -1,55 +1,47 @@
-import geopandas as gpd
 import pandas as pd
+import glob
 import os
-
-RAW = "data/raw/mass_balance"
-OUT = "data/processed"
-
-WEST = os.path.join(
-    RAW,
-    "RGI2000-v7.0-I-14_south_asia_west",
-    "RGI2000-v7.0-I-14_south_asia_west.shp"
-)
-
-EAST = os.path.join(
-    RAW,
-    "RGI2000-v7.0-I-15_south_asia_east",
-    "RGI2000-v7.0-I-15_south_asia_east.shp"
-)
-
-print("Loading glacier geometries...")
-gdf = pd.concat(
-    [gpd.read_file(WEST), gpd.read_file(EAST)],
-    ignore_index=True
-)
-
-gdf.columns = gdf.columns.str.lower()
-
-# ---- AREA (projected CRS) ----
-gdf_proj = gdf.to_crs(epsg=6933)
-area_km2 = gdf_proj.geometry.area / 1e6
-
-# ---- LAT / LON (geographic CRS) ----
-gdf_ll = gdf.to_crs(epsg=4326)
-lon = gdf_ll.geometry.centroid.x
-lat = gdf_ll.geometry.centroid.y
+import time
+
+from glacier_geometry import derive_cached
+from run_config import load_config
+
+cfg = load_config()
+
+RAW = cfg.raw("mass_balance")
+CACHE_DIR = cfg.processed("cache", "geometry")
+
+# One RGI v7 outline shapefile per first-order region, e.g.
+# RGI2000-v7.0-I-14_south_asia_west/RGI2000-v7.0-I-14_south_asia_west.shp
+def region_shapefile(region):
+    matches = sorted(glob.glob(os.path.join(RAW, f"RGI2000-v7.0-I-{region}_*", "*.shp")))
+    if not matches:
+        raise FileNotFoundError(f"❌ No RGI outlines for region {region} in {RAW}")
+    return matches[0]
+
+SHAPEFILES = {r: region_shapefile(r) for r in cfg.regions}
+
+# ---- GEOMETRY (area, equal-area centroid, perimeter, bbox) ----
+# One reprojection per outline file, cached by file content
+print("Deriving glacier geometry...")
+tables = []
+for region, path in SHAPEFILES.items():
+    t0 = time.perf_counter()
+    table, cached = derive_cached(path, CACHE_DIR)
+    # RGI first-order region code ("14"), as in the glacier IDs
+    table["region"] = region
+    source = "cache" if cached else "outlines"
+    print(f"  {os.path.basename(path)}: {len(table)} glaciers from {source} "
+          f"in {time.perf_counter() - t0:.2f}s")
+    tables.append(table)
 
 # ---- FINAL TABLE ----
-glacier_master = pd.DataFrame({
-    "glacier_id": gdf["rgi_id"],
-    "lat": lat,
-    "lon": lon,
-    "area_km2": area_km2,
-    "region": "Himalayas"
-})
+glacier_master = pd.concat(tables, ignore_index=True)
+print(glacier_master["region"].value_counts().sort_index())
 
 print(glacier_master["area_km2"].describe())
 
-os.makedirs(OUT, exist_ok=True)
-glacier_master.to_csv(
-    os.path.join(OUT, "glacier_master.csv"),
-    index=False
-)
+cfg.write_table(glacier_master, "glacier_master")
 
-print("✅ glacier_master.csv created with REAL area values")
+print("✅ glacier_master created with REAL area values")
 
@@ -2,19 +2,26 @@
 02_climate_features.py
 Extract climate variables (precip, temp, solar radiation)
 from WorldClim GeoTIFFs for each glacier
+
+The 12 monthly bands are kept in a glacier × month cube
+(climate_cube.py); the per-glacier features are then computed from the
+cube chunk by chunk.
 """
 
 import os
-import pandas as pd
+import re
+import numpy as np
 import rasterio
-from rasterio.sample import sample_gen
+
+from climate_cube import CUBE_FILE, FEATURES, make_cube, write_cube, compute_features
+from run_config import load_config
+
+cfg = load_config()
 
 # -----------------------------
 # PATHS
 # -----------------------------
-RAW = "data/raw/climate"
-IN_GLACIER = "data/processed/glacier_master_with_area.csv"
-OUT = "data/processed"
+RAW = cfg.raw("climate")
 
 PREC_DIR = os.path.join(RAW, "wc2.1_2.5m_prec")
 TEMP_DIR = os.path.join(RAW, "wc2.1_2.5m_tavg")
@@ -23,7 +30,7 @@ SRAD_DIR = os.path.join(RAW, "wc2.1_2.5m_srad")
 # -----------------------------
 # LOAD GLACIERS
 # -----------------------------
-df = pd.read_csv(IN_GLACIER)
+df = cfg.read_table("glacier_master_with_area")
 
 # Rasterio expects (lon, lat)
 coords = list(zip(df["lon"], df["lat"]))
@@ -31,34 +38,54 @@ coords = list(zip(df["lon"], df["lat"]))
 # -----------------------------
 # FUNCTION TO SAMPLE RASTERS
 # -----------------------------
-def sample_mean(folder):
-    values = []
-
-    tif_files = sorted([
-        os.path.join(folder, f)
-        for f in os.listdir(folder)
-        if f.endswith(".tif")
-    ])
-
-    for tif in tif_files:
+def sample_monthly(folder):
+    """(n_glaciers, 12) float32: one column per monthly band, NaN off-raster."""
+    tif_files = {}
+    for f in os.listdir(folder):
+        match = re.search(r"_(\d{2})\.tif$", f)
+        if match:
+            tif_files[int(match.group(1))] = os.path.join(folder, f)
+
+    if sorted(tif_files) != list(range(1, 13)):
+        raise FileNotFoundError(f"❌ Expected 12 monthly bands in {folder}, found {sorted(tif_files)}")
+
+    values = np.empty((len(coords), 12), dtype=np.float32)
+    for month, tif in sorted(tif_files.items()):
         with rasterio.open(tif) as src:
-            samples = [v[0] for v in src.sample(coords)]
-            values.append(samples)
+            band = np.fromiter((v[0] for v in src.sample(coords)), dtype=np.float64, count=len(coords))
+            if src.nodata is not None:
+                band[band == src.nodata] = np.nan
+        values[:, month - 1] = band
 
-    # mean across months
-    return pd.DataFrame(values).mean().values
+    return values
 
 # -----------------------------
 # EXTRACT CLIMATE VARIABLES
 # -----------------------------
+monthly = {}
+
 print("Extracting precipitation...")
-df["prec_mean"] = sample_mean(PREC_DIR)
+monthly["prec"] = sample_monthly(PREC_DIR)
 
 print("Extracting temperature...")
-df["temp_mean"] = sample_mean(TEMP_DIR)
+monthly["temp"] = sample_monthly(TEMP_DIR)
 
 print("Extracting solar radiation...")
-df["srad_mean"] = sample_mean(SRAD_DIR)
+monthly["srad"] = sample_monthly(SRAD_DIR)
+
+# -----------------------------
+# CLIMATE CUBE
+# -----------------------------
+cube_path = write_cube(make_cube(df["glacier_id"], monthly), cfg.processed(CUBE_FILE))
+print(f"Saved climate cube: {cube_path} ({os.path.getsize(cube_path) / 1e6:.1f} MB)")
+
+# -----------------------------
+# FEATURES (CHUNK-WISE FROM THE CUBE)
+# -----------------------------
+# Same glacier order as df
+features = compute_features(cube_path)
+for name in FEATURES:
+    df[name] = features[name].to_numpy()
 
 # -----------------------------
 # CLEAN
@@ -70,19 +97,12 @@ print(f"Final glacier-climate rows: {len(df)}")
 # -----------------------------
 # SAVE
 # -----------------------------
-os.makedirs(OUT, exist_ok=True)
-
-df[[
+cfg.write_table(df[[
     "glacier_id",
     "lat",
     "lon",
     "area_km2",
-    "prec_mean",
-    "temp_mean",
-    "srad_mean"
-]].to_csv(
-    os.path.join(OUT, "climate_features.csv"),
-    index=False
-)
-
-print("✅ climate_features.csv created successfully")
+    *FEATURES
+]], "climate_features")
+
+print("✅ climate_features created successfully")
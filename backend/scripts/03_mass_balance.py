@@ -3,17 +3,19 @@ import glob
 import re
 import os
 
+from run_config import load_config
+
+cfg = load_config()
+
 # -----------------------------
 # PATHS
 # -----------------------------
-CLIMATE_FILE = "data/processed/climate_features.csv"
-WGMS_FOLDER = "data/raw/mass_balance/wgms"
-OUT_FILE = "data/processed/glacier_ml_dataset.csv"
+WGMS_FOLDER = cfg.raw("mass_balance", "wgms")
 
 # -----------------------------
 # LOAD CLIMATE
 # -----------------------------
-climate = pd.read_csv(CLIMATE_FILE)
+climate = cfg.read_table("climate_features")
 
 # 🔑 Extract REGION.NUMBER from RGI v7
 # RGI2000-v7.0-I-15-03456 → 15.03456
@@ -60,11 +62,11 @@ wgms["glacier_key"] = wgms[id_col].str.extract(r"(\d{2}\.\d+)")
 print("Sample WGMS keys:", wgms["glacier_key"].dropna().head())
 
 # -----------------------------
-# 🔥 MELT YEARS (ONLY 2000–2024)
+# 🔥 MELT YEARS (run year range, 2000–2024 by default)
 # -----------------------------
 year_cols = [
     c for c in wgms.columns
-    if c.isdigit() and 2000 <= int(c) <= 2024
+    if c.isdigit() and cfg.start_year <= int(c) <= cfg.end_year
 ]
 
 print("Selected year columns:", len(year_cols))
@@ -108,8 +110,8 @@ final.dropna(inplace=True)
 # -----------------------------
 # SAVE
 # -----------------------------
-final.to_csv(OUT_FILE, index=False)
+cfg.write_table(final, "glacier_ml_dataset")
 
-print("✅ glacier_ml_dataset.csv created")
+print("✅ glacier_ml_dataset created")
 print(final.head())
 print("Final dataset shape:", final.shape)
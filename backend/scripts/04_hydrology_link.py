@@ -4,19 +4,14 @@
 Convert glacier mass balance into hydrological runoff contribution.
 """
 
-import pandas as pd
-import os
+from run_config import load_config
 
-# -----------------------------
-# PATHS
-# -----------------------------
-IN_FILE = "data/processed/glacier_ml_dataset.csv"
-OUT_FILE = "data/processed/glacier_hydrology.csv"
+cfg = load_config()
 
 # -----------------------------
 # LOAD DATA
 # -----------------------------
-df = pd.read_csv(IN_FILE)
+df = cfg.read_table("glacier_ml_dataset")
 
 print("Loaded ML dataset:", df.shape)
 
@@ -58,7 +53,6 @@ print(final.head())
 # -----------------------------
 # SAVE
 # -----------------------------
-os.makedirs("data/processed", exist_ok=True)
-final.to_csv(OUT_FILE, index=False)
+cfg.write_table(final, "glacier_hydrology")
 
-print("✅ glacier_hydrology.csv created successfully")
+print("✅ glacier_hydrology created successfully")
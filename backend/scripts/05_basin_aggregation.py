@@ -5,20 +5,14 @@ Aggregate glacier meltwater runoff by basin / region and year.
 Converts glacier-scale melt to regional (river-basin-scale) contribution.
 """
 
-import pandas as pd
-import os
+from run_config import load_config
 
-# -----------------------------
-# PATHS
-# -----------------------------
-IN_FILE = "data/processed/glacier_hydrology.csv"
-OUT_DIR = "data/processed"
-OUT_FILE = os.path.join(OUT_DIR, "basin_runoff_timeseries.csv")
+cfg = load_config()
 
 # -----------------------------
 # LOAD DATA
 # -----------------------------
-df = pd.read_csv(IN_FILE)
+df = cfg.read_table("glacier_hydrology")
 
 print("Loaded glacier hydrology data:", df.shape)
 
@@ -69,12 +63,11 @@ basin_agg["basin_runoff_mm"] = (
 # -----------------------------
 # SAVE
 # -----------------------------
-os.makedirs(OUT_DIR, exist_ok=True)
-basin_agg.to_csv(OUT_FILE, index=False)
+cfg.write_table(basin_agg, "basin_runoff_timeseries")
 
 # -----------------------------
 # SUMMARY
 # -----------------------------
-print("✅ basin_runoff_timeseries.csv created")
+print("✅ basin_runoff_timeseries created")
 print(basin_agg.head())
 print("\nFinal basin dataset shape:", basin_agg.shape)
@@ -3,52 +3,52 @@
 Identify extreme glacier melt years using basin-scale runoff anomalies
 """
 
-import pandas as pd
-import os
+from basin_stats import basin_anomalies, classify_melt
+from run_config import load_config
+
+cfg = load_config()
 
 # -----------------------------
-# PATHS
+# BASELINE SETTINGS
 # -----------------------------
-INPUT_FILE = "data/processed/basin_runoff_timeseries.csv"
-OUT_DIR = "data/processed"
-OUT_FILE = os.path.join(OUT_DIR, "extreme_melt_years.csv")
+# None -> full-period climatology per basin
+# e.g. 10 -> trailing 10-year moving climatology per basin
+BASELINE_WINDOW = None
+BASELINE_MIN_YEARS = 3
 
 # -----------------------------
 # LOAD DATA
 # -----------------------------
-df = pd.read_csv(INPUT_FILE)
+df = cfg.read_table("basin_runoff_timeseries")
 
 print("Loaded basin runoff data:", df.shape)
+print("Basins:", df["basin"].nunique())
 
 # -----------------------------
-# LONG-TERM STATISTICS
+# PER-BASIN ANOMALIES & Z-SCORE
 # -----------------------------
-mean_runoff = df["basin_runoff_mm"].mean()
-std_runoff = df["basin_runoff_mm"].std()
+stats = basin_anomalies(
+    df,
+    "basin_runoff_mm",
+    group_col="basin",
+    time_col="year",
+    window=BASELINE_WINDOW,
+    min_periods=BASELINE_MIN_YEARS,
+)
 
-print(f"Mean basin runoff (mm): {mean_runoff:.3f}")
-print(f"Std deviation (mm): {std_runoff:.3f}")
+df["runoff_anomaly_mm"] = stats["anomaly"]
+df["z_score"] = stats["z_score"]
 
-# -----------------------------
-# ANOMALIES & Z-SCORE
-# -----------------------------
-df["runoff_anomaly_mm"] = df["basin_runoff_mm"] - mean_runoff
-df["z_score"] = df["runoff_anomaly_mm"] / std_runoff
+print(
+    "Baseline:",
+    f"{BASELINE_WINDOW}-year moving climatology" if BASELINE_WINDOW
+    else "full-period climatology"
+)
 
 # -----------------------------
 # CLASSIFY EXTREMES
 # -----------------------------
-def classify_melt(z):
-    if z >= 2:
-        return "Extreme Melt"
-    elif z >= 1:
-        return "High Melt"
-    elif z <= -1:
-        return "Low Melt"
-    else:
-        return "Normal"
-
-df["melt_category"] = df["z_score"].apply(classify_melt)
+df["melt_category"] = classify_melt(df["z_score"])
 
 # -----------------------------
 # SORT BY SEVERITY
@@ -58,11 +58,10 @@ df_sorted = df.sort_values("z_score", ascending=False)
 # -----------------------------
 # SAVE
 # -----------------------------
-os.makedirs(OUT_DIR, exist_ok=True)
-df_sorted.to_csv(OUT_FILE, index=False)
+cfg.write_table(df_sorted, "extreme_melt_years")
 
-print("✅ extreme_melt_years.csv created")
+print("✅ extreme_melt_years created")
 print("\nTop extreme melt years:")
 print(
-    df_sorted[["year", "basin_runoff_mm", "z_score", "melt_category"]].head(10)
+    df_sorted[["basin", "year", "basin_runoff_mm", "z_score", "melt_category"]].head(10)
 )
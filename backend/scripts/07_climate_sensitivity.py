@@ -4,20 +4,35 @@ Spatial climate sensitivity of glacier melt
 """
 
 import pandas as pd
-import numpy as np
-from scipy.stats import pearsonr
-import os
+import time
+
+from sensitivity_stats import (
+    correlation_matrix,
+    pearson_with_target,
+    ols,
+    grouped_ols,
+    bootstrap,
+    grouped_bootstrap,
+    percentile_ci,
+)
+
+from run_config import load_config
+
+cfg = load_config()
 
 # -----------------------------
-# PATHS
+# SETTINGS
 # -----------------------------
-INPUT_FILE = "data/processed/glacier_ml_dataset.csv"
-OUT_DIR = "data/processed"
+VARIABLES = ["temp", "prec", "srad", "area"]
+STRATA = ["rgi_region"]      # per-stratum regressions
+N_BOOTSTRAP = 2000           # 0 disables confidence intervals
+CI_LEVEL = 0.95
+N_JOBS = cfg.n_jobs
 
 # -----------------------------
 # LOAD DATA
 # -----------------------------
-df = pd.read_csv(INPUT_FILE)
+df = cfg.read_table("glacier_ml_dataset")
 print("Loaded ML dataset:", df.shape)
 
 # -----------------------------
@@ -33,26 +48,58 @@ glacier_stats = (
         area=("area_km2", "first"),
     )
     .reset_index()
+    .dropna()
 )
 
+# RGI region from the glacier ID: RGI2000-v7.0-I-15-03456 → 15
+# (IDs in another format are fitted together as "unknown")
+glacier_stats["rgi_region"] = glacier_stats["glacier_id"].str.extract(
+    r"-(\d{2})-\d+$", expand=False
+).fillna("unknown")
+
+if "basin" in df.columns:
+    basins = df.groupby("glacier_id")["basin"].first()
+    glacier_stats["basin"] = glacier_stats["glacier_id"].map(basins).fillna("unknown")
+    STRATA = STRATA + ["basin"]
+
 print("Glacier-level rows:", glacier_stats.shape)
 
+X = glacier_stats[VARIABLES].to_numpy(dtype=float)
+y = glacier_stats["mean_melt"].to_numpy(dtype=float)
+
+# -----------------------------
+# BOOTSTRAP (BATCHED RESAMPLING)
+# -----------------------------
+boot_r = boot_coef = None
+if N_BOOTSTRAP:
+    t0 = time.perf_counter()
+    boot_r, boot_coef = bootstrap(X, y, n_boot=N_BOOTSTRAP, n_jobs=N_JOBS)
+    print(f"Bootstrap: {N_BOOTSTRAP} resamples in {time.perf_counter() - t0:.2f}s")
+
 # -----------------------------
 # CORRELATION ANALYSIS
 # -----------------------------
-corrs = []
-for var in ["temp", "prec", "srad", "area"]:
-    r, p = pearsonr(glacier_stats[var], glacier_stats["mean_melt"])
-    corrs.append({
-        "variable": var,
-        "pearson_r": r,
-        "p_value": p
-    })
-
-corr_df = pd.DataFrame(corrs)
-corr_df.to_csv(
-    os.path.join(OUT_DIR, "spatial_climate_correlation.csv"),
-    index=False
+r, p = pearson_with_target(X, y)
+
+corr_df = pd.DataFrame({
+    "variable": VARIABLES,
+    "pearson_r": r,
+    "p_value": p
+})
+if boot_r is not None:
+    corr_df["ci_low"], corr_df["ci_high"] = percentile_ci(boot_r, CI_LEVEL)
+
+cfg.write_table(corr_df, "spatial_climate_correlation")
+
+matrix_cols = VARIABLES + ["mean_melt"]
+corr_matrix = pd.DataFrame(
+    correlation_matrix(glacier_stats[matrix_cols].to_numpy(dtype=float)),
+    index=matrix_cols,
+    columns=matrix_cols
+)
+cfg.write_table(
+    corr_matrix.rename_axis("variable").reset_index(),
+    "spatial_climate_correlation_matrix"
 )
 
 print("\nSpatial correlation results:")
@@ -62,32 +109,54 @@ print(corr_df)
 # MULTIPLE LINEAR REGRESSION
 # mean_melt ~ temp + prec + srad + area
 # -----------------------------
-X = glacier_stats[["temp", "prec", "srad", "area"]].values
-y = glacier_stats["mean_melt"].values
-
-# Add intercept
-X = np.column_stack([np.ones(len(X)), X])
-
-coef, _, _, _ = np.linalg.lstsq(X, y, rcond=None)
-y_pred = X @ coef
-
-# R²
-ss_res = np.sum((y - y_pred) ** 2)
-ss_tot = np.sum((y - y.mean()) ** 2)
-r2 = 1 - ss_res / ss_tot
+coef, std_err, r2 = ols(X, y)
 
 regression = pd.DataFrame({
-    "term": ["intercept", "temp", "prec", "srad", "area"],
-    "coefficient": coef
+    "term": ["intercept"] + VARIABLES,
+    "coefficient": coef,
+    "std_error": std_err
 })
 regression["R_squared"] = r2
+if boot_coef is not None:
+    regression["ci_low"], regression["ci_high"] = percentile_ci(boot_coef, CI_LEVEL)
 
-regression.to_csv(
-    os.path.join(OUT_DIR, "spatial_climate_regression.csv"),
-    index=False
-)
+cfg.write_table(regression, "spatial_climate_regression")
 
 print("\nRegression coefficients:")
 print(regression)
 
+# -----------------------------
+# STRATIFIED REGRESSION (PER REGION / BASIN)
+# Bootstrap CIs resample glaciers within each group
+# -----------------------------
+terms = ["intercept"] + VARIABLES
+strata_frames = []
+for stratum in STRATA:
+    labels, g_coef, g_r2, g_n = grouped_ols(X, y, glacier_stats[stratum])
+
+    frame = pd.DataFrame(g_coef, columns=terms)
+    frame.insert(0, "group", labels)
+    frame.insert(0, "stratum", stratum)
+    frame["n_glaciers"] = g_n
+    frame["R_squared"] = g_r2
+
+    if N_BOOTSTRAP:
+        t0 = time.perf_counter()
+        g_boot = grouped_bootstrap(
+            X, y, glacier_stats[stratum], n_boot=N_BOOTSTRAP, n_jobs=N_JOBS
+        )
+        ci_low, ci_high = percentile_ci(g_boot, CI_LEVEL)
+        for i, term in enumerate(terms):
+            frame[f"{term}_ci_low"] = ci_low[:, i]
+            frame[f"{term}_ci_high"] = ci_high[:, i]
+        print(f"Bootstrap by {stratum}: {N_BOOTSTRAP} resamples in {time.perf_counter() - t0:.2f}s")
+
+    strata_frames.append(frame)
+
+stratified = pd.concat(strata_frames, ignore_index=True)
+cfg.write_table(stratified, "spatial_climate_regression_by_group")
+
+print("\nStratified regression:")
+print(stratified)
+
 print("\n✅ Spatial climate sensitivity analysis completed")
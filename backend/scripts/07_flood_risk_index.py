@@ -1,22 +1,36 @@
 """
 07_flood_risk_index.py
 Flood risk index from glacier melt and runoff
+
+When 05_runoff_routing.py has run, the routed peak flow at the basin's
+outlets (the highest peak-flow z-score among them) enters the index too.
+
+The Monte Carlo mode (MC_DRAWS > 0) adds the probability of each risk
+level per basin-year under uncertain runoff, melt category boundaries
+and weights (flood_uncertainty.py).
 """
 
-import pandas as pd
-import os
+import time
+
+import flood_uncertainty
+from basin_stats import minmax_by_group, classify_flood_risk, MELT_CATEGORIES, FLOOD_RISK_LEVELS
+from run_config import load_config, find_table
+
+cfg = load_config()
 
 # -----------------------------
-# PATHS
+# MONTE CARLO SETTINGS
 # -----------------------------
-INPUT_FILE = "data/processed/extreme_melt_years.csv"
-OUT_DIR = "data/processed"
-OUT_FILE = os.path.join(OUT_DIR, "flood_risk_index.csv")
+MC_DRAWS = 100_000          # 0 disables the probabilities
+MC_SEED = 42
+Z_SD = 0.3                  # uncertainty of the runoff / peak z-scores
+BOUNDARY_SD = 0.25          # uncertainty of the melt category boundaries (z)
+WEIGHT_CONCENTRATION = 50   # Dirichlet concentration around the weights
 
 # -----------------------------
 # LOAD DATA
 # -----------------------------
-df = pd.read_csv(INPUT_FILE)
+df = cfg.read_table("extreme_melt_years")
 print("Loaded extreme melt years:", df.shape)
 
 print("Available columns:")
@@ -27,11 +41,8 @@ print(df.columns.tolist())
 # -----------------------------
 runoff_col = "z_score"
 
-# Normalize Z-score to 0–1
-df["runoff_norm"] = (
-    (df[runoff_col] - df[runoff_col].min()) /
-    (df[runoff_col].max() - df[runoff_col].min())
-)
+# Normalize Z-score to 0–1 within each basin
+df["runoff_norm"] = minmax_by_group(df, runoff_col, group_col="basin")
 
 # -----------------------------
 # MELT SCORE
@@ -45,40 +56,82 @@ melt_score = {
 
 df["melt_score"] = df["melt_category"].map(melt_score)
 
+# -----------------------------
+# PEAK FLOW (OPTIONAL)
+# -----------------------------
+has_peaks = find_table(cfg.processed_dir, "outlet_peak_flow", cfg.output_format) is not None
+if has_peaks:
+    peaks = cfg.read_table("outlet_peak_flow")
+    basin_peaks = (
+        peaks.groupby(["basin", "year"])
+        .agg(peak_flow_m3s=("peak_flow_m3s", "max"), peak_z_score=("peak_z_score", "max"))
+        .reset_index()
+    )
+    df = df.merge(basin_peaks, on=["basin", "year"], how="left")
+    df["peak_norm"] = minmax_by_group(df, "peak_z_score", group_col="basin")
+    print("Using routed peak flow from", peaks["outlet"].nunique(), "outlets")
+
 # -----------------------------
 # FLOOD RISK INDEX
 # -----------------------------
-df["flood_risk_index"] = (
-    0.6 * df["runoff_norm"] +
-    0.4 * df["melt_score"]
-)
+# Weights of (runoff, [peak flow,] melt score)
+weights = [0.4, 0.3, 0.3] if has_peaks else [0.6, 0.4]
+
+df["flood_risk_index"] = weights[0] * df["runoff_norm"] + weights[-1] * df["melt_score"]
+if has_peaks:
+    df["flood_risk_index"] += weights[1] * df["peak_norm"]
 
 # -----------------------------
 # CLASSIFICATION
 # -----------------------------
-def classify_risk(x):
-    if x >= 0.75:
-        return "High Risk"
-    elif x >= 0.45:
-        return "Moderate Risk"
-    else:
-        return "Low Risk"
+df["flood_risk_level"] = classify_flood_risk(df["flood_risk_index"])
+
+# -----------------------------
+# MONTE CARLO PROBABILITIES
+# -----------------------------
+prob_cols = []
+if MC_DRAWS:
+    def basin_range(col):
+        grouped = df.groupby("basin", sort=False)[col]
+        return grouped.transform("min").to_numpy(), grouped.transform("max").to_numpy()
 
-df["flood_risk_level"] = df["flood_risk_index"].apply(classify_risk)
+    t0 = time.perf_counter()
+    mc = flood_uncertainty.simulate(
+        df[runoff_col].to_numpy(),
+        basin_range(runoff_col),
+        [melt_score[c] for c in MELT_CATEGORIES],
+        weights,
+        peak_z=df["peak_z_score"].to_numpy() if has_peaks else None,
+        peak_bounds=basin_range("peak_z_score") if has_peaks else None,
+        n_draws=MC_DRAWS,
+        seed=MC_SEED,
+        z_sd=Z_SD,
+        boundary_sd=BOUNDARY_SD,
+        weight_concentration=WEIGHT_CONCENTRATION,
+    )
+    for k, level in enumerate(FLOOD_RISK_LEVELS):
+        col = "p_" + level.lower().replace(" ", "_")  # p_low_risk, ...
+        df[col] = mc["probability"][:, k]
+        prob_cols.append(col)
+    df["flood_risk_index_mean"] = mc["index_mean"]
+    df["flood_risk_index_std"] = mc["index_std"]
+    prob_cols += ["flood_risk_index_mean", "flood_risk_index_std"]
+    print(f"Monte Carlo: {MC_DRAWS} draws x {len(df)} basin-years "
+          f"in {time.perf_counter() - t0:.2f}s")
 
 # -----------------------------
 # SAVE
 # -----------------------------
-os.makedirs(OUT_DIR, exist_ok=True)
-
-df[[
+cfg.write_table(df[[
     "basin",
     "year",
     "melt_category",
     "z_score",
+    *(["peak_flow_m3s", "peak_z_score"] if has_peaks else []),
     "flood_risk_index",
-    "flood_risk_level"
-]].to_csv(OUT_FILE, index=False)
+    "flood_risk_level",
+    *prob_cols
+]], "flood_risk_index")
 
 print("✅ Flood risk index created successfully")
-print(df[["year", "flood_risk_level"]].head())
+print(df[["basin", "year", "flood_risk_level"]].head())
@@ -1,49 +1,64 @@
 """
 07_trend_analysis.py
 Long-term glacier runoff trend analysis (2000–2024)
+
+Per-glacier trends (mass change) and per-basin trends (basin runoff),
+fitted for every series at once with batched least squares,
+Sen's slope and the Mann–Kendall test.
 """
 
-import pandas as pd
-import numpy as np
-import os
+import time
 
-# -----------------------------
-# PATHS
-# -----------------------------
-INPUT_FILE = "data/processed/basin_runoff_timeseries.csv"
-OUT_DIR = "data/processed"
-OUT_FILE = os.path.join(OUT_DIR, "glacier_runoff_trend.csv")
+from trend_stats import trend_table
+from run_config import load_config
+
+cfg = load_config()
 
 # -----------------------------
 # LOAD DATA
 # -----------------------------
-df = pd.read_csv(INPUT_FILE)
-print("Loaded basin runoff data:", df.shape)
+basin = cfg.read_table("basin_runoff_timeseries")
+print("Loaded basin runoff data:", basin.shape)
+
+glaciers = cfg.read_table(
+    "glacier_hydrology", columns=["glacier_id", "year", "mass_change"]
+)
+print("Loaded glacier hydrology data:", glaciers.shape)
 
 # -----------------------------
-# LINEAR TREND (runoff vs year)
+# BASIN TRENDS (runoff vs year)
 # -----------------------------
-years = df["year"].values
-runoff = df["basin_runoff_mm"].values
+trend_df = trend_table(basin, "basin", "year", "basin_runoff_mm")
+trend_df = trend_df.rename(columns={
+    "slope_per_year": "runoff_trend_mm_per_year",
+    "sen_slope_per_year": "runoff_sen_slope_mm_per_year",
+})
 
-# Linear regression (1st order poly)
-slope, intercept = np.polyfit(years, runoff, 1)
-
-trend_type = "Increasing" if slope > 0 else "Decreasing"
+# -----------------------------
+# GLACIER TRENDS (mass change vs year)
+# -----------------------------
+t0 = time.perf_counter()
+glacier_trends = trend_table(glaciers, "glacier_id", "year", "mass_change")
+glacier_trends = glacier_trends.rename(columns={
+    "slope_per_year": "mass_change_trend_per_year",
+    "sen_slope_per_year": "mass_change_sen_slope_per_year",
+})
+print(
+    f"Fitted {len(glacier_trends)} glacier series "
+    f"in {time.perf_counter() - t0:.2f}s"
+)
 
 # -----------------------------
 # SAVE RESULT
 # -----------------------------
-trend_df = pd.DataFrame([{
-    "basin": df["basin"].iloc[0],
-    "start_year": years.min(),
-    "end_year": years.max(),
-    "runoff_trend_mm_per_year": slope,
-    "trend_type": trend_type
-}])
-
-os.makedirs(OUT_DIR, exist_ok=True)
-trend_df.to_csv(OUT_FILE, index=False)
+cfg.write_table(trend_df, "glacier_runoff_trend")
+cfg.write_table(glacier_trends, "glacier_trends")
 
 print("✅ Glacier runoff trend analysis completed")
-print(trend_df)
+print(trend_df[[
+    "basin", "start_year", "end_year",
+    "runoff_trend_mm_per_year", "mk_p_value", "trend_type"
+]])
+print("\nGlacier trend summary:")
+print(glacier_trends["trend_type"].value_counts())
+print("Significant (MK p < 0.05):", int(glacier_trends["significant"].sum()))
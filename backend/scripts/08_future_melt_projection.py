@@ -1,51 +1,105 @@
 """
 08_future_melt_projection.py
 Project future glacier melt using ML regression
+
+One projection per configured scenario (run_config.SCENARIOS), stacked
+with a `scenario` column. With the forest backend every row also gets
+the spread of the per-tree predictions (predicted_melt_std) and their
+quantiles (predicted_melt_p05, _p50, _p95), from the same pass over the
+trees as the mean.
+
+With "geometry_mode": "dynamic" in the run configuration glaciers
+retreat as they melt: year by year, every glacier of every scenario is
+scored at once, its volume and area are updated by volume–area scaling
+(glacier_dynamics.py) and the new area is the next year's area_km2
+feature. The table then also has volume_km3, and area_km2 is each
+year's area rather than the baseline one, which changes predicted_melt
+and the risk levels derived from it. The default "static" mode keeps
+the baseline area every year.
 """
 
 import pandas as pd
 import numpy as np
 import os
-from sklearn.ensemble import RandomForestRegressor
-from sklearn.model_selection import train_test_split
+import time
+
+import forest_engine
+import glacier_dynamics
+from model_backends import BACKENDS, DEFAULT_BACKEND, make_model
+from model_selection import load_selected_model
+from run_config import load_config
+
+cfg = load_config()
 
 # -----------------------------
 # PATHS
 # -----------------------------
-INPUT_FILE = "data/processed/glacier_ml_dataset.csv"
-OUT_DIR = "data/processed"
-OUT_FILE = os.path.join(OUT_DIR, "future_melt_projection.csv")
+SELECTION_FILE = cfg.processed("model_selection.json")
+MODEL_DIR = cfg.processed("models")
+MODEL_FILE = os.path.join(MODEL_DIR, "melt_model.joblib")
+PACKED_FOREST_FILE = os.path.join(MODEL_DIR, "melt_forest.npz")
+
+FEATURES = ["area_km2", "temp_mean", "prec_mean", "srad_mean"]
+
+# Backend used when 08_model_evaluation.py has not been run
+MODEL_BACKEND = DEFAULT_BACKEND
+
+# Quantiles of the per-tree predictions (forest backend); () disables
+INTERVAL_QUANTILES = forest_engine.DEFAULT_QUANTILES
+
+# "static" (default) or "dynamic" (run_config.GEOMETRY_MODES)
+GEOMETRY_MODE = cfg.geometry_mode
 
 # -----------------------------
 # LOAD DATA
 # -----------------------------
-df = pd.read_csv(INPUT_FILE)
+df = cfg.read_table("glacier_ml_dataset")
 print("Loaded ML dataset:", df.shape)
 
 # -----------------------------
-# TRAINING DATA (2000–2024)
+# TRAINING DATA (observed years, 2000–2024 by default)
 # -----------------------------
-train = df[(df["year"] >= 2000) & (df["year"] <= 2024)].copy()
+train = df[(df["year"] >= cfg.start_year) & (df["year"] <= cfg.end_year)].copy()
 
-X = train[["area_km2", "temp_mean", "prec_mean", "srad_mean"]]
+X = train[FEATURES]
 y = train["mass_change"]
 
 # -----------------------------
 # TRAIN MODEL
 # -----------------------------
-model = RandomForestRegressor(
-    n_estimators=200,
-    random_state=42,
-    n_jobs=-1
-)
+# Backend / hyperparameters chosen by 08_model_evaluation.py (if it has been run)
+backend, params = load_selected_model(SELECTION_FILE, MODEL_BACKEND)
+if "n_jobs" in BACKENDS[backend].defaults:
+    params = {**params, "n_jobs": cfg.n_jobs}
+
+model = make_model(backend, **params)
+print("Model:", backend, model.params)
+
 model.fit(X, y)
 
 print("✅ Model trained")
 
 # -----------------------------
-# FUTURE SCENARIOS (2025–2040)
+# COMPILED INFERENCE (FOREST BACKEND)
+# -----------------------------
+# Flatten the forest into arrays for the Numba engine, check it against
+# sklearn on a training sample, and persist both forms
+os.makedirs(MODEL_DIR, exist_ok=True)
+
+if hasattr(model, "compile"):
+    exact, diff = model.compile(X.iloc[:5000], FEATURES)
+    print(f"Packed forest check: bit-exact={exact}, max |diff|={diff:.3g}")
+    forest_engine.save_packed(PACKED_FOREST_FILE, model.packed)
+elif os.path.exists(PACKED_FOREST_FILE):
+    # Stale forest from an earlier run would shadow the new backend in the API
+    os.remove(PACKED_FOREST_FILE)
+
+model.save(MODEL_FILE)
+
+# -----------------------------
+# FUTURE SCENARIOS (2025–2040 by default)
 # -----------------------------
-future_years = list(range(2025, 2041))
+future_years = list(range(cfg.projection_start, cfg.projection_end + 1))
 
 # Baseline glacier-level climate (latest observed)
 baseline = (
@@ -59,31 +113,99 @@ baseline = (
     .reset_index()
 )
 
-projections = []
+# All glacier-years of a scenario in one frame (year-major)
+n_glaciers = len(baseline)
+years = np.repeat(future_years, n_glaciers)
+dt = years - cfg.end_year
 
-for year in future_years:
-    temp_inc = 0.04 * (year - 2024)   # +0.04°C per year
-    prec_inc = 0.002 * (year - 2024)  # +0.2% per year
-    srad_inc = 0.001 * (year - 2024)
+frames = []
+for scenario in cfg.scenarios:
+    rates = cfg.scenario_table[scenario]
 
-    future = baseline.copy()
-    future["year"] = year
-    future["temp_mean"] += temp_inc
-    future["prec_mean"] *= (1 + prec_inc)
-    future["srad_mean"] *= (1 + srad_inc)
+    frame = baseline.iloc[np.tile(np.arange(n_glaciers), len(future_years))]
+    frame = frame.reset_index(drop=True)
+    frame["year"] = years
 
-    X_future = future[["area_km2", "temp_mean", "prec_mean", "srad_mean"]]
-    future["predicted_melt"] = model.predict(X_future)
+    # Baseline: +0.04°C, +0.2% precipitation, +0.1% radiation per year
+    frame["temp_mean"] += rates["temp_per_year"] * dt
+    frame["prec_mean"] *= (1 + rates["prec_per_year"] * dt)
+    frame["srad_mean"] *= (1 + rates["srad_per_year"] * dt)
+    frame["scenario"] = scenario
+    frames.append(frame)
 
-    projections.append(future)
+future_df = pd.concat(frames, ignore_index=True)
 
 # -----------------------------
-# COMBINE & SAVE
+# SCORE
 # -----------------------------
-future_df = pd.concat(projections, ignore_index=True)
+intervals = bool(INTERVAL_QUANTILES) and getattr(model, "packed", None) is not None
+if INTERVAL_QUANTILES and not intervals:
+    print(f"⚠️ No prediction intervals: {backend} has no per-tree outputs")
+
+
+def score(X):
+    """{column: values} of predicted_melt (and its interval) for feature rows X."""
+    if not intervals:
+        return {"predicted_melt": model.predict(X)}
+    out = forest_engine.predict_intervals(model.packed, X, INTERVAL_QUANTILES)
+    cols = {"predicted_melt": out["mean"], "predicted_melt_std": out["std"]}
+    for name, values in zip(forest_engine.quantile_names(INTERVAL_QUANTILES), out["quantiles"]):
+        cols[f"predicted_melt_{name}"] = values
+    return cols
+
+
+t0 = time.perf_counter()
+X = future_df[FEATURES].to_numpy(dtype=np.float64)
+
+if GEOMETRY_MODE == "static":
+    # Every scenario scored in one call
+    for col, values in score(X).items():
+        future_df[col] = values
+else:
+    # Rows of one projection year across all scenarios (frames are
+    # scenario-major, year-major within a scenario)
+    n_years = len(future_years)
+    first_year = (
+        np.arange(len(cfg.scenarios))[:, None] * (n_years * n_glaciers)
+        + np.arange(n_glaciers)[None, :]
+    ).ravel()
+
+    area = X[first_year, FEATURES.index("area_km2")]
+    volume = glacier_dynamics.volume_from_area(area)
+    volumes = np.empty(len(X))
+    out = {}
+    for k in range(n_years):
+        rows = first_year + k * n_glaciers
+        X[rows, FEATURES.index("area_km2")] = area
+        volumes[rows] = volume
+        cols = score(X[rows])
+        for col, values in cols.items():
+            out.setdefault(col, np.empty(len(X)))[rows] = values
+        area, volume = glacier_dynamics.step(area, volume, cols["predicted_melt"])
+
+    future_df["area_km2"] = X[:, FEATURES.index("area_km2")]
+    future_df["volume_km3"] = volumes
+    for col, values in out.items():
+        future_df[col] = values
+
+    # Area at the start of the last projection year vs baseline
+    start = future_df["year"] == future_years[0]
+    end = future_df["year"] == future_years[-1]
+    for scenario in cfg.scenarios:
+        s = future_df["scenario"] == scenario
+        a0 = future_df.loc[s & start, "area_km2"].sum()
+        a1 = future_df.loc[s & end, "area_km2"].sum()
+        gone = (future_df.loc[s & end, "area_km2"] == 0).sum()
+        print(f"{scenario}: total area {a0:.0f} -> {a1:.0f} km² "
+              f"({(a1 / a0 - 1) if a0 else 0:+.1%}), {gone} glaciers vanished")
+
+print(f"Scored {len(future_df)} glacier-years ({GEOMETRY_MODE} geometry) "
+      f"in {time.perf_counter() - t0:.2f}s")
 
-os.makedirs(OUT_DIR, exist_ok=True)
-future_df.to_csv(OUT_FILE, index=False)
+# -----------------------------
+# SAVE
+# -----------------------------
+cfg.write_table(future_df, "future_melt_projection")
 
 print("✅ Future melt projection created")
 print("Years:", future_df["year"].min(), "-", future_df["year"].max())
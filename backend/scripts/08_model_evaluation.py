@@ -0,0 +1,147 @@
+"""
+08_model_evaluation.py
+Spatially grouped cross-validation and hyperparameter search for the
+melt model. Run before 08_future_melt_projection.py / 10_explainable_ai.py,
+which pick up the selected configuration.
+"""
+
+import pandas as pd
+import numpy as np
+import json
+import time
+
+from model_backends import DEFAULT_BACKEND
+from model_selection import (
+    FEATURES,
+    TARGET,
+    spatial_groups,
+    fold_ids,
+    successive_halving,
+    select_cheapest,
+)
+
+from run_config import load_config
+
+cfg = load_config()
+
+# -----------------------------
+# PATHS
+# -----------------------------
+SELECTION_FILE = cfg.processed("model_selection.json")
+
+# -----------------------------
+# SETTINGS
+# -----------------------------
+BACKEND = DEFAULT_BACKEND    # see model_backends.BACKENDS
+N_FOLDS = 5
+SPATIAL_BLOCK_DEG = 1.0      # None -> group by glacier only
+MAX_TRAIN_GLACIERS = 5000    # glaciers sampled for the search (None = all)
+TARGET_R2 = None             # None -> within TOLERANCE of the best config
+TOLERANCE = 0.01
+ETA = 3
+N_JOBS = cfg.n_jobs
+SEED = 42
+
+PARAM_GRIDS = {
+    "random_forest": {
+        "n_estimators": [25, 50, 100, 200],
+        "max_depth": [8, 16, None],
+        "min_samples_leaf": [1, 5, 20],
+        "max_features": [1.0, 0.5],
+    },
+    "hist_gradient_boosting": {
+        "max_iter": [50, 100, 200],
+        "max_leaf_nodes": [15, 31, 63],
+        "learning_rate": [0.05, 0.1],
+        "min_samples_leaf": [20, 100],
+    },
+    "linear": {
+        "alpha": [0.1, 1.0, 10.0],
+    },
+}
+
+# -----------------------------
+# LOAD DATA
+# -----------------------------
+df = cfg.read_table("glacier_ml_dataset")
+print("Loaded ML dataset:", df.shape)
+
+if MAX_TRAIN_GLACIERS:
+    ids = df["glacier_id"].unique()
+    if len(ids) > MAX_TRAIN_GLACIERS:
+        rng = np.random.default_rng(SEED)
+        keep = rng.choice(ids, MAX_TRAIN_GLACIERS, replace=False)
+        df = df[df["glacier_id"].isin(keep)]
+        print("Sampled glaciers for search:", MAX_TRAIN_GLACIERS, "→ rows", len(df))
+
+# -----------------------------
+# SPATIAL GROUPS
+# -----------------------------
+groups = pd.factorize(df["glacier_id"])[0]
+group_kind = "glacier"
+
+coords = None
+if SPATIAL_BLOCK_DEG:
+    try:
+        coords = cfg.read_table("climate_features", columns=["glacier_id", "lat", "lon"])
+    except FileNotFoundError:
+        pass
+
+if coords is not None:
+    coords = coords.drop_duplicates("glacier_id").set_index("glacier_id")
+    lat = df["glacier_id"].map(coords["lat"])
+    lon = df["glacier_id"].map(coords["lon"])
+
+    if lat.notna().all() and lon.notna().all():
+        blocks = spatial_groups(lat, lon, SPATIAL_BLOCK_DEG)
+        if len(np.unique(blocks)) >= N_FOLDS:
+            groups = blocks
+            group_kind = f"{SPATIAL_BLOCK_DEG}° spatial block"
+
+folds = fold_ids(groups, N_FOLDS)
+print(f"CV: {folds.max() + 1} folds grouped by {group_kind} ({len(np.unique(groups))} groups)")
+
+X = df[FEATURES].to_numpy(dtype=np.float64)
+y = df[TARGET].to_numpy(dtype=np.float64)
+
+# -----------------------------
+# SEARCH
+# -----------------------------
+t0 = time.perf_counter()
+results = successive_halving(
+    X,
+    y,
+    folds,
+    PARAM_GRIDS[BACKEND],
+    backend=BACKEND,
+    eta=ETA,
+    tolerance=TOLERANCE,
+    n_jobs=N_JOBS,
+    seed=SEED,
+)
+print(f"Search finished in {time.perf_counter() - t0:.1f}s")
+
+params, target, best = select_cheapest(results, TARGET_R2, TOLERANCE)
+
+# -----------------------------
+# SAVE
+# -----------------------------
+cfg.write_table(results, "model_evaluation")
+
+with open(SELECTION_FILE, "w") as f:
+    json.dump({
+        "model": BACKEND,
+        "params": params,
+        "target_r2": target,
+        "cv_mean_r2": float(best["mean_r2"]),
+        "cv_std_r2": float(best["std_r2"]),
+        "cv_mean_rmse": float(best["mean_rmse"]),
+        "n_nodes": int(best["n_nodes"]),
+        "cv_groups": group_kind,
+        "n_folds": int(folds.max() + 1),
+    }, f, indent=2)
+
+print("\nTop configurations:")
+print(results[["params", "folds_evaluated", "mean_r2", "std_r2", "n_nodes"]].head(10))
+print(f"\n✅ Selected cheapest {BACKEND} model reaching R² ≥", round(target, 4))
+print(params)
@@ -1,38 +1,34 @@
 """
 09_visualization.py
-Generate plots and summary outputs for dashboard & evaluation
+Generate summary outputs for the dashboard
+
+The figures themselves are rendered on demand from the published
+datasets (charts.py, /api/charts/<name>.png) and pre-rendered in bulk by
+13_render_charts.py.
 """
 
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
-import os
-
-# -----------------------------
-# PATHS
-# -----------------------------
-DATA_DIR = "data/processed"
-OUT_DIR = "data/processed/visuals"
 
-ML_FILE = os.path.join(DATA_DIR, "glacier_ml_dataset.csv")
-FUTURE_FILE = os.path.join(DATA_DIR, "future_melt_projection.csv")
-FLOOD_FILE = os.path.join(DATA_DIR, "flood_risk_index.csv")
+from run_config import load_config
 
-os.makedirs(OUT_DIR, exist_ok=True)
+cfg = load_config()
 
 # -----------------------------
 # LOAD DATA
 # -----------------------------
-ml = pd.read_csv(ML_FILE)
-future = pd.read_csv(FUTURE_FILE)
-flood = pd.read_csv(FLOOD_FILE)
+ml = cfg.read_table("glacier_ml_dataset")
+future = cfg.read_table("future_melt_projection")
+flood = cfg.read_table("flood_risk_index")
 
 print("ML data:", ml.shape)
 print("Future data:", future.shape)
 print("Flood data:", flood.shape)
 
+if "scenario" not in future.columns:
+    future["scenario"] = cfg.primary_scenario
+
 # -----------------------------
-# 1️⃣ HISTORICAL MELT TREND (2000–2024)
+# 1️⃣ HISTORICAL MELT TREND
 # -----------------------------
 hist_trend = (
     ml.groupby("year")["mass_change"]
@@ -40,84 +36,35 @@ hist_trend = (
     .reset_index()
 )
 
-plt.figure()
-plt.plot(hist_trend["year"], hist_trend["mass_change"])
-plt.xlabel("Year")
-plt.ylabel("Mean Mass Change")
-plt.title("Historical Glacier Melt Trend (2000–2024)")
-plt.grid(True)
-
-plt.savefig(os.path.join(OUT_DIR, "historical_melt_trend.png"))
-plt.close()
-
-print("✅ Historical melt trend saved")
-
 # -----------------------------
-# 2️⃣ FUTURE MELT PROJECTION (2025–2040)
+# 2️⃣ FUTURE MELT PROJECTION
 # -----------------------------
+# Every scenario: mean melt (and its interval bounds) per year, and the
+# glacier area and volume left where 08 evolved the geometry
+melt_cols = [c for c in future.columns if c.startswith("predicted_melt")]
+scenarios = future.groupby(["scenario", "year"])[melt_cols].mean()
+for col in ("area_km2", "volume_km3"):
+    if col in future.columns:
+        scenarios[col] = future.groupby(["scenario", "year"])[col].sum(min_count=1)
+scenarios = scenarios.reset_index()
+
+# The dashboard shows the primary scenario only
 future_trend = (
-    future.groupby("year")["predicted_melt"]
+    future[future["scenario"] == cfg.primary_scenario]
+    .groupby("year")["predicted_melt"]
     .mean()
     .reset_index()
 )
 
-plt.figure()
-plt.plot(future_trend["year"], future_trend["predicted_melt"], color="red")
-
-plt.xlabel("Year")
-plt.ylabel("Predicted Melt")
-plt.title("Projected Glacier Melt (2025–2040)")
-plt.grid(True)
-
-# 🔴 ADD THIS PART HERE
-plt.yticks(
-    [-0.26, -0.255, -0.25, -0.245, -0.24],
-    ["-0.26", "-0.255", "-0.25", "-0.245", "-0.24"]
-)
-plt.gca().invert_yaxis()
-# 🔴 END HERE
-
-plt.savefig(os.path.join(OUT_DIR, "future_melt_projection.png"))
-plt.close()
-
-
-
-# -----------------------------
-# 3️⃣ FLOOD RISK DISTRIBUTION
-# -----------------------------
-plt.figure()
-sns.countplot(
-    data=flood,
-    x="flood_risk_level",
-    order=["Low Risk", "Moderate Risk", "High Risk"]
-)
-plt.title("Flood Risk Distribution (2000–2024)")
-plt.xlabel("Flood Risk Level")
-plt.ylabel("Number of Basin-Years")
-
-plt.savefig(os.path.join(OUT_DIR, "flood_risk_distribution.png"))
-plt.close()
-
-print("✅ Flood risk distribution saved")
-
 # -----------------------------
-# 4️⃣ SUMMARY CSVs FOR DASHBOARD
+# 3️⃣ SUMMARY TABLES FOR DASHBOARD
 # -----------------------------
-hist_trend.to_csv(
-    os.path.join(OUT_DIR, "historical_melt_summary.csv"),
-    index=False
-)
-
-future_trend.to_csv(
-    os.path.join(OUT_DIR, "future_melt_summary.csv"),
-    index=False
-)
-
-flood.to_csv(
-    os.path.join(OUT_DIR, "flood_risk_summary.csv"),
-    index=False
-)
+cfg.write_table(hist_trend, "visuals/historical_melt_summary")
+cfg.write_table(future_trend, "visuals/future_melt_summary")
+cfg.write_table(scenarios, "visuals/future_melt_scenarios")
+cfg.write_table(flood, "visuals/flood_risk_summary")
 
-print("✅ Dashboard summary CSVs saved")
+print("✅ Dashboard summary tables saved")
+print(pd.pivot_table(scenarios, index="year", columns="scenario", values="predicted_melt").round(3).tail())
 
 print("\n🎉 Visualization pipeline completed successfully")
@@ -5,23 +5,25 @@ Explainable AI analysis for glacier melt drivers
 
 import pandas as pd
 import numpy as np
-import os
-from sklearn.ensemble import RandomForestRegressor
-from sklearn.model_selection import train_test_split
+
+from model_backends import BACKENDS, DEFAULT_BACKEND, make_model
+from model_selection import load_selected_model
+from run_config import load_config
+
+cfg = load_config()
 
 # -----------------------------
 # PATHS
 # -----------------------------
-INPUT_FILE = "data/processed/glacier_ml_dataset.csv"
-OUT_DIR = "data/processed"
+SELECTION_FILE = cfg.processed("model_selection.json")
 
-FEATURE_IMPORTANCE_FILE = os.path.join(OUT_DIR, "feature_importance.csv")
-PARTIAL_EFFECT_FILE = os.path.join(OUT_DIR, "partial_effects.csv")
+# Backend used when 08_model_evaluation.py has not been run
+MODEL_BACKEND = DEFAULT_BACKEND
 
 # -----------------------------
 # LOAD DATA
 # -----------------------------
-df = pd.read_csv(INPUT_FILE)
+df = cfg.read_table("glacier_ml_dataset")
 print("Loaded ML dataset:", df.shape)
 
 # -----------------------------
@@ -36,12 +38,12 @@ y = df[target]
 # -----------------------------
 # TRAIN MODEL
 # -----------------------------
-model = RandomForestRegressor(
-    n_estimators=200,
-    random_state=42,
-    n_jobs=-1
-)
+# Backend / hyperparameters chosen by 08_model_evaluation.py (if it has been run)
+backend, params = load_selected_model(SELECTION_FILE, MODEL_BACKEND)
+if "n_jobs" in BACKENDS[backend].defaults:
+    params = {**params, "n_jobs": cfg.n_jobs}
 
+model = make_model(backend, **params)
 model.fit(X, y)
 print("✅ Model trained for explainability")
 
@@ -50,10 +52,10 @@ print("✅ Model trained for explainability")
 # -----------------------------
 importance = pd.DataFrame({
     "feature": features,
-    "importance": model.feature_importances_
+    "importance": model.explain(X, y)
 }).sort_values("importance", ascending=False)
 
-importance.to_csv(FEATURE_IMPORTANCE_FILE, index=False)
+cfg.write_table(importance, "feature_importance")
 
 print("\nFeature importance:")
 print(importance)
@@ -84,7 +86,7 @@ for feature in features:
         })
 
 effects_df = pd.DataFrame(effects)
-effects_df.to_csv(PARTIAL_EFFECT_FILE, index=False)
+cfg.write_table(effects_df, "partial_effects")
 
 print("\n✅ Partial effects saved")
 
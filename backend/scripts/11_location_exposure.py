@@ -0,0 +1,87 @@
+"""
+11_location_exposure.py
+Glacier exposure of settlements and infrastructure
+
+For every location of LOCATIONS_FILE (a CSV with lat, lon and any
+descriptive columns: villages, hydropower sites, ...) counts the
+glaciers of glacier_explorer_merged within RADIUS_KM, or takes its
+K_NEAREST glaciers, by risk level and summarizes their predicted melt
+(exposure.py). All locations are answered in one batched query.
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+import exposure
+from run_config import load_config
+
+cfg = load_config()
+
+# -----------------------------
+# SETTINGS
+# -----------------------------
+LOCATIONS_FILE = cfg.raw("locations.csv")
+MODE = "radius"     # "radius" (glaciers within RADIUS_KM) | "knn" (K_NEAREST glaciers)
+RADIUS_KM = 25.0
+K_NEAREST = 5
+
+if MODE not in ("radius", "knn"):
+    raise SystemExit(f"❌ Unknown MODE: {MODE}")
+
+if not os.path.exists(LOCATIONS_FILE):
+    print(f"⚠️ {LOCATIONS_FILE} not found; no location exposure to compute")
+    sys.exit(0)
+
+# -----------------------------
+# LOAD DATA
+# -----------------------------
+locations, lat, lon = exposure.read_locations(LOCATIONS_FILE)
+print("Loaded locations:", locations.num_rows)
+
+glaciers = cfg.read_table(
+    "glacier_explorer_merged",
+    columns=["glacier_id", "lat", "lon", "predicted_melt", "risk_level"],
+)
+glaciers = glaciers.dropna(subset=["lat", "lon"]).reset_index(drop=True)
+print("Loaded glaciers:", glaciers.shape)
+
+# -----------------------------
+# QUERY
+# -----------------------------
+t0 = time.perf_counter()
+index = exposure.ExposureIndex(glaciers["lat"].to_numpy(), glaciers["lon"].to_numpy())
+t1 = time.perf_counter()
+
+if MODE == "radius":
+    loc, glacier, dist = index.within(lat, lon, RADIUS_KM)
+else:
+    loc, glacier, dist = index.nearest(lat, lon, K_NEAREST)
+t2 = time.perf_counter()
+
+summary = exposure.summarize(
+    locations.num_rows, loc, glacier, dist,
+    exposure.risk_codes(glaciers["risk_level"]),
+    glaciers["predicted_melt"].to_numpy(dtype=np.float64),
+    glaciers["glacier_id"].to_numpy(),
+)
+print(f"Index built in {(t1 - t0) * 1000:.0f} ms; {len(loc)} location-glacier pairs "
+      f"in {(t2 - t1) * 1000:.0f} ms")
+
+# -----------------------------
+# SAVE
+# -----------------------------
+df = locations.to_pandas()
+df["mode"] = MODE
+df["radius_km"] = RADIUS_KM if MODE == "radius" else np.nan
+df["k"] = pd.array([K_NEAREST if MODE == "knn" else None] * len(df), dtype="Int64")
+for col, values in summary.items():
+    df[col] = values
+
+cfg.write_table(df, "location_exposure")
+
+print("✅ location_exposure created")
+print(df.sort_values(["n_high_risk", "n_glaciers"], ascending=False).head(10))
@@ -0,0 +1,66 @@
+"""
+11_timeseries_store.py
+Per-glacier timeseries store for the API
+
+Packs every glacier's historical mass change and runoff and its
+projected melt (primary scenario of the run configuration) into a memory-mapped store
+(timeseries_store.py), served by /api/glaciers/<id>/timeseries.
+"""
+
+import time
+
+from timeseries_store import build_store, publish_version, TimeseriesStore
+from run_config import load_config
+
+cfg = load_config()
+
+# -----------------------------
+# PATHS
+# -----------------------------
+OUT_DIR = cfg.processed("timeseries")
+
+HISTORY_COLUMNS = ["mass_change", "runoff_mm"]
+PROJECTION_COLUMNS = ["predicted_melt"]
+
+# -----------------------------
+# LOAD DATA
+# -----------------------------
+history = cfg.read_table(
+    "glacier_hydrology", columns=["glacier_id", "year"] + HISTORY_COLUMNS
+)
+print("Loaded glacier hydrology:", history.shape)
+
+projection = cfg.read_table("future_melt_projection")
+if "scenario" in projection.columns:
+    projection = projection[projection["scenario"] == cfg.primary_scenario]
+# Prediction interval and glacier size, when 08_future_melt_projection.py
+# computed them (forest backend, dynamic geometry)
+PROJECTION_COLUMNS += [c for c in projection.columns if c.startswith("predicted_melt_p")]
+if "volume_km3" in projection.columns:
+    PROJECTION_COLUMNS += ["area_km2", "volume_km3"]
+projection = projection[["glacier_id", "year"] + PROJECTION_COLUMNS]
+print("Loaded melt projection:", projection.shape)
+
+# -----------------------------
+# BUILD STORE
+# -----------------------------
+# Built into a new version directory and switched to through the CURRENT
+# pointer, so a running server (or a crash mid-build) never leaves it
+# without a complete store
+t0 = time.perf_counter()
+store_dir, n = publish_version(OUT_DIR, lambda path: build_store(path, {
+    "history": (history, HISTORY_COLUMNS),
+    "projection": (projection, PROJECTION_COLUMNS),
+}))
+
+print(f"✅ Timeseries store for {n} glaciers built in {time.perf_counter() - t0:.2f}s")
+
+# -----------------------------
+# SPOT CHECK
+# -----------------------------
+store = TimeseriesStore(store_dir)
+sample = history["glacier_id"].iloc[0]
+series = store.get(sample)
+print(f"Sample {sample}: {len(series['history']['year'])} historical years, "
+      f"{len(series['projection']['year'])} projected years")
+print("Saved:", store_dir)
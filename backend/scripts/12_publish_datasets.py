@@ -0,0 +1,42 @@
+"""
+12_publish_datasets.py
+Publish processed tables for the web server
+
+Converts the tables the API serves (CSV or Parquet) into memory-mapped Arrow files
+(dataset_store.py), so all server workers share one copy of each table.
+Run after merge_glacier_datasets.py and 09_visualization.py.
+"""
+
+import os
+
+from dataset_store import ARROW_DIR, DATASETS, MULTI_SCENARIO, write_arrow
+from run_config import load_config, find_table
+
+cfg = load_config()
+
+# -----------------------------
+# PATHS
+# -----------------------------
+OUT_DIR = cfg.processed(ARROW_DIR)
+
+os.makedirs(OUT_DIR, exist_ok=True)
+
+# -----------------------------
+# CONVERT
+# -----------------------------
+for name, table in DATASETS.items():
+    if table is None:  # written directly as Arrow by its own stage
+        continue
+
+    if find_table(cfg.processed_dir, table, cfg.output_format) is None:
+        print(f"⚠️ Skipping {name}: {table} not found in {cfg.processed_dir}")
+        continue
+
+    df = cfg.read_table(table)
+    # The web app shows the primary scenario only (scenario charts aside)
+    if "scenario" in df.columns and name not in MULTI_SCENARIO:
+        df = df[df["scenario"] == cfg.primary_scenario]
+    nbytes = write_arrow(df, os.path.join(OUT_DIR, f"{name}.arrow"))
+    print(f"✅ {name}: {len(df)} rows, {nbytes / 1e6:.1f} MB")
+
+print("Saved:", OUT_DIR)
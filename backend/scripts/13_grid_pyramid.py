@@ -0,0 +1,51 @@
+"""
+13_grid_pyramid.py
+Multi-resolution glacier clusters for the web map
+
+Aggregates glacier_explorer_merged into quadtree cells at every zoom
+level (grid_pyramid.py) and publishes them as a memory-mapped Arrow
+table for the /api/grid endpoints.
+"""
+
+import os
+import time
+
+from dataset_store import ARROW_DIR, write_arrow
+from grid_pyramid import build_pyramid, MIN_LEVEL, MAX_LEVEL
+from run_config import load_config
+
+cfg = load_config()
+
+# -----------------------------
+# PATHS
+# -----------------------------
+OUT_DIR = cfg.processed(ARROW_DIR)
+OUT_FILE = os.path.join(OUT_DIR, "grid_pyramid.arrow")
+
+# -----------------------------
+# LOAD DATA
+# -----------------------------
+df = cfg.read_table(
+    "glacier_explorer_merged",
+    columns=["glacier_id", "lat", "lon", "area_km2", "predicted_melt", "risk_level"],
+)
+print("Loaded glaciers:", df.shape)
+
+# -----------------------------
+# BUILD PYRAMID
+# -----------------------------
+t0 = time.perf_counter()
+pyramid = build_pyramid(df)
+print(f"✅ {pyramid.num_rows} cells over levels {MIN_LEVEL}–{MAX_LEVEL} "
+      f"in {time.perf_counter() - t0:.2f}s")
+
+cells = pyramid.group_by("level").aggregate([("count", "count")]).sort_by("level")
+for row in cells.to_pylist():
+    print(f"  level {row['level']:>2}: {row['count_count']} cells")
+
+# -----------------------------
+# SAVE
+# -----------------------------
+os.makedirs(OUT_DIR, exist_ok=True)
+nbytes = write_arrow(pyramid, OUT_FILE)
+print(f"Saved: {OUT_FILE} ({nbytes / 1e6:.1f} MB)")
@@ -0,0 +1,42 @@
+"""
+13_render_charts.py
+Pre-render the chart catalog
+
+Renders every chart of charts.catalog() (each basin, scenario and
+outlet, over the full span and each decade) from the datasets published
+by 12_publish_datasets.py into the chart cache the web server reads, in
+parallel worker processes. Charts already cached for the same data are
+skipped, so a refresh only redraws what changed.
+"""
+
+import time
+
+import charts
+from dataset_store import DatasetStore
+from run_config import load_config
+
+
+def main():
+    cfg = load_config()
+
+    # -----------------------------
+    # RENDER
+    # -----------------------------
+    datasets = DatasetStore(cfg.processed_dir)
+    renderer = charts.ChartRenderer(datasets, cfg.processed(charts.CHART_DIR), workers=cfg.n_workers)
+
+    jobs = charts.catalog(datasets)
+    missing = [name for name in charts.CHARTS if name not in {n for n, _ in jobs}]
+    if missing:
+        print(f"⚠️ No data published for: {', '.join(missing)}")
+
+    t0 = time.perf_counter()
+    rendered = renderer.render_many(jobs)
+    print(f"✅ {len(jobs)} charts: {rendered} rendered, {len(jobs) - rendered} cached "
+          f"({cfg.n_workers} workers, {time.perf_counter() - t0:.1f}s)")
+    print("Saved:", renderer.cache_dir)
+
+
+# Render workers are spawned and re-import this module; only the parent renders
+if __name__ == "__main__":
+    main()
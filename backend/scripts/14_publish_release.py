@@ -0,0 +1,69 @@
+"""
+14_publish_release.py
+Publish the served artifacts as an immutable release
+
+Collects what the web server reads (Arrow datasets from
+12_publish_datasets.py / 13_grid_pyramid.py, the timeseries store from
+11_timeseries_store.py and the melt model) into a versioned release
+with a manifest of content hashes and row counts, then switches the
+servers over atomically (release_store.py). Run last.
+"""
+
+import os
+import time
+
+from dataset_store import ARROW_DIR, DATASETS
+from release_store import publish_release, prune_releases, verify_release, KEEP_RELEASES
+from run_config import load_config
+from timeseries_store import live_dir
+
+cfg = load_config()
+
+# -----------------------------
+# SOURCES
+# -----------------------------
+# Release path -> staged artifact in processed_dir
+SOURCES = {
+    ARROW_DIR: cfg.processed(ARROW_DIR),
+    "timeseries": live_dir(cfg.processed("timeseries")),
+    "models": cfg.processed("models"),
+    "model_selection.json": cfg.processed("model_selection.json"),
+}
+
+sources = {}
+for name, path in SOURCES.items():
+    if os.path.exists(path):
+        sources[name] = path
+    else:
+        print(f"⚠️ Not in release: {name} ({path} not found)")
+
+missing = [n for n in DATASETS if not os.path.exists(cfg.processed(ARROW_DIR, f"{n}.arrow"))]
+if missing:
+    print(f"⚠️ Datasets not published (the API answers 503 for them): {', '.join(missing)}")
+
+# -----------------------------
+# PUBLISH
+# -----------------------------
+t0 = time.perf_counter()
+version, path, published = publish_release(
+    cfg.processed_dir,
+    sources,
+    {name: f"{ARROW_DIR}/{name}.arrow" for name in DATASETS},
+    # Written by os.replace / into fresh directories: safe to hard-link
+    links=(ARROW_DIR, "timeseries"),
+    metadata={"config": cfg.to_dict()},
+)
+
+if not published:
+    print(f"✅ Release {version} is current and unchanged; nothing published")
+else:
+    manifest = verify_release(path)
+    print(f"✅ Published release {version} in {time.perf_counter() - t0:.2f}s")
+    for name, info in manifest["datasets"].items():
+        print(f"  {name}: {info['rows']} rows")
+
+    removed = prune_releases(cfg.processed_dir, KEEP_RELEASES)
+    if removed:
+        print(f"Removed old releases: {', '.join(removed)}")
+
+print("Live release:", path)
@@ -0,0 +1,154 @@
+"""
+basin_stats.py
+Grouped, vectorized anomaly statistics shared by the basin-scale stages
+(06_extreme_melt_years.py, 07_flood_risk_index.py)
+"""
+
+import numpy as np
+import pandas as pd
+
+# -----------------------------
+# CLASS THRESHOLDS
+# -----------------------------
+MELT_CATEGORIES = ["Low Melt", "Normal", "High Melt", "Extreme Melt"]
+FLOOD_RISK_LEVELS = ["Low Risk", "Moderate Risk", "High Risk"]
+
+# z-score at or below which melt is Low, at or above which it is High / Extreme
+MELT_Z_BOUNDS = (-1.0, 1.0, 2.0)
+# Flood risk index at or above which risk is Moderate / High
+FLOOD_RISK_BOUNDS = (0.45, 0.75)
+
+
+# -----------------------------
+# BASELINE STATISTICS
+# -----------------------------
+def _trailing_stats(values, group_codes, window):
+    """
+    Mean / std (ddof=1) of the previous `window` values of each row's own
+    group, using cumulative sums. Rows must be sorted by group, then year.
+    NaN values are skipped (`count` is the number of valid values).
+    Returns (mean, std, count).
+    """
+    n = len(values)
+    idx = np.arange(n)
+
+    # First row index of each row's group
+    is_start = np.ones(n, dtype=bool)
+    is_start[1:] = group_codes[1:] != group_codes[:-1]
+    group_start = np.maximum.accumulate(np.where(is_start, idx, 0))
+
+    lo = np.maximum(idx - window, group_start)
+
+    # Centre on the global mean so the sum of squares stays well conditioned;
+    # NaNs contribute zero to the sums and nothing to the counts, so one
+    # missing year does not poison every later window
+    valid = ~np.isnan(values)
+    offset = values[valid].mean() if valid.any() else 0.0
+    centred = np.where(valid, values - offset, 0.0)
+    c0 = np.concatenate([[0], np.cumsum(valid)])
+    c1 = np.concatenate([[0.0], np.cumsum(centred)])
+    c2 = np.concatenate([[0.0], np.cumsum(centred ** 2)])
+
+    count = c0[idx] - c0[lo]
+    s1 = c1[idx] - c1[lo]
+    s2 = c2[idx] - c2[lo]
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean_c = s1 / count
+        var = (s2 - count * mean_c ** 2) / (count - 1)
+
+    mean = mean_c + offset
+    std = np.sqrt(np.clip(var, 0, None))
+    return mean, std, count
+
+
+def basin_anomalies(
+    df,
+    value_col,
+    group_col="basin",
+    time_col="year",
+    window=None,
+    min_periods=3,
+):
+    """
+    Per-group anomaly and z-score of `value_col`.
+
+    window=None  -> climatology is the group's full-period mean / std
+    window=N     -> climatology is the trailing N-year mean / std of the
+                    same group (years before the current one). Rows with
+                    fewer than `min_periods` prior years fall back to the
+                    full-period climatology.
+
+    Returns a DataFrame (same index as `df`) with columns
+    baseline_mean, baseline_std, anomaly, z_score.
+    """
+    grouped = df.groupby(group_col, sort=False)[value_col]
+    mean = grouped.transform("mean").to_numpy(dtype=float)
+    std = grouped.transform("std").to_numpy(dtype=float)
+
+    if window:
+        order = np.lexsort((df[time_col].to_numpy(), df[group_col].to_numpy()))
+        codes = pd.factorize(df[group_col].to_numpy()[order])[0]
+        values = df[value_col].to_numpy(dtype=float)[order]
+
+        roll_mean, roll_std, count = _trailing_stats(values, codes, int(window))
+        use = count >= max(int(min_periods), 2)
+
+        mean_sorted = np.where(use, roll_mean, mean[order])
+        std_sorted = np.where(use, roll_std, std[order])
+
+        mean = np.empty_like(mean)
+        std = np.empty_like(std)
+        mean[order] = mean_sorted
+        std[order] = std_sorted
+
+    values = df[value_col].to_numpy(dtype=float)
+    anomaly = values - mean
+    with np.errstate(invalid="ignore", divide="ignore"):
+        z = np.where(std > 0, anomaly / std, 0.0)
+
+    return pd.DataFrame(
+        {
+            "baseline_mean": mean,
+            "baseline_std": std,
+            "anomaly": anomaly,
+            "z_score": z,
+        },
+        index=df.index,
+    )
+
+
+def minmax_by_group(df, value_col, group_col="basin"):
+    """
+    Min-max normalize `value_col` to 0–1 within each group.
+    Constant groups map to 0.
+    """
+    grouped = df.groupby(group_col, sort=False)[value_col]
+    lo = grouped.transform("min")
+    span = grouped.transform("max") - lo
+    return ((df[value_col] - lo) / span.where(span > 0)).fillna(0.0)
+
+
+# -----------------------------
+# CLASSIFICATION (VECTORIZED)
+# -----------------------------
+def classify_melt(z):
+    """z-score -> melt category (NaN counts as Normal)"""
+    z = np.asarray(z, dtype=float)
+    low, high, extreme = MELT_Z_BOUNDS
+    return np.select(
+        [z >= extreme, z >= high, z <= low],
+        ["Extreme Melt", "High Melt", "Low Melt"],
+        default="Normal",
+    )
+
+
+def classify_flood_risk(index):
+    """flood risk index -> risk level (NaN counts as Low Risk)"""
+    index = np.asarray(index, dtype=float)
+    moderate, high = FLOOD_RISK_BOUNDS
+    return np.select(
+        [index >= high, index >= moderate],
+        ["High Risk", "Moderate Risk"],
+        default="Low Risk",
+    )
@@ -0,0 +1,105 @@
+"""
+benchmark_model_backends.py
+Compare melt model backends on glacier_ml_dataset: fit time, predict
+throughput, model size and accuracy on a spatially held-out fold.
+The forest is also scored through the packed Numba engine
+(forest_engine.py).
+"""
+
+import pandas as pd
+import numpy as np
+import time
+
+from model_backends import BACKENDS, make_model
+from model_selection import FEATURES, TARGET, spatial_groups, fold_ids
+from run_config import load_config
+
+cfg = load_config()
+
+# -----------------------------
+# SETTINGS
+# -----------------------------
+# Backend name -> parameter overrides (defaults from model_backends.py)
+CANDIDATES = {name: {} for name in BACKENDS}
+N_FOLDS = 5
+PREDICT_REPEATS = 3
+
+# -----------------------------
+# LOAD DATA
+# -----------------------------
+df = cfg.read_table("glacier_ml_dataset")
+print("Loaded ML dataset:", df.shape)
+
+coords = cfg.read_table("climate_features", columns=["glacier_id", "lat", "lon"])
+coords = coords.drop_duplicates("glacier_id").set_index("glacier_id")
+df = df[df["glacier_id"].isin(coords.index)]
+
+groups = spatial_groups(
+    df["glacier_id"].map(coords["lat"]),
+    df["glacier_id"].map(coords["lon"]),
+)
+holdout = fold_ids(groups, N_FOLDS) == 0
+
+X = df[FEATURES].to_numpy(dtype=np.float64)
+y = df[TARGET].to_numpy(dtype=np.float64)
+X_train, y_train = X[~holdout], y[~holdout]
+X_test, y_test = X[holdout], y[holdout]
+
+print(f"Train rows: {len(X_train)}  Held-out rows: {len(X_test)}")
+
+# -----------------------------
+# BENCHMARK
+# -----------------------------
+def timed_predict(model):
+    best = np.inf
+    for _ in range(PREDICT_REPEATS):
+        t0 = time.perf_counter()
+        pred = model.predict(X_test)
+        best = min(best, time.perf_counter() - t0)
+    return pred, best
+
+
+def result_row(label, model, fit_s, pred, predict_s, size_bytes):
+    resid = y_test - pred
+    return {
+        "backend": label,
+        "params": model.params,
+        "fit_s": fit_s,
+        "predict_rows_per_s": len(X_test) / predict_s,
+        "model_size_mb": size_bytes / 1e6,
+        "complexity": model.complexity(),
+        "r2": 1 - (resid @ resid) / ((y_test - y_test.mean()) ** 2).sum(),
+        "rmse": float(np.sqrt(np.mean(resid ** 2))),
+    }
+
+
+rows = []
+for name, params in CANDIDATES.items():
+    model = make_model(name, **params)
+
+    t0 = time.perf_counter()
+    model.fit(X_train, y_train)
+    fit_s = time.perf_counter() - t0
+
+    pred, predict_s = timed_predict(model)
+    rows.append(result_row(name, model, fit_s, pred, predict_s, model.size_bytes()))
+    print(f"✅ {name}: fit {fit_s:.2f}s, R² {rows[-1]['r2']:.4f}")
+
+    # Same forest through the packed engine (first call compiles the kernel)
+    if hasattr(model, "compile"):
+        exact, diff = model.compile(X_test[:1000])
+        model.predict(X_test[:10])
+        pred, predict_s = timed_predict(model)
+        size = sum(a.nbytes for a in model.packed.values())
+        rows.append(result_row(f"{name} (packed)", model, fit_s, pred, predict_s, size))
+        print(f"✅ {name} (packed): bit-exact={exact}, max |diff|={diff:.3g}")
+
+bench = pd.DataFrame(rows)
+
+# -----------------------------
+# SAVE
+# -----------------------------
+cfg.write_table(bench, "model_benchmark")
+
+print("\nBackend benchmark:")
+print(bench.drop(columns="params").to_string(index=False))
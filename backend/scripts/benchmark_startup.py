@@ -0,0 +1,134 @@
+"""
+benchmark_startup.py
+Cold-start cost of the web server: time to import app.py in a fresh
+interpreter and to answer its first requests, and the modules that
+dominate the import. Exits with status 1 when the import exceeds
+IMPORT_BUDGET_MS or pulls in a pipeline-only package, so it can gate
+deployments.
+
+Packages loaded while answering the first requests are reported but do
+not fail the run: pyarrow imports pandas lazily for Python/NumPy value
+conversions when it is installed, which it is not in the serving image
+(requirements-serving.txt).
+"""
+
+import json
+import subprocess
+import sys
+
+import numpy as np
+import pandas as pd
+
+from run_config import PROJECT_ROOT, load_config
+
+cfg = load_config()
+
+# -----------------------------
+# SETTINGS
+# -----------------------------
+REPEATS = 5
+IMPORT_BUDGET_MS = 750
+FIRST_REQUESTS = ["/api/version", "/api/stats/risk_counts", "/api/grid?z=2"]
+TOP_MODULES = 10
+
+# Packages the serving path must not import at startup
+PIPELINE_ONLY = [
+    "pandas", "sklearn", "scipy", "numba", "joblib", "geopandas", "shapely",
+    "pyproj", "rasterio", "xarray", "netCDF4", "matplotlib", "seaborn", "shap",
+]
+
+PROBE = f"""
+import json, sys, time
+t0 = time.perf_counter()
+import app
+t1 = time.perf_counter()
+startup = sorted(m for m in {PIPELINE_ONLY!r} if m in sys.modules)
+client = app.app.test_client()
+requests = {{}}
+for url in {FIRST_REQUESTS!r}:
+    t = time.perf_counter()
+    status = client.get(url).status_code
+    requests[url] = ((time.perf_counter() - t) * 1000, status)
+later = sorted(m for m in {PIPELINE_ONLY!r} if m in sys.modules and m not in startup)
+print("@@" + json.dumps({{
+    "import_ms": (t1 - t0) * 1000, "requests": requests, "heavy": startup, "later": later,
+}}))
+"""
+
+
+# -----------------------------
+# RUN
+# -----------------------------
+def probe():
+    """One fresh interpreter: (result dict, {module: cumulative import µs})."""
+    out = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", PROBE],
+        cwd=PROJECT_ROOT,
+        capture_output=True,
+        text=True,
+    )
+    if out.returncode != 0:
+        raise SystemExit(f"❌ Importing app failed:\n{out.stderr[-2000:]}")
+
+    result = json.loads(next(l[2:] for l in out.stdout.splitlines() if l.startswith("@@")))
+
+    # "import time: self [us] | cumulative | imported package", nesting by indent
+    cumulative = {}
+    for line in out.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cum, name = line[len("import time:"):].split("|")
+        if not name[1:].startswith(" "):  # top-level import
+            cumulative[name.strip()] = int(cum)
+    return result, cumulative
+
+
+runs = [probe() for _ in range(REPEATS)]
+
+import_ms = np.array([r["import_ms"] for r, _ in runs])
+rows = [{
+    "metric": "import app",
+    "median_ms": np.median(import_ms),
+    "min_ms": import_ms.min(),
+    "max_ms": import_ms.max(),
+    "budget_ms": IMPORT_BUDGET_MS,
+}]
+for url in FIRST_REQUESTS:
+    ms = np.array([r["requests"][url][0] for r, _ in runs])
+    rows.append({
+        "metric": f"first GET {url} ({runs[0][0]['requests'][url][1]})",
+        "median_ms": np.median(ms),
+        "min_ms": ms.min(),
+        "max_ms": ms.max(),
+        "budget_ms": np.nan,
+    })
+
+results = pd.DataFrame(rows)
+cfg.write_table(results, "startup_benchmark")
+
+print(f"\nStartup over {REPEATS} fresh interpreters:")
+print(results.round(1).to_string(index=False))
+
+modules = pd.DataFrame(runs[-1][1].items(), columns=["module", "cumulative_us"])
+print("\nSlowest top-level imports (last run):")
+print(modules.nlargest(TOP_MODULES, "cumulative_us").to_string(index=False))
+
+# -----------------------------
+# BUDGET
+# -----------------------------
+heavy = sorted(set().union(*(r["heavy"] for r, _ in runs)))
+later = sorted(set().union(*(r["later"] for r, _ in runs)))
+if later:
+    print(f"\nℹ️ Loaded while answering the first requests: {', '.join(later)}")
+
+failed = False
+if heavy:
+    print(f"\n❌ Pipeline-only packages imported at startup: {', '.join(heavy)}")
+    failed = True
+if np.median(import_ms) > IMPORT_BUDGET_MS:
+    print(f"\n❌ import app: {np.median(import_ms):.0f} ms > budget {IMPORT_BUDGET_MS} ms")
+    failed = True
+
+if failed:
+    sys.exit(1)
+print(f"\n✅ Startup within budget ({np.median(import_ms):.0f} / {IMPORT_BUDGET_MS} ms)")
@@ -0,0 +1,386 @@
+"""
+charts.py
+On-demand chart rendering from the published datasets.
+
+A chart is a name from CHARTS plus parameters: the basin, scenario or
+outlet it shows (all of them when omitted) and a start/end year. Figures
+are drawn with matplotlib's Agg canvas in a pool of worker processes, so
+the web server never imports matplotlib itself and a full refresh
+(13_render_charts.py) renders the whole catalog in parallel.
+
+Every PNG is cached on disk as
+
+    <cache_dir>/<chart>-<parameter hash>-<artifact version>.png
+
+where the artifact version digests the content of the datasets the chart
+reads and RENDER_VERSION. Charts pre-rendered by the pipeline are
+therefore found by the server of any release holding the same data, and
+new data or new drawing code never serves a stale figure.
+"""
+
+import hashlib
+import io
+import json
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+import pyarrow.compute as pc
+
+from dataset_store import DatasetStore
+
+CHART_DIR = "charts"
+RENDER_VERSION = 1          # bump when the drawing code changes
+CHART_WORKERS = 2           # render processes per web worker
+FIGSIZE = (8, 4.5)
+DPI = 100
+DECADE = 10                 # year windows of the pre-rendered catalog
+
+# Chart -> datasets it reads (the first one holds the dimension and year
+# columns) and its dimension parameter, if any
+CHARTS = {
+    "historical_melt": {"datasets": ["historical_melt_summary"], "dim": None},
+    "future_melt": {"datasets": ["future_melt_scenarios"], "dim": "scenario"},
+    "flood_risk": {"datasets": ["flood_risk_index"], "dim": "basin"},
+    "flood_risk_distribution": {"datasets": ["flood_risk_index"], "dim": "basin"},
+    "basin_runoff": {"datasets": ["basin_runoff"], "dim": "basin"},
+    "outlet_flow": {"datasets": ["outlet_flow"], "dim": "outlet"},
+}
+
+
+class ChartError(ValueError):
+    """Unknown chart or bad chart parameters (reported to the client as HTTP 400)."""
+
+
+# -----------------------------
+# PARAMETERS AND VERSIONS
+# -----------------------------
+def dimension_values(datasets, name):
+    """Values of the chart's dimension in its data ([] if it has none)."""
+    dim = CHARTS[name]["dim"]
+    if dim is None:
+        return []
+    table = datasets.table(CHARTS[name]["datasets"][0])
+    return sorted(pc.unique(table[dim]).drop_null().to_pylist())
+
+
+def year_span(datasets, name):
+    """First and last year of the chart's data."""
+    years = datasets.table(CHARTS[name]["datasets"][0])["year"]
+    return int(pc.min(years).as_py()), int(pc.max(years).as_py())
+
+
+def check_params(datasets, name, params):
+    """Validated parameters ({dim, start, end}, all optional) of chart `name`."""
+    if name not in CHARTS:
+        raise ChartError(f"unknown chart: {name} (choose from {', '.join(CHARTS)})")
+    dim = CHARTS[name]["dim"]
+    allowed = {"start", "end"} | ({dim} if dim else set())
+    unknown = set(params) - allowed
+    if unknown:
+        raise ChartError(f"{name} takes {sorted(allowed)}, not {sorted(unknown)}")
+
+    out = {}
+    for key in ("start", "end"):
+        if params.get(key) is not None:
+            try:
+                out[key] = int(params[key])
+            except (TypeError, ValueError):
+                raise ChartError(f"{key} must be a year") from None
+    if out:
+        first, last = year_span(datasets, name)
+        for key, year in out.items():
+            if not first <= year <= last:
+                raise ChartError(f"{key} must be between {first} and {last}")
+    if out.get("start", -np.inf) > out.get("end", np.inf):
+        raise ChartError("start must not be after end")
+    if dim and params.get(dim) is not None:
+        if params[dim] not in dimension_values(datasets, name):
+            raise ChartError(f"unknown {dim}: {params[dim]}")
+        out[dim] = params[dim]
+    return out
+
+
+def param_hash(name, params):
+    text = json.dumps({"chart": name, **params}, sort_keys=True)
+    return hashlib.sha1(text.encode()).hexdigest()[:16]
+
+
+def dataset_digest(datasets, name, digests):
+    """
+    sha256 of a dataset's file. `digests` memoizes it as {name: (file
+    version, digest)}, holding only the latest version of each dataset.
+    """
+    version = datasets.version(name)
+    cached = digests.get(name)
+    if cached is None or cached[0] != version:
+        h = hashlib.sha256()
+        with open(version[0], "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                h.update(block)
+        cached = digests[name] = (version, h.hexdigest())
+    return cached[1]
+
+
+def artifact_version(datasets, name, digests):
+    h = hashlib.sha256(f"render-{RENDER_VERSION}".encode())
+    for dataset in CHARTS[name]["datasets"]:
+        h.update(dataset_digest(datasets, dataset, digests).encode())
+    return h.hexdigest()[:16]
+
+
+def catalog(datasets):
+    """
+    (chart, params) of every pre-rendered chart: each dimension value
+    (and all of them together) over the full span and each decade.
+    Charts whose data is not published are left out.
+    """
+    jobs = []
+    for name, spec in CHARTS.items():
+        try:
+            values = dimension_values(datasets, name)
+            first, last = year_span(datasets, name)
+        except (FileNotFoundError, KeyError):
+            continue
+        windows = [{}] + [
+            {"start": max(y, first), "end": min(y + DECADE - 1, last)}
+            for y in range(first // DECADE * DECADE, last + 1, DECADE)
+        ]
+        for value in [None] + values:
+            dim = {spec["dim"]: value} if value is not None else {}
+            jobs += [(name, {**dim, **window}) for window in windows]
+    return jobs
+
+
+# -----------------------------
+# DRAWING (worker processes)
+# -----------------------------
+def _select(table, params, dim):
+    years = table["year"]
+    mask = pc.and_(
+        pc.greater_equal(years, params.get("start", -(1 << 31))),
+        pc.less_equal(years, params.get("end", 1 << 31)),
+    )
+    if dim and dim in params:
+        mask = pc.and_(mask, pc.equal(table[dim], params[dim]))
+    return table.filter(mask)
+
+
+def _groups(table, dim):
+    """(label, sub-table) per dimension value, or one unlabelled group."""
+    if dim is None:
+        return [(None, table)]
+    return [
+        (value, table.filter(pc.equal(table[dim], value)))
+        for value in sorted(pc.unique(table[dim]).drop_null().to_pylist())
+    ]
+
+
+def _col(table, col):
+    return table[col].to_numpy(zero_copy_only=False).astype(np.float64)
+
+
+def _years(params, table):
+    if table.num_rows == 0:
+        return "no data"
+    years = table["year"]
+    return f"{params.get('start', pc.min(years).as_py())}–{params.get('end', pc.max(years).as_py())}"
+
+
+def draw_historical_melt(ax, table, params):
+    ax.plot(_col(table, "year"), _col(table, "mass_change"), marker="o", color="#2563eb")
+    ax.set_ylabel("Mean Mass Change")
+    return f"Historical Glacier Melt Trend ({_years(params, table)})"
+
+
+def draw_future_melt(ax, table, params):
+    for scenario, t in _groups(table, "scenario"):
+        t = t.sort_by("year")
+        year = _col(t, "year")
+        line, = ax.plot(year, _col(t, "predicted_melt"), marker="o", label=scenario)
+        if "predicted_melt_p05" in t.column_names and "predicted_melt_p95" in t.column_names:
+            ax.fill_between(year, _col(t, "predicted_melt_p05"), _col(t, "predicted_melt_p95"),
+                            color=line.get_color(), alpha=0.15, linewidth=0)
+    ax.set_ylabel("Predicted Melt")
+    ax.legend(title="Scenario")
+    return f"Projected Glacier Melt ({_years(params, table)})"
+
+
+def draw_flood_risk(ax, table, params):
+    from basin_stats import FLOOD_RISK_BOUNDS
+
+    for basin, t in _groups(table, "basin"):
+        t = t.sort_by("year")
+        year = _col(t, "year")
+        line, = ax.plot(year, _col(t, "flood_risk_index"), marker="o", label=basin)
+        if "flood_risk_index_std" in t.column_names:
+            mean, std = _col(t, "flood_risk_index_mean"), _col(t, "flood_risk_index_std")
+            ax.fill_between(year, mean - std, mean + std, color=line.get_color(), alpha=0.15, linewidth=0)
+    for bound, color in zip(FLOOD_RISK_BOUNDS, ("#f59e0b", "#dc2626")):
+        ax.axhline(bound, color=color, linestyle="--", linewidth=1)
+    ax.set_ylim(0, 1)
+    ax.set_ylabel("Flood Risk Index")
+    ax.legend(title="Basin")
+    return f"Flood Risk Index ({_years(params, table)})"
+
+
+def draw_flood_risk_distribution(ax, table, params):
+    from basin_stats import FLOOD_RISK_LEVELS
+
+    levels = table["flood_risk_level"].to_pylist()
+    counts = [levels.count(level) for level in FLOOD_RISK_LEVELS]
+    ax.bar(FLOOD_RISK_LEVELS, counts, color=["#16a34a", "#f59e0b", "#dc2626"])
+    ax.set_xlabel("Flood Risk Level")
+    ax.set_ylabel("Number of Basin-Years")
+    return f"Flood Risk Distribution ({_years(params, table)})"
+
+
+def draw_basin_runoff(ax, table, params):
+    for basin, t in _groups(table, "basin"):
+        t = t.sort_by("year")
+        ax.plot(_col(t, "year"), _col(t, "basin_runoff_mm"), marker="o", label=basin)
+    ax.set_ylabel("Runoff depth (mm)")
+    ax.legend(title="Basin")
+    return f"Basin Glacier Runoff ({_years(params, table)})"
+
+
+def draw_outlet_flow(ax, table, params):
+    for outlet, t in _groups(table, "outlet"):
+        t = t.sort_by([("year", "ascending"), ("month", "ascending")])
+        ax.plot(_col(t, "year") + (_col(t, "month") - 0.5) / 12, _col(t, "flow_m3s"), label=outlet)
+    ax.set_ylabel("Glacier meltwater discharge (m³/s)")
+    ax.legend(title="Outlet")
+    return f"Routed Glacier Meltwater at River Outlets ({_years(params, table)})"
+
+
+DRAW = {
+    "historical_melt": draw_historical_melt,
+    "future_melt": draw_future_melt,
+    "flood_risk": draw_flood_risk,
+    "flood_risk_distribution": draw_flood_risk_distribution,
+    "basin_runoff": draw_basin_runoff,
+    "outlet_flow": draw_outlet_flow,
+}
+
+_STORES = {}
+
+
+def render_png(data_dir, name, params):
+    """PNG bytes of one chart, drawn from the datasets of data_dir."""
+    # Imported here: only render processes load matplotlib
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    datasets = _STORES.setdefault(data_dir, DatasetStore(data_dir))
+    spec = CHARTS[name]
+    table = _select(datasets.table(spec["datasets"][0]), params, spec["dim"])
+
+    fig = Figure(figsize=FIGSIZE, dpi=DPI)
+    canvas = FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    title = DRAW[name](ax, table, params)
+    if spec["dim"] in params:
+        title += f" – {params[spec['dim']]}"
+    ax.set_title(title)
+    ax.set_xlabel(ax.get_xlabel() or "Year")
+    ax.grid(True, alpha=0.3)
+    fig.tight_layout()
+
+    buf = io.BytesIO()
+    canvas.print_png(buf)
+    return buf.getvalue()
+
+
+# -----------------------------
+# RENDERER
+# -----------------------------
+_POOL = (None, None)
+_POOL_LOCK = threading.Lock()
+
+
+def _executor(workers, broken=None):
+    """
+    Render pool of this process (created on first use, again after a fork
+    or once `broken`, a pool that lost a worker, is handed back).
+    """
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL[0] != os.getpid() or (broken is not None and _POOL[1] is broken):
+            # spawn: workers start clean instead of inheriting a web
+            # worker's threads and open files
+            pool = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"))
+            _POOL = (os.getpid(), pool)
+        return _POOL[1]
+
+
+class ChartRenderer:
+    def __init__(self, datasets, cache_dir, workers=CHART_WORKERS):
+        self.datasets = datasets
+        self.cache_dir = cache_dir
+        self.workers = workers
+        self._digests = {}   # per renderer, i.e. per release on the server
+
+    def path(self, name, params):
+        """Cache file of a chart (validated params) for the current data."""
+        version = artifact_version(self.datasets, name, self._digests)
+        return os.path.join(self.cache_dir, f"{name}-{param_hash(name, params)}-{version}.png")
+
+    def submit(self, name, params):
+        """Future of the chart's cache path, rendering it if it is not cached."""
+        path = self.path(name, params)
+        if os.path.exists(path):
+            future = _done(path)
+        else:
+            pool = _executor(self.workers)
+            try:
+                future = pool.submit(render_png, self.datasets.data_dir, name, params)
+            except BrokenProcessPool:
+                # A worker died (killed, out of memory): start over with a new pool
+                pool = _executor(self.workers, broken=pool)
+                future = pool.submit(render_png, self.datasets.data_dir, name, params)
+            future = _chain(future, lambda png: _store(path, png))
+        return future
+
+    def render_many(self, jobs):
+        """
+        Render (chart, params) jobs in parallel; returns the number that
+        were rendered (the rest were cached).
+        """
+        os.makedirs(self.cache_dir, exist_ok=True)
+        cached = [os.path.exists(self.path(n, p)) for n, p in jobs]
+        futures = [self.submit(n, p) for n, p in jobs]
+        for future in futures:
+            future.result()
+        return len(jobs) - sum(cached)
+
+
+def _store(path, png):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(png)
+    os.replace(tmp, path)
+    return path
+
+
+def _done(value):
+    future = Future()
+    future.set_result(value)
+    return future
+
+
+def _chain(future, fn):
+    """Future of fn(result of future), run in the thread that completes it."""
+    out = Future()
+
+    def finish(f):
+        try:
+            out.set_result(fn(f.result()))
+        except BaseException as exc:
+            out.set_exception(exc)
+
+    future.add_done_callback(finish)
+    return out
@@ -0,0 +1,132 @@
+"""
+climate_cube.py
+Monthly climate cube (glacier × month) on NetCDF.
+
+02_climate_features.py samples the 12 monthly WorldClim bands of each
+variable once and stores them here instead of averaging them away:
+
+    dims        glacier (n_glaciers), month (1..12)
+    coords      glacier_id
+    variables   prec  mm / month
+                temp  °C (monthly mean air temperature)
+                srad  kJ m-2 day-1
+
+Variables are float32, zlib-compressed and chunked along glacier, so a
+chunk of glaciers is one read per variable. Features are computed from
+the cube chunk by chunk (compute_features): memory stays bounded by the
+chunk size whatever the number of features, and adding a feature does
+not touch the rasters again.
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+import xarray as xr
+
+CUBE_FILE = "climate_cube.nc"
+VARIABLES = ["prec", "temp", "srad"]
+MONTHS = np.arange(1, 13)
+DAYS_IN_MONTH = np.array([31, 28.25, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31])
+
+CHUNK_GLACIERS = 4096
+COMPRESSION = {"zlib": True, "complevel": 4, "shuffle": True}
+
+# Ablation season (monsoon) and accumulation season (westerlies)
+SUMMER_MONTHS = [6, 7, 8, 9]
+WINTER_MONTHS = [12, 1, 2, 3]
+
+
+# -----------------------------
+# WRITE
+# -----------------------------
+def make_cube(glacier_ids, monthly):
+    """
+    Dataset from {variable: array (n_glaciers, 12)}, months in
+    calendar order.
+    """
+    data_vars = {}
+    for var in VARIABLES:
+        values = np.asarray(monthly[var], dtype=np.float32)
+        if values.shape != (len(glacier_ids), len(MONTHS)):
+            raise ValueError(f"{var}: expected shape {(len(glacier_ids), 12)}, got {values.shape}")
+        data_vars[var] = (("glacier", "month"), values)
+
+    return xr.Dataset(
+        data_vars,
+        coords={
+            "glacier_id": ("glacier", np.asarray(glacier_ids, dtype=str)),
+            "month": MONTHS,
+        },
+    )
+
+
+def write_cube(ds, path, chunk=CHUNK_GLACIERS):
+    """Write a cube compressed and chunked by glacier, replacing `path` atomically."""
+    chunk = max(1, min(chunk, ds.sizes["glacier"]))
+    encoding = {
+        var: {**COMPRESSION, "chunksizes": (chunk, len(MONTHS))}
+        for var in VARIABLES
+    }
+    tmp = path + ".tmp"
+    ds.to_netcdf(tmp, engine="netcdf4", encoding=encoding)
+    os.replace(tmp, path)
+    return path
+
+
+def merge_cubes(paths, path):
+    """Concatenate cubes along glacier (e.g. per-region partitions)."""
+    parts = []
+    for p in paths:
+        with xr.open_dataset(p, engine="netcdf4") as ds:
+            parts.append(ds.load())
+    return write_cube(xr.concat(parts, dim="glacier"), path)
+
+
+# -----------------------------
+# FEATURES
+# -----------------------------
+def annual_mean(var):
+    return lambda ds: ds[var].mean("month")
+
+
+def summer_pdd(ds):
+    """Positive degree-days over the summer months (°C day)."""
+    days = xr.DataArray(DAYS_IN_MONTH, coords={"month": MONTHS}, dims="month")
+    pdd = ds["temp"].clip(min=0) * days
+    return pdd.sel(month=SUMMER_MONTHS).sum("month", skipna=False)
+
+
+def winter_precipitation(ds):
+    """Total precipitation over the winter months (mm)."""
+    return ds["prec"].sel(month=WINTER_MONTHS).sum("month", skipna=False)
+
+
+# Feature column -> function of a cube chunk, returning one value per glacier
+FEATURES = {
+    "prec_mean": annual_mean("prec"),
+    "temp_mean": annual_mean("temp"),
+    "srad_mean": annual_mean("srad"),
+    "summer_pdd": summer_pdd,
+    "winter_prec": winter_precipitation,
+}
+
+
+def compute_features(path, features=FEATURES, chunk=CHUNK_GLACIERS):
+    """
+    Feature table (glacier_id + one column per feature), reading the
+    cube `chunk` glaciers at a time.
+    """
+    frames = []
+    with xr.open_dataset(path, engine="netcdf4") as ds:
+        n = ds.sizes["glacier"]
+        for start in range(0, n, chunk):
+            part = ds.isel(glacier=slice(start, start + chunk)).load()
+            frame = pd.DataFrame({"glacier_id": part["glacier_id"].values})
+            for name, fn in features.items():
+                frame[name] = fn(part).values.astype(np.float64)
+            frames.append(frame)
+
+    if not frames:
+        return pd.DataFrame(columns=["glacier_id"] + list(features))
+    return pd.concat(frames, ignore_index=True)
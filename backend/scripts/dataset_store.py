@@ -0,0 +1,119 @@
+"""
+dataset_store.py
+Processed tables as memory-mapped Arrow files.
+
+12_publish_datasets.py writes each table in DATASETS to
+<processed_dir>/arrow/<name>.arrow (Arrow IPC, uncompressed, one record
+batch). The server opens them with DatasetStore: columns are views into
+the memory map, so every web worker shares one copy of the data through
+the OS page cache and only touched pages are ever read from disk.
+"""
+
+import os
+
+import pyarrow as pa
+
+from run_config import find_table
+
+ARROW_DIR = "arrow"
+
+# Dataset name -> stage table (relative to the processed directory, any
+# output format) it is built from; None for tables that only exist as
+# Arrow files
+DATASETS = {
+    "glaciers": "glacier_explorer_merged",
+    "future_melt_projection": "future_melt_projection",
+    "basin_runoff": "basin_runoff_timeseries",
+    "outlet_flow": "outlet_flow",
+    "outlet_peak_flow": "outlet_peak_flow",
+    "flood_risk_index": "flood_risk_index",
+    "feature_importance": "feature_importance",
+    "partial_effects": "partial_effects",
+    "historical_melt_summary": "visuals/historical_melt_summary",
+    "future_melt_summary": "visuals/future_melt_summary",
+    "future_melt_scenarios": "visuals/future_melt_scenarios",
+    "flood_risk_summary": "visuals/flood_risk_summary",
+    "climate_features": "climate_features",
+    "location_exposure": "location_exposure",
+    "grid_pyramid": None,
+}
+
+# Datasets published with every scenario; the others keep the primary one
+MULTI_SCENARIO = {"future_melt_scenarios"}
+
+
+# -----------------------------
+# WRITE
+# -----------------------------
+def write_arrow(df, path):
+    """
+    Write df (DataFrame or Arrow table) as a single-batch Arrow IPC file,
+    replacing `path` atomically.
+    """
+    if not isinstance(df, pa.Table):
+        df = pa.Table.from_pandas(df, preserve_index=False)
+    table = df.combine_chunks()
+    tmp = path + ".tmp"
+    with pa.OSFile(tmp, "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp, path)
+    return table.nbytes
+
+
+# -----------------------------
+# READ
+# -----------------------------
+class DatasetStore:
+    """
+    Lazily opened datasets, reopened when their file is replaced.
+    Falls back to parsing the stage table when no Arrow file has been
+    published.
+    """
+
+    def __init__(self, data_dir):
+        self.data_dir = data_dir
+        self._open = {}  # name -> (file key, table)
+
+    def _paths(self, name):
+        if name not in DATASETS:
+            raise KeyError(f"Unknown dataset: {name}")
+        arrow = os.path.join(self.data_dir, ARROW_DIR, f"{name}.arrow")
+        source = DATASETS[name] and find_table(self.data_dir, DATASETS[name])
+        return arrow, source
+
+    def version(self, name):
+        """Changes whenever the dataset's file is replaced; raises if absent."""
+        arrow, source = self._paths(name)
+        path = arrow if os.path.exists(arrow) or source is None else source
+        st = os.stat(path)
+        return (path, st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def table(self, name):
+        key = self.version(name)
+        cached = self._open.get(name)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+
+        path = key[0]
+        if path.endswith(".arrow"):
+            with pa.memory_map(path, "r") as source:
+                table = pa.ipc.open_file(source).read_all()
+        else:
+            print(f"⚠️ {name}: no Arrow file, parsing {path} (per-worker copy)")
+            import pandas as pd  # only needed before the first publish
+            df = pd.read_parquet(path) if path.endswith(".parquet") else pd.read_csv(path)
+            table = pa.Table.from_pandas(df, preserve_index=False)
+
+        self._open[name] = (key, table)
+        return table
+
+    def frame(self, name, columns=None):
+        table = self.table(name)
+        if columns is not None:
+            table = table.select(columns)
+        return table.to_pandas()
+
+    def column(self, name, col):
+        """NumPy view of one column (copied only if it holds nulls or strings)."""
+        return self.table(name).column(col).to_numpy()
@@ -0,0 +1,284 @@
+"""
+exposure.py
+Glaciers near a set of locations (villages, hydropower sites, ...).
+
+ExposureIndex buckets glacier centroids into CELL_DEG x CELL_DEG
+latitude/longitude cells, sorted by key = row * N_COLS + col. A search
+circle spans a few cell rows and, in each, one contiguous key range
+(two where it crosses the antimeridian), so a whole batch of locations
+is one searchsorted call, one flat array of (location, glacier)
+candidate pairs and one haversine pass over them:
+
+    within(lat, lon, radius_km)   every glacier within the radius
+    nearest(lat, lon, k)          the k nearest glaciers
+
+Both return (location, glacier, distance_km) pairs sorted by location,
+then distance; summarize() aggregates them per location. Used by
+11_location_exposure.py and /api/exposure.
+"""
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+
+from grid_pyramid import RISK_LEVELS
+
+EARTH_RADIUS_KM = 6371.0
+HALF_CIRCUMFERENCE_KM = np.pi * EARTH_RADIUS_KM
+
+CELL_DEG = 0.5
+N_ROWS = int(180 / CELL_DEG)
+N_COLS = int(360 / CELL_DEG)
+
+MAX_PAIRS = 4_000_000      # candidate pairs evaluated per batch
+KNN_START_KM = 10.0        # first search radius of nearest()
+KNN_GROWTH = 1.25          # its growth per round until it holds k candidates
+
+
+class ExposureError(ValueError):
+    """Bad locations or query parameters (reported to the client as HTTP 400)."""
+
+
+# -----------------------------
+# LOCATIONS
+# -----------------------------
+def read_locations(source):
+    """
+    Locations CSV (path or file object) with `lat` and `lon` columns in
+    degrees; any other columns (name, type, ...) are carried through.
+    Returns (Arrow table, lat, lon).
+    """
+    try:
+        table = pacsv.read_csv(source)
+    except pa.ArrowInvalid as exc:
+        raise ExposureError(f"unreadable locations CSV: {exc}") from None
+
+    missing = [c for c in ("lat", "lon") if c not in table.column_names]
+    if missing:
+        raise ExposureError(f"locations CSV needs columns {missing}")
+    try:
+        lat, lon = (
+            pc.cast(table[c], pa.float64()).to_numpy(zero_copy_only=False)
+            for c in ("lat", "lon")
+        )
+    except pa.ArrowInvalid:
+        raise ExposureError("lat and lon must be numbers") from None
+
+    bad = ~(np.abs(lat) <= 90) | ~(np.abs(lon) <= 180)
+    if bad.any():
+        raise ExposureError(f"invalid lat/lon in data row {int(np.argmax(bad)) + 1}")
+    return table, lat, lon
+
+
+def risk_codes(values):
+    """Index of each risk level in RISK_LEVELS (len(RISK_LEVELS) = unknown)."""
+    if not isinstance(values, (pa.Array, pa.ChunkedArray)):
+        values = pa.array(values, type=pa.string())
+    codes = pc.index_in(values, value_set=pa.array(RISK_LEVELS))
+    return pc.fill_null(codes, len(RISK_LEVELS)).to_numpy().astype(np.int8)
+
+
+# -----------------------------
+# INDEX
+# -----------------------------
+def _cells(lat, lon):
+    row = np.clip(np.floor((lat + 90.0) / CELL_DEG), 0, N_ROWS - 1).astype(np.int64)
+    col = np.floor((lon + 180.0) / CELL_DEG).astype(np.int64) % N_COLS
+    return row, col
+
+
+def _expand(start, stop):
+    """Flat positions start[i]..stop[i]-1 of every range, and its range number."""
+    counts = stop - start
+    owner = np.repeat(np.arange(len(start)), counts)
+    pos = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts - start, counts)
+    return owner, pos
+
+
+class ExposureIndex:
+    def __init__(self, lat, lon):
+        lat = np.asarray(lat, dtype=np.float64)
+        lon = np.asarray(lon, dtype=np.float64)
+        if not (np.isfinite(lat).all() and np.isfinite(lon).all()):
+            raise ValueError("❌ Glacier positions must not be missing")
+
+        row, col = _cells(lat, lon)
+        keys = row * N_COLS + col
+        self.order = np.argsort(keys, kind="stable")   # sorted position -> glacier
+        self.keys = keys[self.order]
+        self.lat = np.radians(lat[self.order])
+        self.lon = np.radians(lon[self.order])
+        self.cos_lat = np.cos(self.lat)
+        self.size = len(lat)
+
+    def _ranges(self, lat, lon, radius_km):
+        """(location, start, stop) slices of the sorted glaciers covering each circle."""
+        delta = np.degrees(radius_km / EARTH_RADIUS_KM)
+        polar = (lat + delta >= 90) | (lat - delta <= -90)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            ratio = np.sin(np.radians(np.minimum(delta, 90))) / np.cos(np.radians(lat))
+        # Widest longitude span of the circle (its tangent points)
+        dlon = np.where(polar | ~(ratio < 1), 180.0, np.degrees(np.arcsin(np.clip(ratio, 0, 1))))
+
+        row0, _ = _cells(np.maximum(lat - delta, -90), lon)
+        row1, _ = _cells(np.minimum(lat + delta, 90), lon)
+        c0 = np.floor((lon - dlon + 180.0) / CELL_DEG).astype(np.int64)
+        c1 = np.floor((lon + dlon + 180.0) / CELL_DEG).astype(np.int64)
+        full = c1 - c0 + 1 >= N_COLS
+        c0 = np.where(full, 0, c0 % N_COLS)
+        c1 = np.where(full, N_COLS - 1, c1 % N_COLS)
+        wrap = c0 > c1
+
+        # One entry per (location, cell row)
+        loc, offset = _expand(np.zeros_like(row0), row1 - row0 + 1)
+        base = (row0[loc] + offset) * N_COLS
+        lo = np.concatenate([base + c0[loc], base])
+        hi = np.concatenate([
+            base + np.where(wrap, N_COLS - 1, c1)[loc] + 1,
+            np.where(wrap[loc], base + c1[loc] + 1, base),   # empty unless wrapped
+        ])
+        return (
+            np.concatenate([loc, loc]),
+            np.searchsorted(self.keys, lo),
+            np.searchsorted(self.keys, hi),
+        )
+
+    def _distance(self, lat, lon, pos):
+        """Haversine distance (km) of points (radians) to sorted glaciers `pos`."""
+        a = (
+            np.sin((self.lat[pos] - lat) / 2) ** 2
+            + np.cos(lat) * self.cos_lat[pos] * np.sin((self.lon[pos] - lon) / 2) ** 2
+        )
+        return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+    def _pairs(self, lat, lon, radius, inside=True):
+        """
+        (location, sorted position, distance_km) of the candidates of
+        each circle, sorted by location, then distance; only those inside
+        the circle unless `inside` is False.
+        """
+        loc, start, stop = self._ranges(lat, lon, radius)
+
+        # Batches of consecutive locations with at most MAX_PAIRS candidates
+        ends = np.cumsum(np.bincount(loc, weights=stop - start, minlength=len(lat)))
+        bounds = [0]
+        while bounds[-1] < len(lat):
+            done = ends[bounds[-1] - 1] if bounds[-1] else 0
+            bounds.append(max(int(np.searchsorted(ends, done + MAX_PAIRS, side="right")), bounds[-1] + 1))
+
+        none = np.array([], dtype=np.int64)
+        out_loc, out_pos, out_dist = [none], [none], [np.array([])]
+        lat_r, lon_r = np.radians(lat), np.radians(lon)
+        for b0, b1 in zip(bounds[:-1], bounds[1:]):
+            sel = (loc >= b0) & (loc < b1)
+            owner, pos = _expand(start[sel], stop[sel])
+            pair_loc = loc[sel][owner]
+            d = self._distance(lat_r[pair_loc], lon_r[pair_loc], pos)
+            keep = d <= radius[pair_loc] if inside else slice(None)
+            out_loc.append(pair_loc[keep])
+            out_pos.append(pos[keep])
+            out_dist.append(d[keep])
+
+        pair_loc, pos, dist = (np.concatenate(v) for v in (out_loc, out_pos, out_dist))
+        order = np.lexsort((dist, pair_loc))
+        return pair_loc[order], pos[order], dist[order]
+
+    def within(self, lat, lon, radius_km):
+        """
+        Every (location, glacier, distance_km) with the glacier within
+        radius_km (scalar or per location) of the location.
+        """
+        lat = np.asarray(lat, dtype=np.float64)
+        lon = np.asarray(lon, dtype=np.float64)
+        radius = np.broadcast_to(np.asarray(radius_km, dtype=np.float64), lat.shape)
+        loc, pos, dist = self._pairs(lat, lon, radius)
+        return loc, self.order[pos], dist
+
+    def nearest(self, lat, lon, k=1):
+        """
+        The k nearest glaciers of every location as (location, glacier,
+        distance_km) pairs.
+
+        Each location's radius grows from KNN_START_KM until its candidate
+        cells hold k glaciers (counted from the index alone, so rounds are
+        cheap and can grow slowly).
+        The k-th nearest of those candidates bounds the distance of the
+        k-th nearest glacier; where the bound lies outside the circle, one
+        more radius query out to it completes the answer.
+        """
+        lat = np.asarray(lat, dtype=np.float64)
+        lon = np.asarray(lon, dtype=np.float64)
+        n, k = len(lat), min(int(k), self.size)
+        if not (n and k):
+            none = np.array([], dtype=np.int64)
+            return none, none, np.array([])
+
+        radius = np.full(n, KNN_START_KM)
+        todo = np.arange(n)
+        while len(todo):
+            loc, start, stop = self._ranges(lat[todo], lon[todo], radius[todo])
+            short = np.bincount(loc, weights=stop - start, minlength=len(todo)) < k
+            todo = todo[short & (radius[todo] < HALF_CIRCUMFERENCE_KM)]
+            radius[todo] *= KNN_GROWTH
+
+        loc, pos, dist = self._pairs(lat, lon, radius, inside=False)
+        bound = dist[np.searchsorted(loc, np.arange(n)) + k - 1]
+        again = np.flatnonzero(bound > radius)
+        if len(again):
+            redo = np.isin(loc, again)
+            loc2, pos2, dist2 = self._pairs(lat[again], lon[again], bound[again])
+            loc = np.concatenate([loc[~redo], again[loc2]])
+            pos = np.concatenate([pos[~redo], pos2])
+            dist = np.concatenate([dist[~redo], dist2])
+            order = np.lexsort((dist, loc))
+            loc, pos, dist = loc[order], pos[order], dist[order]
+
+        counts = np.bincount(loc, minlength=n)
+        keep = np.arange(len(loc)) - (np.cumsum(counts) - counts)[loc] < k
+        return loc[keep], self.order[pos[keep]], dist[keep]
+
+
+# -----------------------------
+# AGGREGATE
+# -----------------------------
+def summarize(n_locations, loc, glacier, distance_km, risk_code, melt, glacier_id):
+    """
+    Per-location columns from (location, glacier, distance_km) pairs
+    sorted by location, then distance: glacier counts by risk level,
+    predicted melt of the glaciers, and the nearest (high-risk) glacier.
+    """
+    n = n_locations
+    count = np.bincount(loc, minlength=n)
+    risk = risk_code[glacier]
+    out = {"n_glaciers": count}
+    for i, level in enumerate(RISK_LEVELS):
+        out[f"n_{level.lower()}_risk"] = np.bincount(loc[risk == i], minlength=n)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        out["high_risk_share"] = np.where(count > 0, out["n_high_risk"] / count, np.nan)
+
+    m = np.asarray(melt, dtype=np.float64)[glacier]
+    valid = ~np.isnan(m)
+    n_melt = np.bincount(loc[valid], minlength=n)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        out["predicted_melt_mean"] = np.bincount(loc[valid], weights=m[valid], minlength=n) / n_melt
+    # More negative predicted_melt = more melt: the minimum is the worst glacier
+    melt_min = np.full(n, np.nan)
+    np.fmin.at(melt_min, loc, m)
+    out["predicted_melt_min"] = melt_min
+
+    # Pairs are distance-sorted per location: the first one is the nearest
+    has = count > 0
+    first = np.searchsorted(loc, np.flatnonzero(has))
+    out["nearest_glacier_id"] = np.full(n, None, dtype=object)
+    out["nearest_glacier_id"][has] = np.asarray(glacier_id, dtype=object)[glacier[first]]
+    out["nearest_km"] = np.full(n, np.nan)
+    out["nearest_km"][has] = distance_km[first]
+
+    high = risk == 0
+    has_high = out["n_high_risk"] > 0
+    out["nearest_high_risk_km"] = np.full(n, np.nan)
+    out["nearest_high_risk_km"][has_high] = distance_km[high][
+        np.searchsorted(loc[high], np.flatnonzero(has_high))
+    ]
+    return out
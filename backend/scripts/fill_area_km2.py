@@ -1,15 +1,17 @@
 import pandas as pd
 import re
 
+from run_config import load_config
+
+cfg = load_config()
+
 # -----------------------------
 # Paths
 # -----------------------------
-GLACIER_MASTER_PATH = "data/processed/glacier_master.csv"
-RGI_ATTR_PATH = "data/raw/mass_balance/RGI2000-v7.0-G-global-attributes.csv"
-OUTPUT_PATH = "data/processed/glacier_master_with_area.csv"
+RGI_ATTR_PATH = cfg.raw("mass_balance", "RGI2000-v7.0-G-global-attributes.csv")
 
 print("Loading glacier master...")
-gm = pd.read_csv(GLACIER_MASTER_PATH)
+gm = cfg.read_table("glacier_master")
 
 print("Loading RGI global attributes...")
 rgi = pd.read_csv(RGI_ATTR_PATH)
@@ -68,5 +70,5 @@ print("\nMissing area count:", gm["area_km2"].isna().sum())
 # -----------------------------
 # 6. Save
 # -----------------------------
-gm.to_csv(OUTPUT_PATH, index=False)
-print(f"\n✅ glacier_master_with_area.csv created successfully")
+cfg.write_table(gm, "glacier_master_with_area")
+print("\n✅ glacier_master_with_area created successfully")
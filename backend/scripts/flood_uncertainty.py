@@ -0,0 +1,117 @@
+"""
+flood_uncertainty.py
+Monte Carlo propagation of input uncertainty through the flood risk
+index (07_flood_risk_index.py).
+
+Every draw perturbs, for all basin-years at once:
+  - the runoff z-score (and the routed peak-flow z-score), by Gaussian
+    noise in z units
+  - the melt category boundaries (basin_stats.MELT_Z_BOUNDS), each
+    shifted per draw and kept in order
+  - the index weights, drawn from a Dirichlet centred on the nominal ones
+and classifies the resulting index with the fixed flood risk bounds.
+Missing z-scores follow the deterministic index: they normalize to 0 and
+(runoff) fall in the Normal melt category in every draw.
+Draws are generated as (draws x basin-years) arrays, CHUNK_DRAWS at a
+time, from one seeded generator per chunk, so results are reproducible
+for a given seed and memory stays bounded.
+"""
+
+import numpy as np
+
+from basin_stats import FLOOD_RISK_BOUNDS, FLOOD_RISK_LEVELS, MELT_Z_BOUNDS
+
+CHUNK_DRAWS = 10_000
+
+
+def _normalize(z, lo, hi):
+    """
+    Min-max scale with fixed per-row bounds, clipped to 0–1 (constant or
+    NaN -> 0, as basin_stats.minmax_by_group).
+    """
+    span = hi - lo
+    with np.errstate(invalid="ignore", divide="ignore"):
+        out = np.where(span > 0, (z - lo) / span, 0.0)
+    return np.nan_to_num(np.clip(out, 0.0, 1.0))
+
+
+def simulate(
+    runoff_z,
+    runoff_bounds,
+    melt_scores,
+    weights,
+    peak_z=None,
+    peak_bounds=None,
+    n_draws=100_000,
+    seed=0,
+    z_sd=0.3,
+    boundary_sd=0.25,
+    weight_concentration=50.0,
+    chunk=CHUNK_DRAWS,
+):
+    """
+    Flood risk level probabilities per basin-year.
+
+    runoff_z       (rows,) runoff z-score; it also sets the melt category
+    runoff_bounds  (lo, hi) per row: the basin's z range used to normalize
+    melt_scores    score of each basin_stats.MELT_CATEGORIES entry
+    weights        nominal weights of (runoff, [peak,] melt)
+    peak_z, peak_bounds   routed peak-flow z-score and its basin range
+
+    Returns {"probability": (rows x levels), "index_mean", "index_std"},
+    levels in basin_stats.FLOOD_RISK_LEVELS order.
+    """
+    runoff_z = np.asarray(runoff_z, dtype=np.float64)
+    rows = len(runoff_z)
+    weights = np.asarray(weights, dtype=np.float64)
+    melt_scores = np.asarray(melt_scores, dtype=np.float64)
+    has_peak = peak_z is not None
+    if len(weights) != 2 + has_peak:
+        raise ValueError(f"❌ Expected {2 + has_peak} weights, got {len(weights)}")
+
+    z_lo, z_hi = (np.asarray(b, dtype=np.float64) for b in runoff_bounds)
+    if has_peak:
+        peak_z = np.asarray(peak_z, dtype=np.float64)
+        p_lo, p_hi = (np.asarray(b, dtype=np.float64) for b in peak_bounds)
+
+    counts = np.zeros((rows, len(FLOOD_RISK_LEVELS)), dtype=np.int64)
+    total = np.zeros(rows)
+    total_sq = np.zeros(rows)
+    alpha = weights / weights.sum() * weight_concentration
+
+    chunks = [min(chunk, n_draws - start) for start in range(0, n_draws, chunk)]
+    for size, child in zip(chunks, np.random.SeedSequence(seed).spawn(len(chunks))):
+        rng = np.random.default_rng(child)
+
+        z = runoff_z + rng.normal(0.0, z_sd, (size, rows))
+        runoff_norm = _normalize(z, z_lo, z_hi)
+
+        # Category boundaries shift per draw; z at or below the first is
+        # Low, at or above the second High, the third Extreme (NaN: Normal)
+        bounds = np.sort(np.asarray(MELT_Z_BOUNDS) + rng.normal(0.0, boundary_sd, (size, 3)), axis=1)
+        category = (
+            1
+            + (z >= bounds[:, 1:2]).astype(np.int8)
+            + (z >= bounds[:, 2:3])
+            - (z <= bounds[:, 0:1])
+        )
+        melt = melt_scores[category]
+
+        w = rng.dirichlet(alpha, size)
+        index = w[:, :1] * runoff_norm + w[:, -1:] * melt
+        if has_peak:
+            peak = _normalize(peak_z + rng.normal(0.0, z_sd, (size, rows)), p_lo, p_hi)
+            index += w[:, 1:2] * peak
+
+        level = (index >= FLOOD_RISK_BOUNDS[0]).astype(np.int8) + (index >= FLOOD_RISK_BOUNDS[1])
+        for k in range(len(FLOOD_RISK_LEVELS)):
+            counts[:, k] += (level == k).sum(axis=0)
+        total += index.sum(axis=0)
+        total_sq += (index ** 2).sum(axis=0)
+
+    mean = total / n_draws
+    return {
+        "probability": counts / n_draws,
+        "index_mean": mean,
+        "index_std": np.sqrt(np.clip(total_sq / n_draws - mean ** 2, 0.0, None)),
+    }
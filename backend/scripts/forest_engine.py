@@ -0,0 +1,289 @@
+"""
+forest_engine.py
+Array-packed random forest inference.
+
+A fitted sklearn forest is flattened into contiguous NumPy arrays
+(feature, threshold, left, right, value, one root per tree) and scored
+by a parallel Numba kernel over float32 inputs. Each thread takes one
+large block of rows and walks it through one tree at a time, so the
+upper levels of the tree being scored stay in cache, and advances
+LANES rows in lockstep so their memory loads overlap. Packed forests are
+saved as plain .npz files, so serving code can load a model without
+unpickling sklearn objects.
+
+Results match sklearn bit for bit: inputs are cast to float32 and
+compared against float64 thresholds exactly as sklearn's tree code does,
+and per-tree outputs are summed in tree order before averaging.
+
+predict_intervals scores chunks of rows into a (trees x rows) float32
+buffer in the same pass as the mean and summarizes each column into
+the ensemble spread and quantiles of the per-tree outputs.
+"""
+
+import numpy as np
+
+try:
+    from numba import njit, prange, get_num_threads
+    HAVE_NUMBA = True
+except ImportError:  # pure NumPy fallback below
+    HAVE_NUMBA = False
+
+FORMAT_VERSION = 1
+LEAF = -1
+
+# Rows walked through a tree in lockstep
+LANES = 8
+
+# Smallest row block a thread scores against one tree before moving to
+# the next tree (small blocks re-fetch every tree from memory per block)
+MIN_ROW_BLOCK = 4096
+
+# Rows per block for the NumPy fallback (memory ~ rows * trees * 8 bytes)
+FALLBACK_CHUNK = 8192
+
+# Per-tree output buffered at once by predict_intervals
+INTERVAL_CHUNK_BYTES = 64 << 20
+DEFAULT_QUANTILES = (0.05, 0.5, 0.95)
+
+
+# -----------------------------
+# PACKING
+# -----------------------------
+def pack_forest(model, feature_names=None):
+    """
+    Flatten a fitted RandomForestRegressor (or a model_backends wrapper
+    around one) into contiguous arrays.
+    """
+    model = getattr(model, "model", model)
+    trees = [e.tree_ for e in model.estimators_]
+
+    counts = np.array([t.node_count for t in trees], dtype=np.int64)
+    roots = np.concatenate([[0], np.cumsum(counts)[:-1]]).astype(np.int64)
+
+    def children(attr):
+        parts = []
+        for t, off in zip(trees, roots):
+            c = getattr(t, attr).astype(np.int64)
+            parts.append(np.where(c == LEAF, LEAF, c + off))
+        return np.concatenate(parts)
+
+    if feature_names is None:
+        feature_names = getattr(model, "feature_names_in_", None)
+
+    return {
+        "format_version": np.int64(FORMAT_VERSION),
+        "n_features": np.int64(model.n_features_in_),
+        "roots": roots,
+        "feature": np.concatenate([t.feature for t in trees]).astype(np.int32),
+        "threshold": np.concatenate([t.threshold for t in trees]).astype(np.float64),
+        "left": children("children_left").astype(np.int32),
+        "right": children("children_right").astype(np.int32),
+        "value": np.concatenate([t.value[:, 0, 0] for t in trees]).astype(np.float64),
+        "feature_names": np.asarray(
+            feature_names if feature_names is not None else [], dtype=str
+        ),
+    }
+
+
+def save_packed(path, packed):
+    np.savez(path, **packed)
+
+
+def load_packed(path):
+    """Load a packed forest (no pickle involved)."""
+    with np.load(path, allow_pickle=False) as data:
+        packed = {k: data[k] for k in data.files}
+    if int(packed["format_version"]) != FORMAT_VERSION:
+        raise ValueError(f"❌ Unsupported packed forest version in {path}")
+    return packed
+
+
+# -----------------------------
+# KERNELS
+# -----------------------------
+if HAVE_NUMBA:
+    @njit(inline="always", cache=True)
+    def _walk(X, start, k, root, feature, threshold, left, right, cur):
+        """Leaf of rows start..start+k-1 in one tree, written to cur[:k]."""
+        for j in range(k):
+            cur[j] = root
+        active = k
+        while active > 0:
+            active = 0
+            for j in range(k):
+                node = cur[j]
+                if left[node] != -1:
+                    if X[start + j, feature[node]] <= threshold[node]:
+                        cur[j] = left[node]
+                    else:
+                        cur[j] = right[node]
+                    active += 1
+
+    @njit(parallel=True, cache=True)
+    def _predict_numba(X, feature, threshold, left, right, value, roots, block):
+        n = X.shape[0]
+        n_trees = roots.shape[0]
+        out = np.zeros(n, dtype=np.float64)
+        n_blocks = (n + block - 1) // block
+        for b in prange(n_blocks):
+            lo = b * block
+            hi = min(lo + block, n)
+            cur = np.empty(LANES, dtype=np.int64)
+            for t in range(n_trees):
+                for s in range(lo, hi, LANES):
+                    k = min(LANES, hi - s)
+                    _walk(X, s, k, roots[t], feature, threshold, left, right, cur)
+                    for j in range(k):
+                        out[s + j] += value[cur[j]]
+            for i in range(lo, hi):
+                out[i] /= n_trees
+        return out
+
+    @njit(parallel=True, cache=True)
+    def _per_tree_numba(X, feature, threshold, left, right, value, roots, block):
+        n = X.shape[0]
+        n_trees = roots.shape[0]
+        out = np.empty((n_trees, n), dtype=np.float32)
+        mean = np.zeros(n, dtype=np.float64)
+        n_blocks = (n + block - 1) // block
+        for b in prange(n_blocks):
+            lo = b * block
+            hi = min(lo + block, n)
+            cur = np.empty(LANES, dtype=np.int64)
+            for t in range(n_trees):
+                for s in range(lo, hi, LANES):
+                    k = min(LANES, hi - s)
+                    _walk(X, s, k, roots[t], feature, threshold, left, right, cur)
+                    for j in range(k):
+                        out[t, s + j] = value[cur[j]]
+                        mean[s + j] += value[cur[j]]
+            for i in range(lo, hi):
+                mean[i] /= n_trees
+        return out, mean
+
+
+def _leaves_numpy(X, packed):
+    """Leaf index per (tree, row), walking all trees level by level."""
+    feature, threshold = packed["feature"], packed["threshold"]
+    left, right = packed["left"], packed["right"]
+
+    node = np.repeat(packed["roots"][:, None], len(X), axis=1)
+    rows = np.arange(len(X))[None, :]
+    active = left[node] != LEAF
+    while active.any():
+        x = X[rows, feature[node]]
+        step = np.where(x <= threshold[node], left[node], right[node])
+        node = np.where(active, step, node)
+        active = left[node] != LEAF
+    return node
+
+
+def _row_block(n):
+    """One contiguous block of rows per thread, but never tiny blocks."""
+    return max(MIN_ROW_BLOCK, -(-n // get_num_threads()))
+
+
+def _prepare(X, packed):
+    X = np.ascontiguousarray(X, dtype=np.float32)
+    if X.ndim != 2 or X.shape[1] != int(packed["n_features"]):
+        raise ValueError(
+            f"❌ Expected {int(packed['n_features'])} features, got shape {X.shape}"
+        )
+    return X
+
+
+# -----------------------------
+# PUBLIC API
+# -----------------------------
+def predict(packed, X):
+    """Forest mean prediction for every row of X (float64)."""
+    X = _prepare(X, packed)
+    args = (packed["feature"], packed["threshold"], packed["left"],
+            packed["right"], packed["value"], packed["roots"])
+
+    if HAVE_NUMBA:
+        return _predict_numba(X, *args, _row_block(len(X)))
+
+    n_trees = len(packed["roots"])
+    out = np.empty(len(X), dtype=np.float64)
+    for lo in range(0, len(X), FALLBACK_CHUNK):
+        leaves = _leaves_numpy(X[lo:lo + FALLBACK_CHUNK], packed)
+        vals = packed["value"][leaves]
+        acc = np.zeros(vals.shape[1])
+        for t in range(n_trees):  # tree order, as sklearn sums
+            acc += vals[t]
+        out[lo:lo + FALLBACK_CHUNK] = acc / n_trees
+    return out
+
+
+def _per_tree(X, packed):
+    """(trees x rows float32 outputs, float64 mean) of prepared X."""
+    if HAVE_NUMBA:
+        return _per_tree_numba(
+            X, packed["feature"], packed["threshold"], packed["left"],
+            packed["right"], packed["value"], packed["roots"], _row_block(len(X)),
+        )
+
+    n_trees = len(packed["roots"])
+    out = np.empty((n_trees, len(X)), dtype=np.float32)
+    mean = np.empty(len(X), dtype=np.float64)
+    for lo in range(0, len(X), FALLBACK_CHUNK):
+        vals = packed["value"][_leaves_numpy(X[lo:lo + FALLBACK_CHUNK], packed)]
+        out[:, lo:lo + FALLBACK_CHUNK] = vals
+        acc = np.zeros(vals.shape[1])
+        for t in range(n_trees):  # tree order, as sklearn sums
+            acc += vals[t]
+        mean[lo:lo + FALLBACK_CHUNK] = acc / n_trees
+    return out, mean
+
+
+def predict_per_tree(packed, X):
+    """Every tree's output as a (trees x rows) float32 matrix."""
+    return _per_tree(_prepare(X, packed), packed)[0]
+
+
+def quantile_names(quantiles):
+    """Column suffixes of quantiles: 0.05 -> "p05", 0.5 -> "p50", 0.025 -> "p2_5"."""
+    return [f"p{q * 100:02g}".replace(".", "_") for q in quantiles]
+
+
+def predict_intervals(packed, X, quantiles=DEFAULT_QUANTILES, chunk_bytes=INTERVAL_CHUNK_BYTES):
+    """
+    Forest mean with the spread of the per-tree outputs, for every row of X.
+
+    Rows are scored in chunks whose (trees x rows) float32 buffer fits in
+    `chunk_bytes`; each tree is walked once per row. Returns
+      mean       (rows,) float64, identical to predict()
+      std        (rows,) standard deviation across trees
+      quantiles  (len(quantiles), rows) quantiles across trees
+    The quantiles describe the disagreement between the trees, not the
+    full predictive distribution (residual noise is not included).
+    """
+    X = _prepare(X, packed)
+    n_trees = len(packed["roots"])
+    step = max(1, chunk_bytes // (4 * n_trees))
+
+    mean = np.empty(len(X), dtype=np.float64)
+    std = np.empty(len(X), dtype=np.float64)
+    qs = np.empty((len(quantiles), len(X)), dtype=np.float64)
+    for lo in range(0, len(X), step):
+        trees, mean[lo:lo + step] = _per_tree(X[lo:lo + step], packed)
+        std[lo:lo + step] = trees.std(axis=0, dtype=np.float64)
+        if len(quantiles):
+            qs[:, lo:lo + step] = np.quantile(trees, quantiles, axis=0)
+    return {"mean": mean, "std": std, "quantiles": qs}
+
+
+def validate(packed, model, X, atol=1e-12):
+    """
+    Compare packed predictions with sklearn's on X.
+    Returns (bit_exact, max_abs_diff); raises if outside `atol`.
+    """
+    model = getattr(model, "model", model)
+    ours = predict(packed, X)
+    ref = model.predict(np.asarray(X, dtype=np.float32))
+
+    diff = float(np.max(np.abs(ours - ref))) if len(ref) else 0.0
+    if diff > atol:
+        raise AssertionError(f"❌ Packed forest differs from sklearn by {diff}")
+    return bool(np.array_equal(ours, ref)), diff
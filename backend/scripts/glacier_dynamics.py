@@ -0,0 +1,38 @@
+"""
+glacier_dynamics.py
+Glacier area and volume change under a yearly mass balance.
+
+Volume follows area by the volume–area scaling relation (Bahr et al. 1997)
+
+    V = C * A ** GAMMA          V in km³, A in km²
+
+Each year the specific mass balance b (m w.e.) of a glacier changes its
+ice volume by b * A / 1000 * RHO_WATER / RHO_ICE km³, and its new area
+follows from the new volume. All functions take whole arrays (every
+glacier of every scenario) and advance them together.
+"""
+
+import numpy as np
+
+C = 0.034       # km^(3 - 2 * GAMMA)
+GAMMA = 1.375
+RHO_ICE = 900.0     # kg m-3
+RHO_WATER = 1000.0  # kg m-3
+
+
+def volume_from_area(area_km2):
+    return C * np.power(np.clip(area_km2, 0.0, None), GAMMA)
+
+
+def area_from_volume(volume_km3):
+    return np.power(np.clip(volume_km3, 0.0, None) / C, 1.0 / GAMMA)
+
+
+def step(area_km2, volume_km3, balance_mwe):
+    """
+    One year of mass balance: (new area, new volume). A glacier whose
+    volume runs out stays at zero; a missing balance leaves it unchanged.
+    """
+    dv = np.nan_to_num(balance_mwe) * area_km2 * 1e-3 * RHO_WATER / RHO_ICE
+    volume = np.maximum(volume_km3 + dv, 0.0)
+    return area_from_volume(volume), volume
@@ -0,0 +1,126 @@
+"""
+glacier_geometry.py
+Per-glacier geometry attributes from RGI outlines.
+
+The outlines are reprojected once, to the EASE-Grid 2.0 equal-area
+projection (EPSG:6933), and everything is derived from that copy in
+vectorized shapely 2 calls:
+
+    area_km2, perimeter_km      measured in the equal-area plane
+    lat, lon                    equal-area centroid, back in EPSG:4326
+    min_lon .. max_lat          bounding box, back in EPSG:4326
+
+EPSG:6933 is cylindrical (x depends only on longitude, y only on
+latitude), so the corners of the projected bounding box map exactly to
+the geographic one. Results are cached per outline file content
+(derive_cached), so re-runs on unchanged inputs skip reading the
+geometries altogether.
+"""
+
+import functools
+import glob
+import hashlib
+import os
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import shapely
+from pyproj import CRS, Transformer
+
+EQUAL_AREA = "EPSG:6933"
+GEOGRAPHIC = "EPSG:4326"
+
+# Bump when the derived columns change, to invalidate existing caches
+GEOMETRY_VERSION = 1
+
+COLUMNS = [
+    "glacier_id", "lat", "lon", "area_km2", "perimeter_km",
+    "min_lon", "min_lat", "max_lon", "max_lat",
+]
+
+
+@functools.lru_cache(maxsize=None)
+def transformer(src, dst):
+    """Transformer between two CRS (lon/lat order), created once per pair."""
+    return Transformer.from_crs(src, dst, always_xy=True)
+
+
+# -----------------------------
+# DERIVE
+# -----------------------------
+def derive(geoms, crs):
+    """
+    Geometry attributes of `geoms` (array of shapely geometries in `crs`)
+    as a dict of NumPy columns.
+    """
+    geoms = np.asarray(geoms, dtype=object)
+    crs = CRS.from_user_input(crs)
+    if crs != CRS.from_user_input(EQUAL_AREA):
+        fwd = transformer(crs.to_string(), EQUAL_AREA)
+        geoms = shapely.transform(geoms, fwd.transform, interleaved=False)
+
+    back = transformer(EQUAL_AREA, GEOGRAPHIC)
+
+    centroids = shapely.centroid(geoms)
+    lon, lat = back.transform(shapely.get_x(centroids), shapely.get_y(centroids))
+
+    bounds = shapely.bounds(geoms)
+    min_lon, min_lat = back.transform(bounds[:, 0], bounds[:, 1])
+    max_lon, max_lat = back.transform(bounds[:, 2], bounds[:, 3])
+
+    return {
+        "lat": lat,
+        "lon": lon,
+        "area_km2": shapely.area(geoms) / 1e6,
+        "perimeter_km": shapely.length(geoms) / 1e3,
+        "min_lon": min_lon,
+        "min_lat": min_lat,
+        "max_lon": max_lon,
+        "max_lat": max_lat,
+    }
+
+
+def derive_file(path, id_col="rgi_id"):
+    """Geometry table (COLUMNS) of one outline file."""
+    gdf = gpd.read_file(path)
+    gdf.columns = gdf.columns.str.lower()
+    if gdf.crs is None:
+        raise ValueError(f"❌ {path} has no CRS")
+
+    table = pd.DataFrame({"glacier_id": gdf[id_col].to_numpy()})
+    for col, values in derive(gdf.geometry.to_numpy(), gdf.crs).items():
+        table[col] = values
+    return table[COLUMNS]
+
+
+# -----------------------------
+# CACHE
+# -----------------------------
+def input_hash(path):
+    """Hash of a shapefile and its sidecar files (.dbf, .shx, .prj, ...)."""
+    stem = os.path.splitext(path)[0]
+    h = hashlib.sha256(f"v{GEOMETRY_VERSION}".encode())
+    for part in sorted(glob.glob(glob.escape(stem) + ".*")):
+        h.update(os.path.basename(part).encode())
+        with open(part, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                h.update(block)
+    return h.hexdigest()[:32]
+
+
+def derive_cached(path, cache_dir):
+    """
+    derive_file(path), reusing <cache_dir>/<input hash>.parquet when the
+    outlines have not changed. Returns (table, cache hit).
+    """
+    cache_file = os.path.join(cache_dir, f"{input_hash(path)}.parquet")
+    if os.path.exists(cache_file):
+        return pd.read_parquet(cache_file), True
+
+    table = derive_file(path)
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp = cache_file + ".tmp"
+    table.to_parquet(tmp, index=False)
+    os.replace(tmp, cache_file)
+    return table, False
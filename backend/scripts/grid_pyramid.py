@@ -0,0 +1,91 @@
+"""
+grid_pyramid.py
+Multi-resolution glacier aggregates on a Web Mercator quadtree.
+
+Cell (level, x, y) is slippy-map tile (x, y) at zoom `level`, so every
+cell splits into four children at level + 1 and lines up with the web
+map's own tiles. Each cell holds the glacier count, total area, mean
+predicted_melt, mean position and the risk-level mix of the glaciers
+inside it.
+
+The pyramid is a single table sorted by (level, key) with
+key = y * 2**level + x, so the cells of a level are one contiguous
+slice and any cell is found by binary search.
+"""
+
+import numpy as np
+import pyarrow as pa
+
+MIN_LEVEL = 0
+MAX_LEVEL = 16          # ~600 m cells at the equator
+MAX_LAT = 85.05112878   # Web Mercator limit
+
+RISK_LEVELS = ["High", "Medium", "Low"]
+RISK_COLUMNS = [f"risk_{r.lower()}" for r in RISK_LEVELS] + ["risk_unknown"]
+
+
+def tile_xy(lat, lon, level):
+    """Integer tile coordinates of points at `level` (vectorized)."""
+    n = 2 ** level
+    lat = np.radians(np.clip(lat, -MAX_LAT, MAX_LAT))
+    x = np.floor((np.asarray(lon) + 180.0) / 360.0 * n)
+    y = np.floor((1.0 - np.arcsinh(np.tan(lat)) / np.pi) / 2.0 * n)
+    return np.clip(x, 0, n - 1).astype(np.int64), np.clip(y, 0, n - 1).astype(np.int64)
+
+
+def build_pyramid(df, min_level=MIN_LEVEL, max_level=MAX_LEVEL):
+    """
+    Aggregate a glacier table (lat, lon, area_km2, predicted_melt,
+    risk_level) into every level from min_level to max_level.
+    """
+    df = df.dropna(subset=["lat", "lon"])
+    lat = df["lat"].to_numpy(dtype=np.float64)
+    lon = df["lon"].to_numpy(dtype=np.float64)
+    area = np.nan_to_num(df["area_km2"].to_numpy(dtype=np.float64))
+    melt = df["predicted_melt"].to_numpy(dtype=np.float64)
+    has_melt = np.isfinite(melt)
+    melt = np.where(has_melt, melt, 0.0)
+
+    risk = np.full(len(df), len(RISK_LEVELS))
+    for i, level_name in enumerate(RISK_LEVELS):
+        risk[(df["risk_level"] == level_name).to_numpy()] = i
+
+    # Finest tiles once; coarser levels are bit shifts of them
+    fx, fy = tile_xy(lat, lon, max_level)
+
+    parts = []
+    for level in range(min_level, max_level + 1):
+        shift = max_level - level
+        key = (fy >> shift) * (1 << level) + (fx >> shift)
+        cells, inv = np.unique(key, return_inverse=True)
+        m = len(cells)
+
+        count = np.bincount(inv, minlength=m)
+        melt_n = np.bincount(inv, weights=has_melt, minlength=m)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean_melt = np.bincount(inv, weights=melt, minlength=m) / melt_n
+
+        risk_counts = np.bincount(
+            inv * len(RISK_COLUMNS) + risk, minlength=m * len(RISK_COLUMNS)
+        ).reshape(m, len(RISK_COLUMNS))
+
+        part = {
+            "level": np.full(m, level, dtype=np.int8),
+            "key": cells,
+            "x": (cells % (1 << level)).astype(np.int32),
+            "y": (cells // (1 << level)).astype(np.int32),
+            "count": count.astype(np.int32),
+            "area_km2": np.bincount(inv, weights=area, minlength=m),
+            "mean_predicted_melt": mean_melt,
+            "lat": np.bincount(inv, weights=lat, minlength=m) / count,
+            "lon": np.bincount(inv, weights=lon, minlength=m) / count,
+        }
+        for j, col in enumerate(RISK_COLUMNS):
+            part[col] = risk_counts[:, j].astype(np.int32)
+        parts.append(part)
+
+    # from_pandas: cells without a melt value get null, not NaN
+    return pa.table({
+        col: pa.array(np.concatenate([p[col] for p in parts]), from_pandas=True)
+        for col in parts[0]
+    })
@@ -1,28 +1,17 @@
-import os
+import re
+
 import pandas as pd
 
-# ===============================
-# CORRECT PROJECT ROOT (2 levels up)
-# ===============================
-SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
-BACKEND_DIR = os.path.dirname(SCRIPT_DIR)
-PROJECT_ROOT = os.path.dirname(BACKEND_DIR)
+from run_config import load_config, find_table
 
-DATA_DIR = os.path.join(PROJECT_ROOT, "data", "processed")
-OUT_FILE = os.path.join(DATA_DIR, "glacier_explorer_merged.csv")
+cfg = load_config()
 
-print(f"📂 Script dir: {SCRIPT_DIR}")
-print(f"📂 Backend dir: {BACKEND_DIR}")
-print(f"📂 Project root: {PROJECT_ROOT}")
-print(f"📂 Data directory: {DATA_DIR}")
+print(f"📂 Data directory: {cfg.processed_dir}")
 
 # ===============================
 # 1. LOAD BASE GLACIER DATA
 # ===============================
-base_path = os.path.join(DATA_DIR, "glacier_master_with_area.csv")
-assert os.path.exists(base_path), f"❌ File not found: {base_path}"
-
-base = pd.read_csv(base_path)
+base = cfg.read_table("glacier_master_with_area")
 base.columns = base.columns.str.lower()
 
 # Ensure lat/lon
@@ -45,18 +34,24 @@ print(f"✅ Base glaciers loaded: {len(base)}")
 # ===============================
 # 2. LOAD OTHER DATASETS
 # ===============================
-def load_csv(filename):
-    path = os.path.join(DATA_DIR, filename)
-    assert os.path.exists(path), f"❌ Missing file: {filename}"
-    df = pd.read_csv(path)
+def load_table(name):
+    df = cfg.read_table(name)
     df.columns = df.columns.str.lower()
-    print(f"✅ Loaded {filename} ({len(df)})")
+    print(f"✅ Loaded {name} ({len(df)})")
     return df
 
-climate = load_csv("climate_features.csv")
-melt = load_csv("extreme_melt_years.csv")
-flood = load_csv("flood_risk_index.csv")
-future = load_csv("future_melt_projection.csv")
+climate = load_table("climate_features")
+melt = load_table("extreme_melt_years")
+flood = load_table("flood_risk_index")
+future = load_table("future_melt_projection")
+
+# The explorer shows the primary scenario only
+if "scenario" in future.columns:
+    future = future[future["scenario"] == cfg.primary_scenario].drop(columns="scenario")
+
+# Optional: per-glacier trends from 07_trend_analysis.py
+has_trends = find_table(cfg.processed_dir, "glacier_trends", cfg.output_format)
+trends = load_table("glacier_trends") if has_trends else None
 
 # ===============================
 # 3. LATEST RECORDS
@@ -70,12 +65,35 @@ if "year" in flood.columns:
 if "year" in future.columns:
     future = future.sort_values("year").groupby("glacier_id").tail(1)
 
+# Projection outputs only; its feature columns (area_km2, temp_mean, ...)
+# would shadow the observed ones. With dynamic geometry the last year's
+# area and volume are kept as the projected glacier size.
+projected_cols = []
+if "volume_km3" in future.columns:
+    future = future.rename(columns={
+        "area_km2": "projected_area_km2", "volume_km3": "projected_volume_km3",
+    })
+    projected_cols = ["projected_area_km2", "projected_volume_km3"]
+future = future[
+    ["glacier_id"] + [c for c in future.columns if c.startswith("predicted_melt")] + projected_cols
+]
+
 # ===============================
 # 4. MERGE (BASE FIRST)
 # ===============================
+# Position and area come from the base table
+climate = climate[["glacier_id"] + [c for c in climate.columns if c not in base.columns]]
 df = base.merge(climate, on="glacier_id", how="left")
 df = df.merge(future, on="glacier_id", how="left")
 
+if trends is not None:
+    df = df.merge(
+        trends[["glacier_id", "mass_change_trend_per_year", "mk_p_value"]]
+        .rename(columns={"mk_p_value": "trend_p_value"}),
+        on="glacier_id",
+        how="left"
+    )
+
 if "basin" in df.columns:
     df = df.merge(
         melt[["basin", "melt_category"]],
@@ -104,7 +122,7 @@ df["flood_risk_level"] = df["flood_risk_level"].fillna("Unknown")
 # ===============================
 # 6. GLACIER-LEVEL RISK LOGIC
 # ===============================
-def compute_risk(row):
+def compute_risk(row, melt_col="predicted_melt"):
     score = 0
 
     if pd.notna(row["temp_mean"]):
@@ -113,10 +131,10 @@ def compute_risk(row):
         elif row["temp_mean"] > -1:
             score += 1
 
-    if pd.notna(row["predicted_melt"]):
-        if row["predicted_melt"] < -0.6:
+    if pd.notna(row[melt_col]):
+        if row[melt_col] < -0.6:
             score += 2
-        elif row["predicted_melt"] < -0.3:
+        elif row[melt_col] < -0.3:
             score += 1
 
     if pd.notna(row["area_km2"]) and row["area_km2"] < 5:
@@ -136,6 +154,18 @@ def compute_risk(row):
 
 df["risk_level"] = df.apply(compute_risk, axis=1)
 
+# Same rules at both ends of the melt interval (08_future_melt_projection.py):
+# the lowest quantile is the most melt, hence the highest plausible risk
+quantile_cols = sorted(
+    (c for c in df.columns if re.fullmatch(r"predicted_melt_p[\d_]+", c)),
+    key=lambda c: float(c[len("predicted_melt_p"):].replace("_", ".")),
+)
+if len(quantile_cols) >= 2:
+    df["risk_level_max"] = df.apply(compute_risk, axis=1, melt_col=quantile_cols[0])
+    df["risk_level_min"] = df.apply(compute_risk, axis=1, melt_col=quantile_cols[-1])
+    print(f"Risk interval from {quantile_cols[0]} .. {quantile_cols[-1]}: "
+          f"{(df['risk_level_min'] != df['risk_level_max']).mean():.1%} of glaciers uncertain")
+
 # ===============================
 # 7. EXPORT
 # ===============================
@@ -151,6 +181,14 @@ final_cols = [
     "risk_level"
 ]
 
+if trends is not None:
+    final_cols += ["mass_change_trend_per_year", "trend_p_value"]
+
+if "risk_level_max" in df.columns:
+    final_cols += ["predicted_melt_std"] + quantile_cols + ["risk_level_min", "risk_level_max"]
+
+final_cols += projected_cols
+
 # ===============================
 # FIX LAT / LON AFTER MERGES
 # ===============================
@@ -177,8 +215,8 @@ df.drop(
 assert "lat" in df.columns and "lon" in df.columns, "❌ lat/lon still missing after merge"
 
 df_final = df[final_cols].dropna(subset=["lat", "lon"])
-df_final.to_csv(OUT_FILE, index=False)
+out_file = cfg.write_table(df_final, "glacier_explorer_merged")
 
 print("🎉 MERGE COMPLETE")
-print(f"📄 Saved: {OUT_FILE}")
+print(f"📄 Saved: {out_file}")
 print(df_final["risk_level"].value_counts())
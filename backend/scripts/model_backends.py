@@ -0,0 +1,172 @@
+"""
+model_backends.py
+Interchangeable regressors for the melt model (stages 08 and 10).
+
+Every backend has the same interface:
+    fit(X, y) -> self
+    predict(X) -> ndarray
+    explain(X, y) -> normalized importance per feature
+    complexity() -> rough inference cost (tree nodes / coefficients)
+    size_bytes() -> pickled size
+"""
+
+import pickle
+from abc import ABC, abstractmethod
+
+import numpy as np
+import joblib
+from sklearn.ensemble import RandomForestRegressor, HistGradientBoostingRegressor
+from sklearn.inspection import permutation_importance
+from sklearn.linear_model import Ridge
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import StandardScaler
+
+import forest_engine
+
+DEFAULT_BACKEND = "random_forest"
+
+
+# -----------------------------
+# BASE
+# -----------------------------
+class MeltModel(ABC):
+    name = None
+    defaults = {}
+
+    def __init__(self, **params):
+        self.params = {**self.defaults, **params}
+        self.model = self._build(self.params)
+
+    @abstractmethod
+    def _build(self, params):
+        """Unfitted estimator for the merged parameters."""
+
+    def fit(self, X, y):
+        self.model.fit(np.asarray(X, dtype=np.float64), np.asarray(y, dtype=np.float64))
+        return self
+
+    def predict(self, X):
+        return self.model.predict(np.asarray(X, dtype=np.float64))
+
+    def explain(self, X, y):
+        result = permutation_importance(
+            self.model,
+            np.asarray(X, dtype=np.float64),
+            np.asarray(y, dtype=np.float64),
+            n_repeats=5,
+            random_state=0,
+        )
+        return _normalize(np.clip(result.importances_mean, 0, None))
+
+    @abstractmethod
+    def complexity(self):
+        """Rough inference cost of the fitted model."""
+
+    def size_bytes(self):
+        return len(pickle.dumps(self.model, protocol=pickle.HIGHEST_PROTOCOL))
+
+    def save(self, path):
+        joblib.dump(self, path)
+
+    @staticmethod
+    def load(path):
+        return joblib.load(path)
+
+
+def _normalize(values):
+    values = np.asarray(values, dtype=float)
+    total = values.sum()
+    return values / total if total > 0 else values
+
+
+# -----------------------------
+# BACKENDS
+# -----------------------------
+class RandomForestBackend(MeltModel):
+    name = "random_forest"
+    defaults = {"n_estimators": 200, "random_state": 42, "n_jobs": -1}
+
+    packed = None
+
+    def _build(self, params):
+        return RandomForestRegressor(**params)
+
+    def fit(self, X, y):
+        self.packed = None
+        return super().fit(X, y)
+
+    def compile(self, X_check, feature_names=None):
+        """
+        Pack the fitted forest for forest_engine and check it against
+        sklearn on X_check. predict() then uses the packed forest.
+        """
+        packed = forest_engine.pack_forest(self.model, feature_names)
+        exact, diff = forest_engine.validate(packed, self.model, X_check)
+        self.packed = packed
+        return exact, diff
+
+    def predict(self, X):
+        if self.packed is not None:
+            return forest_engine.predict(self.packed, X)
+        return super().predict(X)
+
+    def __getstate__(self):
+        # The packed arrays are saved separately (forest_engine.save_packed)
+        state = dict(self.__dict__)
+        state.pop("packed", None)
+        return state
+
+    def explain(self, X, y):
+        # Impurity importance comes free with the fitted forest
+        return _normalize(self.model.feature_importances_)
+
+    def complexity(self):
+        return int(sum(e.tree_.node_count for e in self.model.estimators_))
+
+
+class HistGradientBoostingBackend(MeltModel):
+    name = "hist_gradient_boosting"
+    defaults = {"max_iter": 200, "learning_rate": 0.1, "random_state": 42}
+
+    def _build(self, params):
+        return HistGradientBoostingRegressor(**params)
+
+    def complexity(self):
+        # Exact node count where the fitted trees are reachable (private in
+        # sklearn), otherwise the upper bound set by max_leaf_nodes/max_depth
+        predictors = getattr(self.model, "_predictors", None)
+        if predictors is not None:
+            return int(sum(len(p.nodes) for stage in predictors for p in stage))
+        leaves = self.model.max_leaf_nodes
+        if leaves is None and self.model.max_depth is not None:
+            leaves = 2 ** self.model.max_depth
+        trees = self.model.n_iter_ * self.model.n_trees_per_iteration_
+        return int(trees * (2 * leaves - 1)) if leaves else int(trees)
+
+
+class LinearBackend(MeltModel):
+    name = "linear"
+    defaults = {"alpha": 1.0}
+
+    def _build(self, params):
+        return make_pipeline(StandardScaler(), Ridge(**params))
+
+    def explain(self, X, y):
+        # Coefficients are on standardized inputs, so |coef| is comparable
+        return _normalize(np.abs(self.model[-1].coef_))
+
+    def complexity(self):
+        return int(self.model[-1].coef_.size + 1)
+
+
+BACKENDS = {
+    cls.name: cls
+    for cls in [RandomForestBackend, HistGradientBoostingBackend, LinearBackend]
+}
+
+
+def make_model(name=DEFAULT_BACKEND, **params):
+    """Instantiate a backend by name with parameter overrides."""
+    if name not in BACKENDS:
+        raise ValueError(f"❌ Unknown model backend: {name} (choose from {list(BACKENDS)})")
+    return BACKENDS[name](**params)
@@ -0,0 +1,216 @@
+"""
+model_selection.py
+Spatially grouped cross-validation and successive-halving hyperparameter
+search for the melt regressor (any backend from model_backends.py).
+
+The training matrix is dumped once with joblib and every worker opens it
+memory-mapped, so parallel fits share one copy of the data.
+"""
+
+import os
+import json
+import math
+import shutil
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+import joblib
+from joblib import Parallel, delayed
+from sklearn.model_selection import GroupKFold, ParameterGrid
+
+from model_backends import BACKENDS, DEFAULT_BACKEND, make_model
+
+FEATURES = ["area_km2", "temp_mean", "prec_mean", "srad_mean"]
+TARGET = "mass_change"
+
+
+# -----------------------------
+# FOLDS
+# -----------------------------
+def spatial_groups(lat, lon, block_deg=1.0):
+    """Integer code of the lat/lon block (block_deg x block_deg) of each row."""
+    lat_cell = np.floor(np.asarray(lat, dtype=float) / block_deg).astype(np.int64)
+    lon_cell = np.floor(np.asarray(lon, dtype=float) / block_deg).astype(np.int64)
+    return pd.factorize(pd.Series(lat_cell * 100000 + lon_cell))[0]
+
+
+def fold_ids(groups, n_splits=5):
+    """
+    Test-fold number of every row (GroupKFold: no group is split across
+    folds, so whole glaciers / spatial blocks are held out together).
+    """
+    groups = np.asarray(groups)
+    n_splits = min(n_splits, len(np.unique(groups)))
+    ids = np.empty(len(groups), dtype=np.int8)
+    for k, (_, test) in enumerate(GroupKFold(n_splits=n_splits).split(groups, groups=groups)):
+        ids[test] = k
+    return ids
+
+
+# -----------------------------
+# SINGLE (CONFIG, FOLD) EVALUATION
+# -----------------------------
+def _evaluate(X, y, folds, fold, backend, params, seed):
+    train = folds != fold
+    test = ~train
+
+    # Parallelism comes from the search itself: one thread per fit
+    fixed = {}
+    if "random_state" in BACKENDS[backend].defaults:
+        fixed["random_state"] = seed
+    if "n_jobs" in BACKENDS[backend].defaults:
+        fixed["n_jobs"] = 1
+    model = make_model(backend, **{**params, **fixed})
+
+    t0 = time.perf_counter()
+    model.fit(X[train], y[train])
+    fit_s = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    pred = model.predict(X[test])
+    predict_s = time.perf_counter() - t0
+
+    resid = y[test] - pred
+    ss_res = float(resid @ resid)
+    ss_tot = float(((y[test] - y[test].mean()) ** 2).sum())
+
+    return {
+        "fold": int(fold),
+        "r2": 1 - ss_res / ss_tot if ss_tot > 0 else np.nan,
+        "rmse": math.sqrt(ss_res / max(int(test.sum()), 1)),
+        "fit_s": fit_s,
+        "predict_us_per_row": 1e6 * predict_s / max(int(test.sum()), 1),
+        "n_nodes": model.complexity(),
+    }
+
+
+# -----------------------------
+# SUCCESSIVE HALVING SEARCH
+# -----------------------------
+def successive_halving(
+    X,
+    y,
+    folds,
+    param_grid,
+    backend=DEFAULT_BACKEND,
+    eta=3,
+    tolerance=0.01,
+    n_jobs=-1,
+    seed=42,
+    verbose=True,
+):
+    """
+    Evaluate every config on the first fold, then keep the best 1/eta
+    (plus anything within `tolerance` R² of the rung leader, so cheap
+    configs that are "good enough" survive) and give survivors more
+    folds, until the last rung uses all folds.
+
+    Returns one row per config with its mean / std scores, cost
+    measures and the rung where it stopped.
+    """
+    candidates = list(ParameterGrid(param_grid))
+    n_folds = int(folds.max()) + 1
+
+    tmp_dir = tempfile.mkdtemp(prefix="melt_cv_")
+    try:
+        # One on-disk copy, memory-mapped read-only by every worker
+        path = os.path.join(tmp_dir, "data.joblib")
+        joblib.dump((np.ascontiguousarray(X), np.ascontiguousarray(y), folds), path)
+        X_mm, y_mm, folds_mm = joblib.load(path, mmap_mode="r")
+
+        scores = {i: [] for i in range(len(candidates))}
+        stopped = {}
+        alive = list(range(len(candidates)))
+        done_folds = 0
+        rung = 0
+
+        with Parallel(n_jobs=n_jobs) as parallel:
+            while alive:
+                target_folds = min(n_folds, eta ** rung)
+                new_folds = range(done_folds, target_folds)
+
+                tasks = [(i, k) for i in alive for k in new_folds]
+                results = parallel(
+                    delayed(_evaluate)(X_mm, y_mm, folds_mm, k, backend, candidates[i], seed)
+                    for i, k in tasks
+                )
+                for (i, _), res in zip(tasks, results):
+                    scores[i].append(res)
+                done_folds = target_folds
+
+                mean_r2 = {i: np.nanmean([s["r2"] for s in scores[i]]) for i in alive}
+                if verbose:
+                    print(
+                        f"Rung {rung}: {len(alive)} configs x {done_folds} folds, "
+                        f"best R²={max(mean_r2.values()):.4f}"
+                    )
+
+                if done_folds >= n_folds:
+                    for i in alive:
+                        stopped[i] = rung
+                    break
+
+                ranked = sorted(alive, key=lambda i: mean_r2[i], reverse=True)
+                keep = set(ranked[:max(1, math.ceil(len(ranked) / eta))])
+                best = mean_r2[ranked[0]]
+                keep |= {i for i in alive if mean_r2[i] >= best - tolerance}
+
+                for i in alive:
+                    if i not in keep:
+                        stopped[i] = rung
+                alive = [i for i in alive if i in keep]
+                rung += 1
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    rows = []
+    for i, params in enumerate(candidates):
+        s = pd.DataFrame(scores[i])
+        rows.append({
+            "params": json.dumps(params, sort_keys=True),
+            **{f"param_{k}": v for k, v in params.items()},
+            "folds_evaluated": len(s),
+            "stopped_at_rung": stopped[i],
+            "fully_evaluated": len(s) == n_folds,
+            "mean_r2": s["r2"].mean(),
+            "std_r2": s["r2"].std(ddof=0),
+            "mean_rmse": s["rmse"].mean(),
+            "fit_s": s["fit_s"].mean(),
+            "predict_us_per_row": s["predict_us_per_row"].mean(),
+            "n_nodes": int(s["n_nodes"].mean()),
+        })
+
+    return pd.DataFrame(rows).sort_values("mean_r2", ascending=False)
+
+
+def select_cheapest(results, target_r2=None, tolerance=0.01):
+    """
+    Cheapest fully evaluated config (fewest tree nodes, i.e. smallest and
+    fastest to score) whose mean R² reaches `target_r2`, or lies within
+    `tolerance` of the best config when no absolute target is given.
+    """
+    full = results[results["fully_evaluated"]]
+    if target_r2 is None:
+        target_r2 = full["mean_r2"].max() - tolerance
+
+    ok = full[full["mean_r2"] >= target_r2]
+    if ok.empty:
+        ok = full.nlargest(1, "mean_r2")
+
+    best = ok.sort_values(["n_nodes", "fit_s"]).iloc[0]
+    return json.loads(best["params"]), float(target_r2), best
+
+
+def load_selected_model(path, default_backend=DEFAULT_BACKEND):
+    """
+    (backend, params) chosen by 08_model_evaluation.py, or the default
+    backend with its default parameters.
+    """
+    if not os.path.exists(path):
+        return default_backend, {}
+    with open(path) as f:
+        selected = json.load(f)
+
+    return selected.get("model", default_backend), selected.get("params", {})
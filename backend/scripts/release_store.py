@@ -0,0 +1,224 @@
+"""
+release_store.py
+Immutable, versioned releases of the served artifacts.
+
+14_publish_release.py copies what the web server reads (Arrow datasets,
+timeseries store, models) into a new directory and then flips a pointer:
+
+    <processed_dir>/releases/
+        CURRENT                     name of the live release (one line)
+        20261019T120000Z-3f2a9c1e/
+            manifest.json           version, files (sha256, bytes), row counts
+            arrow/<name>.arrow
+            timeseries/...
+            models/...
+
+A release directory is complete before it gets its final name
+(os.rename of a hidden build directory) and is never modified
+afterwards. CURRENT is replaced with os.replace, so a reader sees the
+old release or the new one, never a mix. Servers poll CURRENT
+(current_release) and swap to the new release once it is warmed up.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import time
+
+import pyarrow as pa
+
+RELEASES_DIR = "releases"
+POINTER_FILE = "CURRENT"
+MANIFEST_FILE = "manifest.json"
+FORMAT_VERSION = 1
+
+# Published releases kept on disk (the live one is never removed)
+KEEP_RELEASES = 3
+
+
+class ReleaseError(RuntimeError):
+    """A release is missing, incomplete or does not match its manifest."""
+
+
+def releases_dir(data_dir):
+    return os.path.join(data_dir, RELEASES_DIR)
+
+
+# -----------------------------
+# MANIFEST
+# -----------------------------
+def file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def arrow_rows(path):
+    with pa.memory_map(path, "r") as source:
+        reader = pa.ipc.open_file(source)
+        return sum(reader.get_batch(i).num_rows for i in range(reader.num_record_batches))
+
+
+def describe_tree(root):
+    """{relative path: {"sha256", "bytes"}} of every file under root."""
+    files = {}
+    for dirpath, _, names in os.walk(root):
+        for name in sorted(names):
+            path = os.path.join(dirpath, name)
+            rel = os.path.relpath(path, root).replace(os.sep, "/")
+            files[rel] = {"sha256": file_sha256(path), "bytes": os.path.getsize(path)}
+    return dict(sorted(files.items()))
+
+
+def content_hash(files):
+    h = hashlib.sha256()
+    for rel, info in sorted(files.items()):
+        h.update(f"{rel}\0{info['sha256']}\n".encode())
+    return h.hexdigest()
+
+
+def read_manifest(path):
+    with open(os.path.join(path, MANIFEST_FILE)) as f:
+        manifest = json.load(f)
+    if manifest.get("format_version") != FORMAT_VERSION:
+        raise ReleaseError(f"❌ Unsupported release format in {path}")
+    return manifest
+
+
+def verify_release(path):
+    """Re-hash every file of a release against its manifest; raises on mismatch."""
+    manifest = read_manifest(path)
+    actual = describe_tree(path)
+    actual.pop(MANIFEST_FILE, None)
+    expected = manifest["files"]
+    if actual != expected:
+        changed = sorted(k for k in set(actual) | set(expected) if actual.get(k) != expected.get(k))
+        raise ReleaseError(f"❌ Release {manifest['version']} does not match its manifest: {changed[:10]}")
+    return manifest
+
+
+# -----------------------------
+# POINTER
+# -----------------------------
+def current_release(data_dir):
+    """(version, path) of the live release, or None if nothing was published."""
+    pointer = os.path.join(releases_dir(data_dir), POINTER_FILE)
+    try:
+        with open(pointer) as f:
+            version = f.read().strip()
+    except FileNotFoundError:
+        return None
+    if not version:
+        return None
+    return version, os.path.join(releases_dir(data_dir), version)
+
+
+def set_current(data_dir, version):
+    pointer = os.path.join(releases_dir(data_dir), POINTER_FILE)
+    tmp = f"{pointer}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        f.write(version + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, pointer)
+
+
+# -----------------------------
+# PUBLISH
+# -----------------------------
+def _link_or_copy(src, dst, link):
+    if link:
+        try:
+            os.link(src, dst)
+            return
+        except OSError:
+            pass
+    shutil.copy2(src, dst)
+
+
+def _copy_tree(src, dst, link):
+    for dirpath, _, names in os.walk(src):
+        target = os.path.join(dst, os.path.relpath(dirpath, src))
+        os.makedirs(target, exist_ok=True)
+        for name in names:
+            if not name.endswith(".tmp"):
+                _link_or_copy(os.path.join(dirpath, name), os.path.join(target, name), link)
+
+
+def publish_release(data_dir, sources, datasets, links=(), metadata=None):
+    """
+    Publish a release of data_dir and make it current.
+
+    sources:  {name in the release: file or directory to copy}
+    datasets: {dataset name: relative path of its Arrow file}, counted
+              into the manifest's row counts
+    links:    sources whose files are only ever replaced (os.replace,
+              fresh directories), never rewritten in place; they are
+              hard-linked into the release instead of copied
+    Returns (version, path, published): published is False when the
+    content is identical to the current release, which is kept.
+    """
+    root = releases_dir(data_dir)
+    os.makedirs(root, exist_ok=True)
+    build = os.path.join(root, f".build-{os.getpid()}")
+    shutil.rmtree(build, ignore_errors=True)
+
+    for name, src in sources.items():
+        dst = os.path.join(build, name)
+        if os.path.isdir(src):
+            _copy_tree(src, dst, name in links)
+        else:
+            os.makedirs(os.path.dirname(dst), exist_ok=True)
+            _link_or_copy(src, dst, name in links)
+
+    files = describe_tree(build)
+    digest = content_hash(files)
+
+    live = current_release(data_dir)
+    if live is not None and os.path.isdir(live[1]):
+        if read_manifest(live[1])["content_hash"] == digest:
+            shutil.rmtree(build)
+            return live[0], live[1], False
+
+    version = time.strftime("%Y%m%dT%H%M%SZ", time.gmtime()) + "-" + digest[:8]
+    manifest = {
+        "format_version": FORMAT_VERSION,
+        "version": version,
+        "published_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "content_hash": digest,
+        "datasets": {
+            name: {"file": rel, "rows": arrow_rows(os.path.join(build, rel))}
+            for name, rel in datasets.items()
+            if rel in files
+        },
+        "files": files,
+        **({"metadata": metadata} if metadata else {}),
+    }
+    with open(os.path.join(build, MANIFEST_FILE), "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    path = os.path.join(root, version)
+    os.rename(build, path)
+    set_current(data_dir, version)
+    return version, path, True
+
+
+def prune_releases(data_dir, keep=KEEP_RELEASES):
+    """Delete all but the `keep` newest releases; never the live one."""
+    root = releases_dir(data_dir)
+    live = current_release(data_dir)
+    versions = sorted(
+        d for d in os.listdir(root)
+        if not d.startswith(".") and os.path.isdir(os.path.join(root, d))
+    )
+    removed = []
+    for version in versions[:-keep] if keep else versions:
+        if live is not None and version == live[0]:
+            continue
+        # Open memory maps in running servers keep their pages alive
+        shutil.rmtree(os.path.join(root, version), ignore_errors=True)
+        removed.append(version)
+    return removed
@@ -0,0 +1,142 @@
+"""
+routing.py
+Monthly routing of glacier meltwater to river outlets
+(05_runoff_routing.py).
+
+Annual glacier runoff is spread over the calendar months in proportion
+to each glacier's monthly positive degree-days (melt_weights) and
+reaches its outlet through a unit hydrograph: a gamma distribution
+(Nash cascade of N_RESERVOIRS linear reservoirs) whose mean is the
+glacier's travel time (unit_hydrographs).
+
+Routing is linear, so glaciers are first summed per (outlet, travel-time
+bin) (aggregate_monthly) and only those few aggregate series are
+convolved, all in one batched FFT (convolve).
+"""
+
+import numpy as np
+from scipy.special import gammainc
+
+EARTH_RADIUS_KM = 6371.0
+SECONDS_PER_DAY = 86400.0
+DAYS_PER_MONTH = 365.25 / 12
+DAYS_IN_MONTH = np.array([31, 28.25, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31])
+
+N_RESERVOIRS = 3
+
+# Share of annual melt per month where a glacier has no month above 0 °C
+# (or no monthly temperatures): a monsoon-season profile, sums to 1
+DEFAULT_MELT_PROFILE = np.array(
+    [0.0, 0.0, 0.0, 0.02, 0.08, 0.18, 0.26, 0.24, 0.15, 0.06, 0.01, 0.0]
+)
+
+
+# -----------------------------
+# GEOMETRY
+# -----------------------------
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance (km), broadcasting over its arguments."""
+    lat1, lon1, lat2, lon2 = (np.radians(v) for v in (lat1, lon1, lat2, lon2))
+    a = (
+        np.sin((lat2 - lat1) / 2) ** 2
+        + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def nearest_outlet(lat, lon, outlet_lat, outlet_lon):
+    """(outlet index, distance km) of the nearest outlet of every point."""
+    d = haversine_km(
+        np.asarray(lat)[:, None], np.asarray(lon)[:, None],
+        np.asarray(outlet_lat)[None, :], np.asarray(outlet_lon)[None, :],
+    )
+    idx = d.argmin(axis=1)
+    return idx, d[np.arange(len(idx)), idx]
+
+
+def travel_time_months(distance_km, velocity_m_s, sinuosity=1.0):
+    """Months for water to travel `distance_km` (great circle) downstream."""
+    km_per_day = velocity_m_s * SECONDS_PER_DAY / 1000.0
+    return distance_km * sinuosity / km_per_day / DAYS_PER_MONTH
+
+
+# -----------------------------
+# MONTHLY DISTRIBUTION
+# -----------------------------
+def melt_weights(temp):
+    """
+    (glaciers x 12) share of annual melt per calendar month, from
+    monthly mean temperatures (°C): positive degree-days, normalized.
+    """
+    temp = np.asarray(temp, dtype=np.float64)
+    pdd = np.clip(temp, 0.0, None) * DAYS_IN_MONTH
+    total = pdd.sum(axis=1, keepdims=True)
+    usable = np.isfinite(total) & (total > 0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(usable, pdd / total, DEFAULT_MELT_PROFILE)
+
+
+def aggregate_monthly(annual, weights, group):
+    """
+    Monthly inflow of each group: sum over its glaciers of
+    annual[g, year] * weights[g, month].
+
+    annual: (glaciers x years), weights: (glaciers x 12), group: codes
+    0..K-1 with every code present. Returns (K x years*12), months in
+    calendar order within each year.
+    """
+    order = np.argsort(group, kind="stable")
+    codes = group[order]
+    starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+    annual, weights = annual[order], weights[order]
+
+    out = np.empty((len(starts), annual.shape[1], 12))
+    for m in range(12):
+        out[:, :, m] = np.add.reduceat(annual * weights[:, m:m + 1], starts, axis=0)
+    return out.reshape(len(starts), -1)
+
+
+# -----------------------------
+# ROUTING
+# -----------------------------
+def unit_hydrographs(mean_lag, length, shape=N_RESERVOIRS):
+    """
+    (len(mean_lag) x length) monthly ordinates: the share of one month's
+    inflow that leaves the outlet 0, 1, ... months later. Gamma(shape,
+    mean_lag / shape) integrated over whole months; the tail beyond
+    `length` is added to the last ordinate, so every row sums to 1.
+    """
+    mean_lag = np.asarray(mean_lag, dtype=np.float64)
+    edges = np.arange(length + 1, dtype=np.float64)
+    scale = np.maximum(mean_lag, 1e-9)[:, None] / shape
+    cdf = gammainc(shape, edges[None, :] / scale)
+    uh = np.diff(cdf, axis=1)
+    uh[:, -1] += 1.0 - cdf[:, -1]
+    return uh
+
+
+def convolve(series, kernels):
+    """
+    Row-wise causal convolution of (K x T) series with (K x L) kernels,
+    all rows in one batched real FFT, truncated to the T input months.
+    """
+    n = series.shape[1] + kernels.shape[1] - 1
+    nfft = 1 << (n - 1).bit_length()
+    spectrum = np.fft.rfft(series, nfft, axis=1) * np.fft.rfft(kernels, nfft, axis=1)
+    out = np.fft.irfft(spectrum, nfft, axis=1)[:, :series.shape[1]]
+    return np.clip(out, 0.0, None)  # FFT round-off around zero flow
+
+
+def monthly_to_m3s(volume_m3, n_years):
+    """(.. x years*12) monthly volumes -> mean discharge (m³/s) per month."""
+    seconds = np.tile(DAYS_IN_MONTH, n_years) * SECONDS_PER_DAY
+    return volume_m3 / seconds
+
+
+def peak_indicators(flow_m3s):
+    """
+    Per (row, year) of a (rows x years*12) monthly discharge matrix:
+    peak monthly flow, its calendar month (1-12) and mean flow.
+    """
+    by_year = flow_m3s.reshape(flow_m3s.shape[0], -1, 12)
+    return by_year.max(axis=2), by_year.argmax(axis=2) + 1, by_year.mean(axis=2)
@@ -0,0 +1,191 @@
+"""
+run_config.py
+Typed run configuration shared by every pipeline stage and the server.
+
+A run is described by a JSON file, e.g.
+
+    {
+      "regions": ["14"],
+      "start_year": 2000, "end_year": 2024,
+      "scenarios": ["baseline", "high_warming"],
+      "processed_dir": "data/runs/south_asia_west",
+      "workers": 8,
+      "output_format": "parquet"
+    }
+
+and handed to a stage with `--config run.json` (or the
+GLACIER_RUN_CONFIG environment variable); run_pipeline.py forwards it to
+every stage. Unset fields keep the defaults below, which reproduce the
+original single-run layout under data/. Relative directories resolve
+against the project root, so stages no longer depend on the working
+directory, and runs with different processed_dir never share outputs.
+"""
+
+import json
+import os
+import sys
+from dataclasses import dataclass, field, fields, replace
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+CONFIG_ENV = "GLACIER_RUN_CONFIG"
+
+OUTPUT_FORMATS = {"csv": ".csv", "parquet": ".parquet"}
+
+# Projection geometry: "static" keeps every glacier's baseline area;
+# "dynamic" evolves area and volume with the predicted melt
+GEOMETRY_MODES = ("static", "dynamic")
+
+# Projection scenarios: climate change per year after the last observed
+# year (temperature in °C, precipitation and radiation as fractions)
+SCENARIOS = {
+    "baseline": {"temp_per_year": 0.04, "prec_per_year": 0.002, "srad_per_year": 0.001},
+    "low_warming": {"temp_per_year": 0.02, "prec_per_year": 0.001, "srad_per_year": 0.0005},
+    "high_warming": {"temp_per_year": 0.07, "prec_per_year": 0.003, "srad_per_year": 0.0015},
+}
+
+
+class ConfigError(ValueError):
+    """Invalid run configuration."""
+
+
+@dataclass(frozen=True)
+class RunConfig:
+    # RGI first-order regions ("14" = South Asia West, "15" = South Asia East)
+    regions: tuple = ("14", "15")
+    # Observed mass-balance years
+    start_year: int = 2000
+    end_year: int = 2024
+    # Projected years; the first scenario is the one the web app shows
+    projection_start: int = 2025
+    projection_end: int = 2040
+    scenarios: tuple = ("baseline",)
+    geometry_mode: str = "static"
+    # I/O roots
+    raw_dir: str = "data/raw"
+    processed_dir: str = "data/processed"
+    # Parallel workers for fitting, bootstrap and per-region stages (0 = all cores)
+    workers: int = 0
+    # Format of the tables stages write
+    output_format: str = "csv"
+    # Extra scenario definitions, merged over SCENARIOS
+    scenario_defs: dict = field(default_factory=dict)
+
+    def __post_init__(self):
+        set_ = lambda name, value: object.__setattr__(self, name, value)
+
+        set_("regions", tuple(str(r).zfill(2) for r in self.regions))
+        set_("scenarios", tuple(self.scenarios))
+        for name in ("raw_dir", "processed_dir"):
+            path = os.path.expanduser(getattr(self, name))
+            set_(name, os.path.normpath(os.path.join(PROJECT_ROOT, path)))
+
+        if not self.regions:
+            raise ConfigError("at least one region is required")
+        if self.start_year > self.end_year:
+            raise ConfigError("start_year must not be after end_year")
+        if not self.end_year < self.projection_start <= self.projection_end:
+            raise ConfigError("projection years must follow end_year")
+        if self.output_format not in OUTPUT_FORMATS:
+            raise ConfigError(f"output_format must be one of {list(OUTPUT_FORMATS)}")
+        if self.workers < 0:
+            raise ConfigError("workers must be >= 0")
+        if self.geometry_mode not in GEOMETRY_MODES:
+            raise ConfigError(f"geometry_mode must be one of {list(GEOMETRY_MODES)}")
+        if not self.scenarios:
+            raise ConfigError("at least one scenario is required")
+        unknown = [s for s in self.scenarios if s not in self.scenario_table]
+        if unknown:
+            raise ConfigError(f"unknown scenarios: {unknown}")
+
+    # ---- derived settings ----
+    @property
+    def scenario_table(self):
+        return {**SCENARIOS, **self.scenario_defs}
+
+    @property
+    def primary_scenario(self):
+        return self.scenarios[0]
+
+    @property
+    def n_workers(self):
+        return self.workers or os.cpu_count() or 1
+
+    @property
+    def n_jobs(self):
+        """joblib / sklearn style worker count."""
+        return self.workers or -1
+
+    # ---- paths ----
+    def raw(self, *parts):
+        return os.path.join(self.raw_dir, *parts)
+
+    def processed(self, *parts):
+        return os.path.join(self.processed_dir, *parts)
+
+    def table_path(self, name):
+        """Path of table `name` (e.g. "glacier_ml_dataset") in the run's format."""
+        return self.processed(name + OUTPUT_FORMATS[self.output_format])
+
+    # ---- tables ----
+    def read_table(self, name, columns=None):
+        # Imported here: the web server loads this module for paths only
+        import pandas as pd
+
+        path = find_table(self.processed_dir, name, prefer=self.output_format)
+        if path is None:
+            raise FileNotFoundError(f"❌ Missing table {name} in {self.processed_dir}")
+        if path.endswith(".parquet"):
+            return pd.read_parquet(path, columns=columns)
+        return pd.read_csv(path, usecols=columns)
+
+    def write_table(self, df, name):
+        """Write table `name`, replacing the previous file atomically."""
+        path = self.table_path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        if self.output_format == "parquet":
+            df.to_parquet(tmp, index=False)
+        else:
+            df.to_csv(tmp, index=False)
+        os.replace(tmp, path)
+        return path
+
+    def to_dict(self):
+        return {f.name: getattr(self, f.name) for f in fields(self)}
+
+
+def find_table(directory, name, prefer="csv"):
+    """Existing file for table `name` in `directory`, trying `prefer` first."""
+    order = [prefer] + [f for f in OUTPUT_FORMATS if f != prefer]
+    for fmt in order:
+        path = os.path.join(directory, name + OUTPUT_FORMATS[fmt])
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def load_config(argv=None, **overrides):
+    """
+    Configuration for this process: defaults, then the JSON file given by
+    `--config PATH` in argv (sys.argv by default) or $GLACIER_RUN_CONFIG,
+    then keyword overrides.
+    """
+    argv = sys.argv[1:] if argv is None else argv
+    path = os.environ.get(CONFIG_ENV)
+    if "--config" in argv:
+        i = argv.index("--config")
+        if i + 1 >= len(argv):
+            raise ConfigError("--config needs a file path")
+        path = argv[i + 1]
+
+    values = {}
+    if path:
+        with open(path) as f:
+            values = json.load(f)
+
+    known = {f.name for f in fields(RunConfig)}
+    unknown = set(values) - known
+    if unknown:
+        raise ConfigError(f"unknown config keys: {sorted(unknown)}")
+
+    return replace(RunConfig(**values), **overrides) if overrides else RunConfig(**values)
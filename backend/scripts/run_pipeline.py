@@ -0,0 +1,226 @@
+"""
+run_pipeline.py
+Run the processing stages in order for one run configuration
+
+    python backend/scripts/run_pipeline.py --config run.json
+    python backend/scripts/run_pipeline.py --from 08_model_evaluation --to 09_visualization
+    python backend/scripts/run_pipeline.py --config run.json --partitioned
+
+Every stage runs as its own process from the project root and receives
+the same configuration (run_config.py); the run stops at the first
+failing stage.
+
+With --partitioned the per-glacier stages (REGION_STAGES) run once per
+RGI region, in parallel, each region writing to
+<processed_dir>/regions/<region>/. Their outputs are then concatenated
+into processed_dir and the remaining stages run once on the merged
+tables, as in a combined run.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
+
+import pandas as pd
+
+from climate_cube import CUBE_FILE, merge_cubes
+from run_config import PROJECT_ROOT, CONFIG_ENV, load_config
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# -----------------------------
+# STAGES
+# -----------------------------
+STAGES = [
+    "01_glacier_master",
+    "fill_area_km2",
+    "02_climate_features",
+    "03_mass_balance",
+    "04_hydrology_link",
+    "05_basin_aggregation",
+    "05_runoff_routing",
+    "06_extreme_melt_years",
+    "07_flood_risk_index",
+    "07_trend_analysis",
+    "07_climate_sensitivity",
+    "08_model_evaluation",
+    "08_future_melt_projection",
+    "09_visualization",
+    "10_explainable_ai",
+    "merge_glacier_datasets",
+    "11_location_exposure",
+    "11_timeseries_store",
+    "12_publish_datasets",
+    "13_grid_pyramid",
+    "13_render_charts",
+    "14_publish_release",
+]
+
+# Stages that only look at the glaciers of their own region -> the table
+# each one writes. Basin aggregation (05) stays global: basins span RGI
+# regions, and it is a single groupby over the merged hydrology table.
+REGION_STAGES = {
+    "01_glacier_master": "glacier_master",
+    "fill_area_km2": "glacier_master_with_area",
+    "02_climate_features": "climate_features",
+    "03_mass_balance": "glacier_ml_dataset",
+    "04_hydrology_link": "glacier_hydrology",
+}
+
+REGIONS_DIR = "regions"
+
+
+def select_stages(first=None, last=None):
+    for name in (first, last):
+        if name is not None and name not in STAGES:
+            raise SystemExit(f"❌ Unknown stage: {name} (choose from {', '.join(STAGES)})")
+    start = STAGES.index(first) if first else 0
+    stop = STAGES.index(last) + 1 if last else len(STAGES)
+    return STAGES[start:stop]
+
+
+def run_stage(name, env, log=None):
+    """Run one stage script; returns its exit code."""
+    result = subprocess.run(
+        [sys.executable, os.path.join(SCRIPT_DIR, f"{name}.py")],
+        cwd=PROJECT_ROOT,
+        env=env,
+        stdout=log,
+        stderr=subprocess.STDOUT if log else None,
+    )
+    return result.returncode
+
+
+def run_serial(stages, env):
+    for name in stages:
+        print(f"\n===== {name} =====", flush=True)
+        t0 = time.perf_counter()
+        code = run_stage(name, env)
+        if code != 0:
+            raise SystemExit(f"❌ {name} failed (exit code {code})")
+        print(f"✅ {name} finished in {time.perf_counter() - t0:.1f}s")
+
+
+# -----------------------------
+# PARTITIONED EXECUTION
+# -----------------------------
+def region_config(cfg, region, n_parallel):
+    """Configuration of one region's partition: its own glaciers and directory."""
+    return replace(
+        cfg,
+        regions=(region,),
+        processed_dir=cfg.processed(REGIONS_DIR, region),
+        # Share the cores between the regions running at the same time
+        workers=max(1, cfg.n_workers // n_parallel),
+    )
+
+
+def run_region(region_cfg, stages):
+    """
+    Run `stages` for one region, logging to <region dir>/pipeline.log.
+    Returns (region, failed stage or None, seconds).
+    """
+    os.makedirs(region_cfg.processed_dir, exist_ok=True)
+    config_path = region_cfg.processed("run_config.json")
+    with open(config_path, "w") as f:
+        json.dump(region_cfg.to_dict(), f, indent=2)
+
+    env = dict(os.environ)
+    env[CONFIG_ENV] = config_path
+
+    region = region_cfg.regions[0]
+    t0 = time.perf_counter()
+    with open(region_cfg.processed("pipeline.log"), "w") as log:
+        for name in stages:
+            print(f"===== {name} =====", file=log, flush=True)
+            if run_stage(name, env, log) != 0:
+                return region, name, time.perf_counter() - t0
+    return region, None, time.perf_counter() - t0
+
+
+def merge_regions(cfg, region_cfgs, tables):
+    """Concatenate each region's copy of `tables` into the run's directory."""
+    for table in tables:
+        df = pd.concat(
+            [c.read_table(table) for c in region_cfgs],
+            ignore_index=True,
+        )
+        cfg.write_table(df, table)
+        print(f"✅ Merged {table}: {len(df)} rows from {len(region_cfgs)} regions")
+
+    if REGION_STAGES["02_climate_features"] in tables:
+        merge_cubes([c.processed(CUBE_FILE) for c in region_cfgs], cfg.processed(CUBE_FILE))
+        print(f"✅ Merged {CUBE_FILE}")
+
+
+def run_partitioned(cfg, stages, env):
+    region_stages = [s for s in stages if s in REGION_STAGES]
+    global_stages = [s for s in stages if s not in REGION_STAGES]
+
+    if region_stages:
+        n_parallel = min(len(cfg.regions), cfg.n_workers)
+        region_cfgs = [region_config(cfg, r, n_parallel) for r in cfg.regions]
+
+        print(f"\n===== {', '.join(region_stages)} =====")
+        print(f"▶️ {len(cfg.regions)} regions, {n_parallel} in parallel", flush=True)
+        t0 = time.perf_counter()
+
+        # Each region is a chain of stage processes; threads only wait on them
+        with ThreadPoolExecutor(max_workers=n_parallel) as pool:
+            jobs = [pool.submit(run_region, c, region_stages) for c in region_cfgs]
+            failed = []
+            for job in jobs:
+                region, stage, seconds = job.result()
+                if stage is None:
+                    print(f"✅ Region {region} finished in {seconds:.1f}s")
+                else:
+                    failed.append(region)
+                    print(f"❌ Region {region}: {stage} failed "
+                          f"(see {cfg.processed(REGIONS_DIR, region, 'pipeline.log')})")
+        if failed:
+            raise SystemExit(f"❌ Regions failed: {', '.join(failed)}")
+
+        merge_regions(cfg, region_cfgs, [REGION_STAGES[s] for s in region_stages])
+        print(f"✅ Region stages finished in {time.perf_counter() - t0:.1f}s")
+
+    run_serial(global_stages, env)
+
+
+# -----------------------------
+# MAIN
+# -----------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[1])
+    parser.add_argument("--config", help="run configuration (JSON)")
+    parser.add_argument("--from", dest="first", help="first stage to run")
+    parser.add_argument("--to", dest="last", help="last stage to run")
+    parser.add_argument("--partitioned", action="store_true",
+                        help="run the per-glacier stages per RGI region in parallel")
+    args = parser.parse_args()
+
+    # Validate up front rather than in the first stage
+    config_path = args.config or os.environ.get(CONFIG_ENV)
+    if config_path:
+        config_path = os.path.abspath(config_path)
+    cfg = load_config(["--config", config_path] if config_path else [])
+
+    env = dict(os.environ)
+    if config_path:
+        env[CONFIG_ENV] = config_path
+
+    stages = select_stages(args.first, args.last)
+    print(f"📂 Processed directory: {cfg.processed_dir}")
+    print(f"▶️ Running {len(stages)} stages: {', '.join(stages)}")
+
+    t_run = time.perf_counter()
+    if args.partitioned:
+        run_partitioned(cfg, stages, env)
+    else:
+        run_serial(stages, env)
+
+    print(f"\n🎉 Pipeline completed in {time.perf_counter() - t_run:.1f}s")
@@ -0,0 +1,243 @@
+"""
+sensitivity_stats.py
+Closed-form correlation / regression statistics for the climate
+sensitivity stage, with stratified fits and batched bootstrap CIs.
+"""
+
+import os
+import warnings
+import numpy as np
+from joblib import Parallel, delayed
+from scipy.stats import t as t_dist
+
+# Resamples evaluated per matrix product (memory ~ BOOT_CHUNK * n * 8 bytes)
+BOOT_CHUNK = 250
+
+
+# -----------------------------
+# ONE-PASS CORRELATION / OLS
+# -----------------------------
+def correlation_matrix(data):
+    """Pearson correlation matrix of all columns of a 2-D array."""
+    z = data - data.mean(axis=0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        z /= np.sqrt((z ** 2).sum(axis=0))
+    return z.T @ z
+
+
+def pearson_with_target(X, y):
+    """Pearson r and two-sided p-value of each column of X against y."""
+    n = len(y)
+    r = correlation_matrix(np.column_stack([X, y]))[:-1, -1]
+    r = np.clip(r, -1.0, 1.0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t_stat = r * np.sqrt((n - 2) / (1 - r ** 2))
+    return r, 2 * t_dist.sf(np.abs(t_stat), n - 2)
+
+
+def _design(X):
+    return np.column_stack([np.ones(len(X)), X])
+
+
+def _standardize(X):
+    """Centre and scale columns so the normal equations stay well conditioned."""
+    mu = X.mean(axis=0)
+    sd = X.std(axis=0)
+    sd = np.where(sd > 0, sd, 1.0)
+    return (X - mu) / sd, mu, sd
+
+
+def _unstandardize(coef, mu, sd):
+    """Map [..., intercept, slopes] fitted on standardized X back to raw units."""
+    slopes = coef[..., 1:] / sd
+    intercept = coef[..., 0] - (slopes * mu).sum(axis=-1)
+    return np.concatenate([intercept[..., None], slopes], axis=-1)
+
+
+def ols(X, y):
+    """Coefficients (intercept first), standard errors and R²."""
+    Xs, mu, sd = _standardize(X)
+    A = _design(Xs)
+    coef, *_ = np.linalg.lstsq(A, y, rcond=None)
+    resid = y - A @ coef
+
+    ss_res = resid @ resid
+    ss_tot = ((y - y.mean()) ** 2).sum()
+    dof = max(len(y) - A.shape[1], 1)
+
+    # Covariance in standardized units, then the same linear map as the
+    # coefficients: raw = T @ standardized
+    cov = np.linalg.pinv(A.T @ A) * (ss_res / dof)
+    T = np.diag(np.concatenate([[1.0], 1 / sd]))
+    T[0, 1:] = -mu / sd
+    cov = T @ cov @ T.T
+
+    return _unstandardize(coef, mu, sd), np.sqrt(np.diag(cov)), 1 - ss_res / ss_tot
+
+
+# -----------------------------
+# STRATIFIED FITS (ALL GROUPS AT ONCE)
+# -----------------------------
+def grouped_ols(X, y, groups):
+    """
+    OLS per group from per-group normal equations, solved as one
+    stacked batch. Returns (labels, coef[g, p+1], r2[g], n[g]).
+    """
+    labels, codes = np.unique(np.asarray(groups), return_inverse=True)
+    g = len(labels)
+    Xs, mu, sd = _standardize(X)
+    A = _design(Xs)
+    k = A.shape[1]
+
+    # Per-group A'A and A'y via bincount over row-wise outer products
+    outer = (A[:, :, None] * A[:, None, :]).reshape(len(A), -1)
+    xtx = np.stack(
+        [np.bincount(codes, weights=outer[:, c], minlength=g) for c in range(k * k)],
+        axis=1,
+    ).reshape(g, k, k)
+    xty = np.stack(
+        [np.bincount(codes, weights=A[:, c] * y, minlength=g) for c in range(k)],
+        axis=1,
+    )
+
+    coef = np.einsum("gij,gj->gi", np.linalg.pinv(xtx), xty)
+
+    resid = y - np.einsum("ni,ni->n", A, coef[codes])
+    coef = _unstandardize(coef, mu, sd)
+    n = np.bincount(codes, minlength=g)
+    y_mean = np.bincount(codes, weights=y, minlength=g) / n
+    ss_res = np.bincount(codes, weights=resid ** 2, minlength=g)
+    ss_tot = np.bincount(codes, weights=(y - y_mean[codes]) ** 2, minlength=g)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        r2 = 1 - ss_res / ss_tot
+    return labels, coef, r2, n
+
+
+# -----------------------------
+# BATCHED BOOTSTRAP
+# -----------------------------
+def _bootstrap_chunk(X, y, n_boot, seed):
+    """
+    Correlations and OLS coefficients for `n_boot` resamples, expressed
+    as resample-count weights so each statistic is one matrix product.
+    """
+    rng = np.random.default_rng(seed)
+    n, p = X.shape
+
+    # Centred / scaled copies: r is shift- and scale-invariant, and the
+    # coefficients are mapped back to raw units below
+    X, mu, sd = _standardize(X)
+    y_mu = y.mean()
+    y = y - y_mu
+    A = _design(X)
+
+    idx = rng.integers(0, n, size=(n_boot, n))
+    offsets = (np.arange(n_boot) * n)[:, None]
+    W = np.bincount((idx + offsets).ravel(), minlength=n_boot * n)
+    W = W.reshape(n_boot, n).astype(float)
+
+    # Weighted moments for correlations
+    m_x = W @ X / n
+    m_y = W @ y / n
+    m_xx = W @ (X ** 2) / n
+    m_yy = W @ (y ** 2) / n
+    m_xy = W @ (X * y[:, None]) / n
+
+    cov = m_xy - m_x * m_y[:, None]
+    var_x = m_xx - m_x ** 2
+    var_y = m_yy - m_y ** 2
+    with np.errstate(divide="ignore", invalid="ignore"):
+        r = cov / np.sqrt(var_x * var_y[:, None])
+
+    # Weighted normal equations for regression coefficients
+    xtx = np.einsum("bn,ni,nj->bij", W, A, A, optimize=True)
+    xty = W @ (A * y[:, None])
+    coef = np.einsum("bij,bj->bi", np.linalg.pinv(xtx), xty)
+    coef[:, 0] += y_mu
+
+    return r, _unstandardize(coef, mu, sd)
+
+
+def _grouped_bootstrap_chunk(A, y, codes, g, n_boot, seed):
+    """
+    grouped_ols coefficients (standardized units) for `n_boot` stratified
+    resamples: every group's rows are redrawn from that group only.
+    """
+    rng = np.random.default_rng(seed)
+    n, k = A.shape
+
+    order = np.argsort(codes, kind="stable")
+    sizes = np.bincount(codes, minlength=g)
+    starts = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+    c = codes[order]
+    idx = order[starts[c] + rng.integers(0, sizes[c], size=(n_boot, n))]
+    offsets = (np.arange(n_boot) * n)[:, None]
+    W = np.bincount((idx + offsets).ravel(), minlength=n_boot * n)
+    W = W.reshape(n_boot, n).astype(float)
+
+    outer = (A[:, :, None] * A[:, None, :]).reshape(n, -1)
+    Ay = A * y[:, None]
+    coef = np.empty((n_boot, g, k))
+    for j in range(g):
+        rows = codes == j
+        xtx = (W[:, rows] @ outer[rows]).reshape(n_boot, k, k)
+        xty = W[:, rows] @ Ay[rows]
+        coef[:, j] = np.einsum("bij,bj->bi", np.linalg.pinv(xtx), xty)
+    return coef
+
+
+def _run_chunks(fn, n_boot, seed, n_jobs, chunk):
+    """fn(size, seed) for chunks of resamples, in parallel threads."""
+    sizes = [min(chunk, n_boot - lo) for lo in range(0, n_boot, chunk)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+
+    if n_jobs is None or n_jobs < 1:
+        n_jobs = os.cpu_count() or 1
+
+    return Parallel(n_jobs=min(n_jobs, len(sizes)), prefer="threads")(
+        delayed(fn)(size, s) for size, s in zip(sizes, seeds)
+    )
+
+
+def bootstrap(X, y, n_boot=2000, seed=42, n_jobs=-1, chunk=BOOT_CHUNK):
+    """
+    Bootstrap distributions of the Pearson r of each column of X with y
+    and of the OLS coefficients. Chunks of resamples run in parallel
+    threads (the heavy lifting is BLAS, which releases the GIL).
+    Returns (r[n_boot, p], coef[n_boot, p+1]).
+    """
+    parts = _run_chunks(
+        lambda size, s: _bootstrap_chunk(X, y, size, s), n_boot, seed, n_jobs, chunk
+    )
+
+    r = np.concatenate([p[0] for p in parts])
+    coef = np.concatenate([p[1] for p in parts])
+    return r, coef
+
+
+def grouped_bootstrap(X, y, groups, n_boot=2000, seed=42, n_jobs=-1, chunk=BOOT_CHUNK):
+    """
+    Stratified bootstrap distribution of the grouped_ols coefficients,
+    all groups per resample. Returns coef[n_boot, g, p+1], groups in
+    grouped_ols label order.
+    """
+    _, codes = np.unique(np.asarray(groups), return_inverse=True)
+    g = codes.max() + 1 if len(codes) else 0
+    Xs, mu, sd = _standardize(X)
+    A = _design(Xs)
+
+    parts = _run_chunks(
+        lambda size, s: _grouped_bootstrap_chunk(A, y, codes, g, size, s),
+        n_boot, seed, n_jobs, chunk,
+    )
+    return _unstandardize(np.concatenate(parts), mu, sd)
+
+
+def percentile_ci(samples, level=0.95):
+    """Percentile interval along axis 0."""
+    tail = (1 - level) / 2 * 100
+    with warnings.catch_warnings():
+        # Constant predictors give all-NaN columns of r
+        warnings.simplefilter("ignore", RuntimeWarning)
+        return np.nanpercentile(samples, [tail, 100 - tail], axis=0)
@@ -0,0 +1,189 @@
+"""
+timeseries_store.py
+Glacier-indexed timeseries store.
+
+Each segment (e.g. "history", "projection") is a set of flat .npy
+columns sorted by glacier, plus an offsets array: the rows of glacier i
+are offsets[i]:offsets[i + 1] in every column. Columns are opened
+memory-mapped, so reading one glacier touches only its own slice and
+several server workers share the same page cache.
+
+Layout of the store directory:
+    glacier_ids.npy
+    meta.json                       segments and their columns
+    <segment>__offsets.npy          int64, n_glaciers + 1
+    <segment>__<column>.npy         one array per column
+
+The pipeline builds every store into a new version directory and then
+switches a pointer to it, so the live store is always complete:
+
+    timeseries/
+        CURRENT                     name of the live version (one line)
+        20261019T120000Z-4242/      one store directory per build
+
+A release holds a copy of the live version as a plain store directory;
+live_dir() resolves either layout.
+"""
+
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+
+FORMAT_VERSION = 1
+META_FILE = "meta.json"
+IDS_FILE = "glacier_ids.npy"
+POINTER_FILE = "CURRENT"
+# Builds kept on disk: the live one and the one before it, which servers
+# that have not re-read CURRENT yet may still open
+KEEP_VERSIONS = 2
+
+
+def _column_file(segment, column):
+    return f"{segment}__{column}.npy"
+
+
+# -----------------------------
+# BUILD
+# -----------------------------
+def build_store(out_dir, segments, id_col="glacier_id", time_col="year"):
+    """
+    Write a store from long tables.
+
+    segments: {name: (df, [value columns])}. Every df holds id_col,
+    time_col and its value columns; rows are sorted by glacier and time.
+    Returns the number of glaciers.
+    """
+    import pandas as pd  # build side only; the server just reads .npy files
+
+    ids = pd.Index(sorted(set().union(*(
+        df[id_col].astype(str).unique() for df, _ in segments.values()
+    ))))
+
+    os.makedirs(out_dir, exist_ok=True)
+    meta = {"format_version": FORMAT_VERSION, "n_glaciers": len(ids), "segments": {}}
+
+    for name, (df, columns) in segments.items():
+        pos = ids.get_indexer(df[id_col].astype(str))
+        order = np.lexsort((df[time_col].to_numpy(), pos))
+        pos = pos[order]
+
+        counts = np.bincount(pos, minlength=len(ids))
+        offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+        np.save(os.path.join(out_dir, _column_file(name, "offsets")), offsets)
+
+        np.save(
+            os.path.join(out_dir, _column_file(name, time_col)),
+            df[time_col].to_numpy()[order].astype(np.int16),
+        )
+        for col in columns:
+            np.save(
+                os.path.join(out_dir, _column_file(name, col)),
+                df[col].to_numpy(dtype=np.float32)[order],
+            )
+
+        meta["segments"][name] = {"columns": [time_col] + list(columns), "rows": int(len(df))}
+
+    np.save(os.path.join(out_dir, IDS_FILE), ids.to_numpy(dtype=str))
+    # Written last: a store without meta.json is incomplete
+    with open(os.path.join(out_dir, META_FILE), "w") as f:
+        json.dump(meta, f, indent=2)
+
+    return len(ids)
+
+
+# -----------------------------
+# VERSIONS
+# -----------------------------
+def live_dir(root):
+    """
+    Store directory of `root`: the version its CURRENT pointer names, or
+    root itself when it is a plain store directory (e.g. in a release).
+    """
+    try:
+        with open(os.path.join(root, POINTER_FILE)) as f:
+            version = f.read().strip()
+    except FileNotFoundError:
+        return root
+    return os.path.join(root, version) if version else root
+
+
+def publish_version(root, build, keep=KEEP_VERSIONS):
+    """
+    Run build(path) into a new version directory under root, switch
+    CURRENT to it with os.replace and delete all but the `keep` newest
+    versions (never the live one). Returns (path, result of build).
+    """
+    os.makedirs(root, exist_ok=True)
+    version = time.strftime("%Y%m%dT%H%M%SZ", time.gmtime()) + f"-{os.getpid()}"
+    tmp_dir = os.path.join(root, f".build-{os.getpid()}")
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    result = build(tmp_dir)
+    path = os.path.join(root, version)
+    os.rename(tmp_dir, path)
+
+    pointer = os.path.join(root, POINTER_FILE)
+    tmp = f"{pointer}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        f.write(version + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, pointer)
+
+    # Files of a store built before versioning (flat layout) are superseded
+    for name in os.listdir(root):
+        if name != POINTER_FILE and os.path.isfile(os.path.join(root, name)):
+            os.remove(os.path.join(root, name))
+
+    versions = sorted(
+        d for d in os.listdir(root)
+        if not d.startswith(".") and os.path.isdir(os.path.join(root, d))
+    )
+    for old in versions[:-keep] if keep else versions:
+        if old != version:
+            # Open memory maps in running servers keep their pages alive
+            shutil.rmtree(os.path.join(root, old), ignore_errors=True)
+    return path, result
+
+
+# -----------------------------
+# READ
+# -----------------------------
+class TimeseriesStore:
+    """Read-only, memory-mapped view of a store directory."""
+
+    def __init__(self, path):
+        with open(os.path.join(path, META_FILE)) as f:
+            self.meta = json.load(f)
+        if self.meta.get("format_version") != FORMAT_VERSION:
+            raise ValueError(f"❌ Unsupported timeseries store version in {path}")
+
+        ids = np.load(os.path.join(path, IDS_FILE))
+        self.index = {g: i for i, g in enumerate(ids.tolist())}
+
+        self.segments = {}
+        for name, info in self.meta["segments"].items():
+            self.segments[name] = {
+                col: np.load(os.path.join(path, _column_file(name, col)), mmap_mode="r")
+                for col in ["offsets"] + info["columns"]
+            }
+
+    def __contains__(self, glacier_id):
+        return glacier_id in self.index
+
+    def __len__(self):
+        return len(self.index)
+
+    def get(self, glacier_id):
+        """{segment: {column: ndarray}} for one glacier, or None if unknown."""
+        i = self.index.get(glacier_id)
+        if i is None:
+            return None
+
+        out = {}
+        for name, cols in self.segments.items():
+            lo, hi = cols["offsets"][i], cols["offsets"][i + 1]
+            out[name] = {c: a[lo:hi] for c, a in cols.items() if c != "offsets"}
+        return out
@@ -0,0 +1,178 @@
+"""
+trend_stats.py
+Batched trend statistics over a (series x years) matrix.
+
+Every function takes Y with one series per row and one year per column
+(NaN = missing year) and fits all rows at once; there is no per-series
+Python loop.
+"""
+
+import numpy as np
+import pandas as pd
+from scipy.stats import norm, t as t_dist
+
+# Rows per chunk for the pairwise (Sen / Mann–Kendall) statistics.
+# Memory per chunk ~ CHUNK_ROWS * n_pairs * 8 bytes.
+CHUNK_ROWS = 4096
+
+
+# -----------------------------
+# ORDINARY LEAST SQUARES
+# -----------------------------
+def batched_ols(Y, years):
+    """
+    Closed-form y = intercept + slope * year for every row of Y.
+    Returns dict of arrays: n, slope, intercept, stderr, p_value.
+    """
+    Y = np.asarray(Y, dtype=float)
+    x = np.asarray(years, dtype=float)[None, :]
+    w = ~np.isnan(Y)
+
+    n = w.sum(axis=1)
+    y0 = np.where(w, Y, 0.0)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        x_bar = (w * x).sum(axis=1) / n
+        y_bar = y0.sum(axis=1) / n
+
+        dx = np.where(w, x - x_bar[:, None], 0.0)
+        dy = np.where(w, Y - y_bar[:, None], 0.0)
+
+        sxx = (dx * dx).sum(axis=1)
+        sxy = (dx * dy).sum(axis=1)
+
+        slope = sxy / sxx
+        intercept = y_bar - slope * x_bar
+
+        resid = np.where(w, dy - slope[:, None] * dx, 0.0)
+        sse = (resid * resid).sum(axis=1)
+
+        dof = n - 2
+        stderr = np.sqrt(sse / dof / sxx)
+        t_stat = slope / stderr
+        p_value = 2 * t_dist.sf(np.abs(t_stat), np.maximum(dof, 1))
+
+    # Perfect fits: zero residual, significant unless slope is zero too
+    exact = (stderr == 0) & (dof > 0)
+    p_value = np.where(exact, np.where(slope != 0, 0.0, 1.0), p_value)
+    p_value = np.where(dof > 0, p_value, np.nan)
+    stderr = np.where(dof > 0, stderr, np.nan)
+
+    return {
+        "n": n,
+        "slope": slope,
+        "intercept": intercept,
+        "stderr": stderr,
+        "p_value": p_value,
+    }
+
+
+# -----------------------------
+# SEN'S SLOPE & MANN–KENDALL
+# -----------------------------
+def _tie_correction(Y):
+    """Sum of t(t-1)(2t+5) over groups of tied values in each row."""
+    rows, cols = Y.shape
+    if rows == 0 or cols == 0:
+        return np.zeros(rows)
+
+    s = np.sort(Y, axis=1)  # NaN sorts last
+    valid = ~np.isnan(s)
+
+    same = np.zeros_like(valid)
+    same[:, 1:] = (s[:, 1:] == s[:, :-1]) & valid[:, 1:]
+
+    # Run-length encode tie groups across the flattened matrix
+    starts = (~same & valid).ravel()
+    run_id = np.cumsum(starts) - 1
+    flat_valid = valid.ravel()
+
+    counts = np.bincount(run_id[flat_valid], minlength=starts.sum())
+    run_row = np.nonzero(starts)[0] // cols
+
+    t = counts.astype(float)
+    return np.bincount(run_row, weights=t * (t - 1) * (2 * t + 5), minlength=rows)
+
+
+def sen_mann_kendall(Y, years, chunk_rows=CHUNK_ROWS):
+    """
+    Sen's slope (median pairwise slope) and the Mann–Kendall test
+    (S, tie-corrected Z, two-sided p) for every row of Y.
+    """
+    Y = np.asarray(Y, dtype=float)
+    x = np.asarray(years, dtype=float)
+    rows = Y.shape[0]
+
+    i, j = np.triu_indices(len(x), k=1)
+    dx = x[j] - x[i]
+
+    sen = np.full(rows, np.nan)
+    s_stat = np.zeros(rows)
+
+    for lo in range(0, rows, chunk_rows):
+        block = Y[lo:lo + chunk_rows]
+        dy = block[:, j] - block[:, i]
+
+        with np.errstate(invalid="ignore"):
+            has_pair = (~np.isnan(dy)).any(axis=1)
+            if has_pair.any():
+                sen[lo:lo + chunk_rows][has_pair] = np.nanmedian(
+                    dy[has_pair] / dx, axis=1
+                )
+            s_stat[lo:lo + chunk_rows] = np.nansum(np.sign(dy), axis=1)
+
+    n = (~np.isnan(Y)).sum(axis=1).astype(float)
+    var_s = (n * (n - 1) * (2 * n + 5) - _tie_correction(Y)) / 18.0
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        z = np.where(
+            s_stat > 0, (s_stat - 1) / np.sqrt(var_s),
+            np.where(s_stat < 0, (s_stat + 1) / np.sqrt(var_s), 0.0)
+        )
+    z = np.where(var_s > 0, z, np.nan)
+    p = 2 * norm.sf(np.abs(z))
+
+    return {"sen_slope": sen, "mk_s": s_stat, "mk_z": z, "mk_p_value": p}
+
+
+# -----------------------------
+# TABLE BUILDER
+# -----------------------------
+def trend_table(long_df, id_col, time_col, value_col, alpha=0.05):
+    """
+    Pivot a long (id, year, value) table into a matrix and return one row
+    of trend statistics per id.
+    """
+    wide = long_df.pivot_table(
+        index=id_col, columns=time_col, values=value_col, aggfunc="mean"
+    ).sort_index(axis=1)
+
+    years = wide.columns.to_numpy(dtype=float)
+    Y = wide.to_numpy(dtype=float)
+
+    ols = batched_ols(Y, years)
+    mk = sen_mann_kendall(Y, years)
+
+    out = pd.DataFrame({
+        id_col: wide.index,
+        "start_year": int(years.min()) if len(years) else np.nan,
+        "end_year": int(years.max()) if len(years) else np.nan,
+        "n_years": ols["n"],
+        "slope_per_year": ols["slope"],
+        "intercept": ols["intercept"],
+        "slope_stderr": ols["stderr"],
+        "p_value": ols["p_value"],
+        "sen_slope_per_year": mk["sen_slope"],
+        "mk_s": mk["mk_s"],
+        "mk_z": mk["mk_z"],
+        "mk_p_value": mk["mk_p_value"],
+    })
+
+    slope = out["slope_per_year"]
+    out["trend_type"] = np.select(
+        [slope > 0, slope < 0, slope == 0],
+        ["Increasing", "Decreasing", "No Trend"],
+        default="Insufficient Data",
+    )
+    out["significant"] = out["mk_p_value"] < alpha
+    return out
@@ -0,0 +1,6 @@
+"""
+Serving-side helpers for app.py (model inference, data stores).
+
+Shared engine modules live in backend/scripts; app.py puts that folder
+on sys.path before importing from here.
+"""
@@ -0,0 +1,45 @@
+"""
+cache.py
+Thread-safe LRU cache shared by the serving modules.
+"""
+
+import threading
+from collections import OrderedDict
+
+
+class LRUCache:
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        return self.get_many([key])[0]
+
+    def put(self, key, value):
+        self.put_many([(key, value)])
+
+    def get_many(self, keys):
+        with self._lock:
+            out = []
+            for k in keys:
+                v = self._data.get(k)
+                if v is not None:
+                    self._data.move_to_end(k)
+                out.append(v)
+            return out
+
+    def put_many(self, items):
+        with self._lock:
+            for k, v in items:
+                self._data[k] = v
+                self._data.move_to_end(k)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
@@ -0,0 +1,66 @@
+"""
+charts.py
+Chart images for the web app (/api/charts).
+
+Answers from, in order: this worker's LRU of recent PNGs, the shared
+on-disk chart cache (also filled by 13_render_charts.py) and finally the
+render pool (backend/scripts/charts.py). Concurrent requests for the
+same chart wait on one render.
+"""
+
+import os
+import threading
+
+from backend.serving.cache import LRUCache
+from charts import CHARTS, ChartRenderer, check_params, dimension_values, year_span
+
+CACHE_SIZE = 64
+RENDER_TIMEOUT_S = 60
+
+
+class GlacierCharts:
+    def __init__(self, datasets, cache_dir):
+        self.datasets = datasets
+        self.renderer = ChartRenderer(datasets, cache_dir)
+        self.cache = LRUCache(CACHE_SIZE)
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def catalog(self):
+        """Charts with published data, their dimension and its values, and year span."""
+        out = []
+        for name, spec in CHARTS.items():
+            try:
+                first, last = year_span(self.datasets, name)
+                values = dimension_values(self.datasets, name)
+            except (FileNotFoundError, KeyError):
+                continue
+            out.append({
+                "name": name, "dim": spec["dim"], "values": values,
+                "start": first, "end": last,
+            })
+        return out
+
+    def png(self, name, params):
+        """(PNG bytes, ETag) of a chart; raises ChartError for bad parameters."""
+        params = check_params(self.datasets, name, params)
+        path = self.renderer.path(name, params)
+        result = self.cache.get(path)
+        if result is not None:
+            return result
+
+        with self._lock:
+            future = self._pending.get(path)
+            if future is None:
+                future = self._pending[path] = self.renderer.submit(name, params)
+        try:
+            future.result(timeout=RENDER_TIMEOUT_S)
+        finally:
+            with self._lock:
+                self._pending.pop(path, None)
+
+        with open(path, "rb") as f:
+            # The cache file name already encodes the chart and data version
+            result = (f.read(), os.path.splitext(os.path.basename(path))[0])
+        self.cache.put(path, result)
+        return result
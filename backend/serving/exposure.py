@@ -0,0 +1,77 @@
+"""
+exposure.py
+Glacier exposure of user-supplied locations (/api/exposure).
+
+The spatial index over the glacier centroids (backend/scripts/
+exposure.py) is built once per dataset version and shared by all
+requests; each request answers every location of its CSV in one
+batched radius or k-nearest query.
+"""
+
+import threading
+
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from exposure import ExposureError, ExposureIndex, read_locations, risk_codes, summarize
+
+DATASET = "glaciers"
+MODES = ("radius", "knn")
+MAX_LOCATIONS = 10_000
+MAX_RADIUS_KM = 500.0
+MAX_K = 100
+
+
+class GlacierExposure:
+    def __init__(self, datasets, dataset=DATASET):
+        self.datasets = datasets
+        self.dataset = dataset
+        self._index = (None, None)
+        self._lock = threading.Lock()
+
+    def index(self):
+        """(ExposureIndex, risk codes, predicted melt, glacier ids) of the current version."""
+        version = self.datasets.version(self.dataset)
+        if self._index[0] != version:
+            with self._lock:
+                if self._index[0] != version:
+                    self._index = (version, self._build(self.datasets.table(self.dataset)))
+        return self._index[1]
+
+    @staticmethod
+    def _build(table):
+        table = table.filter(pc.and_(pc.is_valid(table["lat"]), pc.is_valid(table["lon"])))
+        return (
+            ExposureIndex(table["lat"].to_numpy(), table["lon"].to_numpy()),
+            risk_codes(table["risk_level"]),
+            table["predicted_melt"].to_numpy(),
+            table["glacier_id"].to_numpy(),
+        )
+
+    def query(self, source, mode="radius", radius_km=25.0, k=5):
+        """
+        Exposure records of the locations in CSV `source` (file object):
+        the location's own columns plus the summarize() aggregates.
+        """
+        if mode not in MODES:
+            raise ExposureError(f"mode must be one of {list(MODES)}")
+        if mode == "radius" and not 0 < radius_km <= MAX_RADIUS_KM:
+            raise ExposureError(f"radius_km must be in (0, {MAX_RADIUS_KM:g}]")
+        if mode == "knn" and not 1 <= k <= MAX_K:
+            raise ExposureError(f"k must be between 1 and {MAX_K}")
+
+        locations, lat, lon = read_locations(source)
+        if locations.num_rows > MAX_LOCATIONS:
+            raise ExposureError(f"at most {MAX_LOCATIONS} locations per request")
+
+        index, risk, melt, ids = self.index()
+        if mode == "radius":
+            pairs = index.within(lat, lon, radius_km)
+        else:
+            pairs = index.nearest(lat, lon, k)
+
+        summary = summarize(locations.num_rows, *pairs, risk, melt, ids)
+        for name, values in summary.items():
+            # NaN (no glacier in reach) serializes as JSON null
+            locations = locations.append_column(name, pa.array(values, from_pandas=True))
+        return locations.to_pylist()
@@ -0,0 +1,119 @@
+"""
+grid.py
+Cell lookups in the glacier grid pyramid (13_grid_pyramid.py).
+
+Cells of one level are a contiguous, key-sorted slice of the memory-
+mapped pyramid table, so a single cell is one binary search and a map
+viewport is one binary search per row of tiles it covers.
+"""
+
+import numpy as np
+import pyarrow as pa
+
+from backend.serving.cache import LRUCache
+from grid_pyramid import MIN_LEVEL, MAX_LEVEL, RISK_LEVELS, RISK_COLUMNS, tile_xy
+
+DATASET = "grid_pyramid"
+MAX_ROWS = 4096      # tile rows scanned per viewport query
+MAX_CELLS = 20000    # cells returned per viewport query
+CACHE_SIZE = 1024
+
+
+class GridError(ValueError):
+    """Bad /api/grid query (reported to the client as HTTP 400)."""
+
+
+class GridLookup:
+    def __init__(self, datasets, dataset=DATASET):
+        self.datasets = datasets
+        self.dataset = dataset
+        self.cache = LRUCache(CACHE_SIZE)
+        self._index = (None, None)
+
+    # ---- helpers ----
+    def _levels(self):
+        """(table, keys, level bounds) for the current pyramid version."""
+        version = self.datasets.version(self.dataset)
+        if self._index[0] != version:
+            table = self.datasets.table(self.dataset)
+            levels = table["level"].to_numpy()
+            bounds = np.searchsorted(levels, np.arange(MAX_LEVEL + 2))
+            self._index = (version, (table, table["key"].to_numpy(), bounds))
+        return self._index[1]
+
+    @staticmethod
+    def _check_level(level):
+        if not MIN_LEVEL <= level <= MAX_LEVEL:
+            raise GridError(f"level must be between {MIN_LEVEL} and {MAX_LEVEL}")
+
+    @staticmethod
+    def _records(table, idx):
+        rows = table.take(pa.array(idx, type=pa.int64())).to_pylist()
+        for r in rows:
+            r["risk"] = {
+                name: r.pop(col)
+                for name, col in zip(RISK_LEVELS + ["Unknown"], RISK_COLUMNS)
+            }
+            del r["key"]
+        return rows
+
+    def _find(self, level, x_ranges, y0, y1):
+        table, keys, bounds = self._levels()
+        lo, hi = bounds[level], bounds[level + 1]
+        level_keys = keys[lo:hi]
+        n = 1 << level
+
+        rows = np.arange(y0, y1 + 1, dtype=np.int64)
+        found = []
+        for x0, x1 in x_ranges:
+            start = np.searchsorted(level_keys, rows * n + x0, side="left")
+            stop = np.searchsorted(level_keys, rows * n + x1, side="right")
+            found += [np.arange(a, b) for a, b in zip(start, stop) if b > a]
+
+        idx = np.concatenate(found) + lo if found else np.array([], dtype=np.int64)
+        return table, idx
+
+    # ---- public ----
+    def cell(self, level, x, y):
+        """One cell and its four children (those that hold glaciers)."""
+        self._check_level(level)
+        n = 1 << level
+        if not (0 <= x < n and 0 <= y < n):
+            raise GridError(f"x and y must be between 0 and {n - 1} at level {level}")
+        table, idx = self._find(level, [(x, x)], y, y)
+        if not len(idx):
+            return None
+
+        out = self._records(table, idx)[0]
+        if level < MAX_LEVEL:
+            table, kids = self._find(level + 1, [(2 * x, 2 * x + 1)], 2 * y, 2 * y + 1)
+            out["children"] = self._records(table, kids)
+        return out
+
+    def cells(self, level, west, south, east, north):
+        """All cells of `level` intersecting a lon/lat bounding box."""
+        self._check_level(level)
+        if not np.isfinite([west, south, east, north]).all():
+            raise GridError("bbox values must be finite numbers")
+        if not (-180 <= west <= 180 and -180 <= east <= 180 and -90 <= south <= north <= 90):
+            raise GridError("bbox must be 'west,south,east,north' within ±180 / ±90, south <= north")
+
+        xw, yn = tile_xy(north, west, level)
+        xe, ys = tile_xy(south, east, level)
+        xw, xe, yn, ys = int(xw), int(xe), int(yn), int(ys)
+
+        if ys - yn + 1 > MAX_ROWS:
+            raise GridError("bbox too large for this level; use a coarser level")
+
+        # A box across the antimeridian covers both ends of the x range
+        x_ranges = [(xw, xe)] if west <= east else [(xw, (1 << level) - 1), (0, xe)]
+
+        key = (self.datasets.version(self.dataset), level, tuple(x_ranges), yn, ys)
+        result = self.cache.get(key)
+        if result is None:
+            table, idx = self._find(level, x_ranges, yn, ys)
+            if len(idx) > MAX_CELLS:
+                raise GridError("too many cells; use a coarser level")
+            result = {"level": level, "cells": self._records(table, idx)}
+            self.cache.put(key, result)
+        return result
@@ -0,0 +1,205 @@
+"""
+heatmap.py
+Density and gridded-aggregate rasters of the glaciers (/api/heatmap).
+
+A raster covers a requested extent at a requested size in Web Mercator,
+so it lines up with the map as an image overlay. Glaciers are binned
+into pixels with one bincount per weight and smoothed by a separable
+Gaussian (one 1-D pass per axis); each metric is read off the smoothed
+sums:
+
+    count               glaciers per pixel (smoothed: a kernel density)
+    mean_melt           smoothed predicted_melt sum / smoothed count
+    high_risk_fraction  smoothed high-risk count / smoothed count
+
+Glaciers up to the kernel radius outside the extent are binned too, so
+neighbouring rasters join without seams. A raster is returned as an RGBA
+PNG or as raw values,
+
+    uint32   width
+    uint32   height
+    float32  value[height * width]   rows north to south, NaN = no glaciers
+
+and memoized per (dataset version, extent, size, metric, blur, format).
+"""
+
+import struct
+import zlib
+
+import numpy as np
+import pyarrow.compute as pc
+
+from backend.serving.cache import LRUCache
+from grid_pyramid import MAX_LAT, RISK_LEVELS
+
+DATASET = "glaciers"
+METRICS = ("count", "mean_melt", "high_risk_fraction")
+FORMATS = ("png", "f32")
+# One uncached raster runs up to three blur passes on a request thread;
+# at these limits each pass takes a fraction of a second
+MAX_SIZE = 1024          # pixels per side
+MAX_BLUR = 8.0           # Gaussian sigma (pixels)
+MIN_WEIGHT = 0.05        # smoothed count below which a pixel has no value
+CACHE_SIZE = 256
+
+# Colour ramp (light yellow -> dark red), hotter = more glaciers, more
+# melt (lower predicted_melt) or a larger high-risk share
+RAMP = np.array([
+    [255, 255, 178], [254, 204, 92], [253, 141, 60], [240, 59, 32], [189, 0, 38],
+], dtype=np.float64)
+
+
+class HeatmapError(ValueError):
+    """Bad /api/heatmap query (reported to the client as HTTP 400)."""
+
+
+def mercator_y(lat):
+    lat = np.radians(np.clip(lat, -MAX_LAT, MAX_LAT))
+    return np.arcsinh(np.tan(lat))
+
+
+def gaussian_blur(a, sigma):
+    """Separable Gaussian blur of a 2-D array (zero outside)."""
+    if sigma <= 0:
+        return a
+    r = int(np.ceil(3 * sigma))
+    kernel = np.exp(-0.5 * (np.arange(-r, r + 1) / sigma) ** 2)
+    kernel /= kernel.sum()
+
+    def along_rows(x):
+        padded = np.pad(x, ((0, 0), (r, r)))
+        out = np.zeros_like(x)
+        for j, w in enumerate(kernel):
+            out += w * padded[:, j:j + x.shape[1]]
+        return out
+
+    return along_rows(along_rows(a).T).T
+
+
+def encode_png(rgba):
+    """(height x width x 4) uint8 array -> PNG bytes (8-bit RGBA, no filtering)."""
+    height, width, _ = rgba.shape
+    raw = np.zeros((height, 1 + 4 * width), dtype=np.uint8)   # filter byte 0 per row
+    raw[:, 1:] = rgba.reshape(height, -1)
+
+    def chunk(tag, data):
+        return (struct.pack(">I", len(data)) + tag + data
+                + struct.pack(">I", zlib.crc32(tag + data) & 0xFFFFFFFF))
+
+    return b"".join([
+        b"\x89PNG\r\n\x1a\n",
+        chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 6, 0, 0, 0)),
+        chunk(b"IDAT", zlib.compress(raw.tobytes(), 6)),
+        chunk(b"IEND", b""),
+    ])
+
+
+def colorize(t, alpha):
+    """Values t in 0–1 (NaN = transparent) and alpha in 0–1 -> RGBA uint8."""
+    valid = ~np.isnan(t)
+    pos = np.where(valid, np.clip(t, 0, 1), 0) * (len(RAMP) - 1)
+    stops = np.arange(len(RAMP))
+    rgba = np.empty(t.shape + (4,), dtype=np.uint8)
+    for c in range(3):
+        rgba[..., c] = np.interp(pos, stops, RAMP[:, c])
+    rgba[..., 3] = np.where(valid, np.clip(alpha, 0, 1) * 220, 0)
+    return rgba
+
+
+class GlacierHeatmap:
+    def __init__(self, datasets, dataset=DATASET):
+        self.datasets = datasets
+        self.dataset = dataset
+        self.cache = LRUCache(CACHE_SIZE)
+        self._points = (None, None)
+
+    def _load(self):
+        """Positions and weights of the current dataset version."""
+        version = self.datasets.version(self.dataset)
+        if self._points[0] != version:
+            table = self.datasets.table(self.dataset)
+            table = table.filter(pc.and_(pc.is_valid(table["lat"]), pc.is_valid(table["lon"])))
+            melt = table["predicted_melt"].to_numpy()
+            points = {
+                "x": table["lon"].to_numpy(),
+                "y": mercator_y(table["lat"].to_numpy()),
+                "melt": np.nan_to_num(melt),
+                "has_melt": (~np.isnan(melt)).astype(np.float64),
+                "high": pc.equal(table["risk_level"], RISK_LEVELS[0])
+                          .fill_null(False).to_numpy(zero_copy_only=False).astype(np.float64),
+                # Fixed colour range of mean_melt, the same for every extent
+                "melt_range": tuple(np.nanpercentile(melt, [2, 98])) if len(melt) else (0.0, 1.0),
+            }
+            self._points = (version, points)
+        return self._points
+
+    def render(self, west, south, east, north, width=512, height=512,
+               metric="count", blur=2.0, fmt="png"):
+        """
+        {"data": bytes, "mimetype", "etag", "range": (lo, hi)} of one
+        raster; range is the value span the PNG colour ramp covers.
+        """
+        if metric not in METRICS:
+            raise HeatmapError(f"metric must be one of {list(METRICS)}")
+        if fmt not in FORMATS:
+            raise HeatmapError(f"format must be one of {list(FORMATS)}")
+        if not (1 <= width <= MAX_SIZE and 1 <= height <= MAX_SIZE):
+            raise HeatmapError(f"width and height must be between 1 and {MAX_SIZE}")
+        if not 0 <= blur <= MAX_BLUR:
+            raise HeatmapError(f"blur must be between 0 and {MAX_BLUR:g}")
+        if not (-180 <= west < east <= 180 and -90 <= south < north <= 90):
+            raise HeatmapError("bbox must be 'west,south,east,north' with west < east, south < north")
+
+        version, points = self._load()
+        key = (version, west, south, east, north, width, height, metric, blur, fmt)
+        result = self.cache.get(key)
+        if result is None:
+            result = self._render(points, key[1:])
+            _, _, mtime_ns, size = version
+            result["etag"] = f"{mtime_ns:x}-{size:x}-{zlib.crc32(repr(key[1:]).encode()):08x}"
+            self.cache.put(key, result)
+        return result
+
+    @staticmethod
+    def _render(points, params):
+        west, south, east, north, width, height, metric, blur, fmt = params
+        y0, y1 = mercator_y(south), mercator_y(north)
+
+        # Pixel grid with a margin of the kernel radius on every side
+        margin = int(np.ceil(3 * blur))
+        w, h = width + 2 * margin, height + 2 * margin
+        col = np.floor((points["x"] - west) / (east - west) * width) + margin
+        row = np.floor((y1 - points["y"]) / (y1 - y0) * height) + margin
+        inside = (col >= 0) & (col < w) & (row >= 0) & (row < h)
+        cell = (row[inside] * w + col[inside]).astype(np.int64)
+
+        def grid(weights=None):
+            if weights is not None:
+                weights = weights[inside]
+            counts = np.bincount(cell, weights=weights, minlength=w * h).reshape(h, w)
+            smooth = gaussian_blur(counts.astype(np.float64), blur)
+            return smooth[margin:margin + height, margin:margin + width]
+
+        count = grid()
+        present = count >= MIN_WEIGHT
+        with np.errstate(invalid="ignore", divide="ignore"):
+            if metric == "count":
+                value = np.where(present, count, np.nan)
+                lo, hi = 0.0, float(count.max()) if present.any() else 1.0
+                t, alpha = np.sqrt(value / hi), np.sqrt(value / hi) + 0.2
+            elif metric == "mean_melt":
+                n_melt = grid(points["has_melt"])
+                value = np.where(n_melt >= MIN_WEIGHT, grid(points["melt"]) / n_melt, np.nan)
+                lo, hi = points["melt_range"]
+                t, alpha = (hi - value) / (hi - lo or 1.0), count
+            else:
+                value = np.where(present, grid(points["high"]) / count, np.nan)
+                lo, hi = 0.0, 1.0
+                t, alpha = value, count
+
+        if fmt == "png":
+            data, mimetype = encode_png(colorize(t, alpha)), "image/png"
+        else:
+            header = np.array([width, height], dtype="<u4").tobytes()
+            data, mimetype = header + value.astype("<f4").tobytes(), "application/octet-stream"
+        return {"data": data, "mimetype": mimetype, "range": (float(lo), float(hi))}
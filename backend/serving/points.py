@@ -0,0 +1,81 @@
+"""
+points.py
+Binary point layer of the glacier explorer map.
+
+The map draws every glacier on one canvas from typed arrays instead of
+a DOM marker per glacier. payload() packs the positions into a single
+little-endian buffer, built once per dataset version:
+
+    uint32   n
+    float32  lon[n]
+    float32  lat[n]
+    uint32   row[n]      row of the glacier in the published table
+    uint8    risk[n]     index into RISK_LEVELS, len(RISK_LEVELS) = unknown
+
+Points are ordered by descending risk code so higher risks are drawn
+last, on top. Attributes are not in the buffer; the client fetches the
+record of a clicked point with record(row), quoting token() so a row
+number is never resolved against a different version of the table.
+"""
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from backend.serving.cache import LRUCache
+from grid_pyramid import RISK_LEVELS
+
+DATASET = "glaciers"
+CACHE_SIZE = 2048
+
+
+class GlacierPoints:
+    def __init__(self, datasets, dataset=DATASET):
+        self.datasets = datasets
+        self.dataset = dataset
+        self.cache = LRUCache(CACHE_SIZE)
+        self._payload = (None, None)
+
+    def token(self):
+        """Short id of the dataset version, the same in every worker process."""
+        _, _, mtime_ns, size = self.datasets.version(self.dataset)
+        return f"{mtime_ns:x}-{size:x}"
+
+    def payload(self):
+        """The packed point buffer (bytes) of the current dataset version."""
+        version = self.datasets.version(self.dataset)
+        if self._payload[0] != version:
+            self._payload = (version, self._pack(self.datasets.table(self.dataset)))
+        return self._payload[1]
+
+    @staticmethod
+    def _pack(table):
+        valid = pc.and_(pc.is_valid(table["lat"]), pc.is_valid(table["lon"]))
+        rows = np.flatnonzero(valid.to_numpy(zero_copy_only=False)).astype(np.uint32)
+        table = table.filter(valid)
+
+        risk = pc.index_in(table["risk_level"], value_set=pa.array(RISK_LEVELS))
+        risk = pc.fill_null(risk, len(RISK_LEVELS)).to_numpy().astype(np.uint8)
+        order = np.argsort(-risk.astype(np.int16), kind="stable")
+
+        lon = table["lon"].to_numpy().astype("<f4")[order]
+        lat = table["lat"].to_numpy().astype("<f4")[order]
+        return b"".join([
+            np.array([len(order)], dtype="<u4").tobytes(),
+            lon.tobytes(),
+            lat.tobytes(),
+            rows[order].astype("<u4").tobytes(),
+            risk[order].tobytes(),
+        ])
+
+    def record(self, row):
+        """All columns of one glacier row, or None if out of range."""
+        key = (self.datasets.version(self.dataset), row)
+        result = self.cache.get(key)
+        if result is None:
+            table = self.datasets.table(self.dataset)
+            if not 0 <= row < table.num_rows:
+                return None
+            result = table.slice(row, 1).to_pylist()[0]
+            self.cache.put(key, result)
+        return result
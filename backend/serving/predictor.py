@@ -0,0 +1,339 @@
+"""
+predictor.py
+What-if melt predictions for /api/predict.
+
+- The persisted melt model is loaded once per worker process, on first
+  use: the packed forest (models/melt_forest.npz, no unpickling) when it
+  exists, otherwise the joblib model from 08_future_melt_projection.py.
+  Baseline features come from the climate_features dataset.
+- Concurrent requests are coalesced by MicroBatcher into one vectorized
+  model call per few milliseconds.
+- Identical (glacier, deltas) queries are answered from an LRU cache.
+- With the packed forest each prediction carries the spread and
+  quantiles of the per-tree outputs ("interval"), scored in the same
+  pass as the mean.
+"""
+
+import os
+import queue
+import threading
+import time
+
+import numpy as np
+
+from backend.serving.cache import LRUCache
+
+FEATURES = ["area_km2", "temp_mean", "prec_mean", "srad_mean"]
+
+MAX_BATCH_ROWS = 8192     # rows per coalesced model call
+MAX_WAIT_MS = 2.0         # how long the first request waits for company
+MAX_QUEUE = 1024          # pending requests before new ones are refused
+REQUEST_TIMEOUT_S = 2.0   # upper bound on a request's wait for its batch
+WARM_TIMEOUT_S = 300.0    # first batch of a worker (Numba compiles the kernels)
+MAX_QUERY_ROWS = 20000    # rows accepted in one request
+CACHE_SIZE = 100_000      # cached (glacier, deltas) predictions
+
+
+class PredictError(ValueError):
+    """Bad /api/predict payload (reported to the client as HTTP 400)."""
+
+
+class Overloaded(RuntimeError):
+    """Batch queue full or batch too slow (reported as HTTP 503)."""
+
+
+# -----------------------------
+# MICRO-BATCHING
+# -----------------------------
+class _Pending:
+    __slots__ = ("X", "result", "error", "done")
+
+    def __init__(self, X):
+        self.X = X
+        self.result = None
+        self.error = None
+        self.done = threading.Event()
+
+
+class MicroBatcher:
+    """
+    Collects rows from concurrent callers for up to `max_wait_ms` (or
+    `max_batch_rows` rows), runs `fn` once on the stacked matrix and
+    hands each caller its slice of the result.
+    """
+
+    def __init__(self, fn, max_batch_rows=MAX_BATCH_ROWS, max_wait_ms=MAX_WAIT_MS,
+                 max_queue=MAX_QUEUE):
+        self.fn = fn
+        self.max_batch_rows = max_batch_rows
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._closed = False
+        self.batches = 0
+        self.rows = 0
+
+    def close(self):
+        """Stop the batch thread once it has drained the queue."""
+        with self._lock:
+            self._closed = True
+            if self._thread is not None and self._pid == os.getpid():
+                self._queue.put(None)
+
+    def _ensure_thread(self):
+        # Started lazily so each forked web worker gets its own thread
+        if self._closed:
+            raise Overloaded("predictor has been replaced")
+        if self._thread is None or self._pid != os.getpid():
+            with self._lock:
+                if self._thread is None or self._pid != os.getpid():
+                    self._queue = queue.Queue(maxsize=self._queue.maxsize)
+                    self._pid = os.getpid()
+                    self._thread = threading.Thread(
+                        target=self._run, name="melt-microbatcher", daemon=True
+                    )
+                    self._thread.start()
+
+    def submit(self, X, timeout=REQUEST_TIMEOUT_S):
+        self._ensure_thread()
+        item = _Pending(X)
+        try:
+            self._queue.put(item, timeout=timeout)
+        except queue.Full:
+            raise Overloaded("prediction queue is full")
+        if not item.done.wait(timeout):
+            raise Overloaded("prediction batch timed out")
+        if item.error is not None:
+            raise item.error
+        return item.result
+
+    def _run(self):
+        q = self._queue
+        while True:
+            first = q.get()
+            if first is None:  # close()
+                return
+            batch = [first]
+            rows = len(first.X)
+            deadline = time.monotonic() + self.max_wait
+
+            while rows < self.max_batch_rows:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = q.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    q.put(None)  # stop after this batch
+                    break
+                batch.append(item)
+                rows += len(item.X)
+
+            try:
+                y = self.fn(np.concatenate([b.X for b in batch]))
+                start = 0
+                for b in batch:
+                    b.result = y[start:start + len(b.X)]
+                    start += len(b.X)
+            except Exception as exc:  # surfaced in every waiting request
+                for b in batch:
+                    b.error = exc
+            finally:
+                self.batches += 1
+                self.rows += rows
+                for b in batch:
+                    b.done.set()
+
+
+# -----------------------------
+# PREDICTOR
+# -----------------------------
+class MeltPredictor:
+    """
+    What-if predictions for glaciers, loaded lazily from `data_dir`
+    (models) and `datasets` (baseline features).
+    """
+
+    def __init__(self, data_dir, datasets):
+        self.data_dir = data_dir
+        self.datasets = datasets
+        self.model_dir = os.path.join(data_dir, "models")
+        self.cache = LRUCache(CACHE_SIZE)
+        self.batcher = MicroBatcher(self._predict_matrix)
+        self._lock = threading.Lock()
+        self._loaded = False
+        self.model_kind = None
+        self.interval_names = []
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    # ---- loading ----
+    def load(self):
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+
+            packed_path = os.path.join(self.model_dir, "melt_forest.npz")
+            model_path = os.path.join(self.model_dir, "melt_model.joblib")
+
+            if os.path.exists(packed_path):
+                # Kernels run on the batcher thread; Numba's TBB layer hangs
+                # interpreter exit when launched off the main thread
+                try:
+                    import numba
+                    numba.config.THREADING_LAYER_PRIORITY = ["omp", "workqueue", "tbb"]
+                except ImportError:
+                    pass
+                import forest_engine
+                packed = forest_engine.load_packed(packed_path)
+                quantiles = forest_engine.DEFAULT_QUANTILES
+
+                def predict_fn(X):
+                    out = forest_engine.predict_intervals(packed, X, quantiles)
+                    return np.column_stack([out["mean"], out["std"], *out["quantiles"]])
+
+                self._predict_fn = predict_fn
+                self.interval_names = ["std"] + forest_engine.quantile_names(quantiles)
+                self.model_kind = "packed_forest"
+            elif os.path.exists(model_path):
+                import joblib
+                model = joblib.load(model_path)
+                self._predict_fn = model.predict
+                self.model_kind = model.name
+            else:
+                raise FileNotFoundError(
+                    "No melt model found; run 08_future_melt_projection.py"
+                )
+
+            # Straight from the Arrow columns: no pandas on the serving path
+            base = self.datasets.table("climate_features")
+            index = {}
+            for i, g in enumerate(base["glacier_id"].to_pylist()):
+                index.setdefault(g, i)  # first row of duplicated ids
+            self._index = index
+            self._baseline = np.column_stack([
+                base[f].to_numpy(zero_copy_only=False).astype(np.float64) for f in FEATURES
+            ])
+            self._loaded = True
+
+    def _predict_matrix(self, X):
+        # One row per query: mean, then the interval columns (if any)
+        return np.asarray(self._predict_fn(X), dtype=np.float64).reshape(len(X), -1)
+
+    # ---- request parsing ----
+    @staticmethod
+    def _parse(payload):
+        """
+        Accepts
+          {"glacier_id": "...", "deltas": {"temp_mean": 1.5}}
+          {"glacier_ids": [...], "deltas": {...}}
+          {"queries": [{"glacier_id": "...", "deltas": {...}}, ...]}
+        Deltas are added to the glacier's baseline feature values.
+        """
+        if not isinstance(payload, dict):
+            raise PredictError("JSON object expected")
+
+        if "queries" in payload:
+            queries = payload["queries"]
+            if not isinstance(queries, list):
+                raise PredictError("'queries' must be a list")
+        elif "glacier_ids" in payload:
+            ids = payload["glacier_ids"]
+            if not isinstance(ids, list):
+                raise PredictError("'glacier_ids' must be a list")
+            queries = [{"glacier_id": g, "deltas": payload.get("deltas", {})} for g in ids]
+        elif "glacier_id" in payload:
+            queries = [payload]
+        else:
+            raise PredictError("expected 'glacier_id', 'glacier_ids' or 'queries'")
+
+        if not queries:
+            raise PredictError("no queries given")
+        if len(queries) > MAX_QUERY_ROWS:
+            raise PredictError(f"at most {MAX_QUERY_ROWS} queries per request")
+
+        ids, deltas = [], np.zeros((len(queries), len(FEATURES)))
+        for i, q in enumerate(queries):
+            if not isinstance(q, dict) or "glacier_id" not in q:
+                raise PredictError(f"query {i}: missing 'glacier_id'")
+            ids.append(str(q["glacier_id"]))
+            d = q.get("deltas") or {}
+            if not isinstance(d, dict):
+                raise PredictError(f"query {i}: 'deltas' must be an object")
+            for name, value in d.items():
+                if name not in FEATURES:
+                    raise PredictError(f"query {i}: unknown feature '{name}'")
+                try:
+                    value = float(value)
+                except (TypeError, ValueError):
+                    raise PredictError(f"query {i}: delta for '{name}' is not a number") from None
+                if not np.isfinite(value):
+                    raise PredictError(f"query {i}: delta for '{name}' must be finite")
+                deltas[i, FEATURES.index(name)] = value
+        return ids, deltas
+
+    # ---- public ----
+    def close(self):
+        self.batcher.close()
+
+    def warm(self):
+        """
+        Load the model and score one baseline row on the batch thread, so
+        a fresh worker compiles the forest kernels before its first request.
+        """
+        self.load()
+        if len(self._baseline):
+            self.batcher.submit(self._baseline[:1], timeout=WARM_TIMEOUT_S)
+
+    def predict(self, payload):
+        self.load()
+        ids, deltas = self._parse(payload)
+
+        pos = np.fromiter((self._index.get(g, -1) for g in ids), dtype=np.int64, count=len(ids))
+        unknown = [g for g, p in zip(ids, pos) if p < 0]
+        if unknown:
+            raise PredictError(f"unknown glacier_id(s): {unknown[:10]}")
+
+        keys = [(g, tuple(row)) for g, row in zip(ids, deltas.tolist())]
+        preds = self.cache.get_many(keys)
+        miss = [i for i, p in enumerate(preds) if p is None]
+
+        self.cache_hits += len(keys) - len(miss)
+        self.cache_misses += len(miss)
+
+        if miss:
+            X = self._baseline[pos[miss]] + deltas[miss]
+            y = [tuple(v) for v in self.batcher.submit(X).tolist()]
+            self.cache.put_many((keys[i], v) for i, v in zip(miss, y))
+            for i, v in zip(miss, y):
+                preds[i] = v
+
+        names = self.interval_names
+        return [
+            {
+                "glacier_id": g,
+                "deltas": {f: d for f, d in zip(FEATURES, row) if d != 0},
+                "predicted_melt": p[0],
+                **({"interval": dict(zip(names, p[1:]))} if names else {}),
+            }
+            for g, row, p in zip(ids, deltas.tolist(), preds)
+        ]
+
+    def stats(self):
+        return {
+            "model": self.model_kind,
+            "loaded": self._loaded,
+            "features": FEATURES,
+            "interval": self.interval_names,
+            "batches": self.batcher.batches,
+            "batched_rows": self.batcher.rows,
+            "cache_size": len(self.cache),
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses,
+        }
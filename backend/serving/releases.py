@@ -0,0 +1,193 @@
+"""
+releases.py
+Hot-swapping between published releases (release_store.py).
+
+A Release bundles everything a request reads from one release
+directory: the dataset store, the memoized stats and grid lookups, the
+timeseries store and the predictor. ReleaseManager.current() hands out
+the live bundle; a background thread per worker process (started as the
+worker is forked) warms the release it started with, then polls the
+CURRENT pointer, builds and warms the bundle of a new release off the
+request path and swaps the reference. Requests that started on
+the old release finish on it, and the first request on the new one
+finds its tables open, its dashboard aggregates computed and the map's
+point buffer packed.
+
+When nothing has been published yet the processed directory itself is
+served as an unversioned release, reopening files as stages replace
+them (the pre-release layout).
+"""
+
+import os
+import threading
+import time
+
+from backend.serving.charts import GlacierCharts
+from backend.serving.exposure import GlacierExposure
+from backend.serving.grid import GridLookup
+from backend.serving.heatmap import GlacierHeatmap
+from backend.serving.points import GlacierPoints
+from backend.serving.predictor import MeltPredictor
+from backend.serving.stats import GlacierStats
+from charts import CHART_DIR
+from dataset_store import DATASETS, DatasetStore
+from release_store import ReleaseError, current_release, read_manifest
+from timeseries_store import TimeseriesStore, META_FILE, live_dir
+
+POLL_SECONDS = 2.0
+# How long a replaced release stays usable for requests still running on it
+RETIRE_AFTER_S = 60.0
+UNVERSIONED = "unversioned"
+
+
+class Release:
+    def __init__(self, path, version=UNVERSIONED, manifest=None, chart_dir=None):
+        self.path = path
+        self.version = version
+        self.manifest = manifest
+        self.datasets = DatasetStore(path)
+        self.stats = GlacierStats(self.datasets)
+        self.grid = GridLookup(self.datasets)
+        self.points = GlacierPoints(self.datasets)
+        self.exposure = GlacierExposure(self.datasets)
+        self.heatmap = GlacierHeatmap(self.datasets)
+        # Chart cache shared by all releases (its keys carry the data version)
+        self.charts = GlacierCharts(self.datasets, chart_dir or os.path.join(path, CHART_DIR))
+        self.predictor = MeltPredictor(path, self.datasets)
+        self._timeseries = (None, None)
+        self._lock = threading.Lock()
+
+    def timeseries(self):
+        """Timeseries store; raises FileNotFoundError if the release has none."""
+        # A release holds one store; the processed dir its CURRENT version
+        ts_dir = live_dir(os.path.join(self.path, "timeseries"))
+        st = os.stat(os.path.join(ts_dir, META_FILE))
+        key = (st.st_ino, st.st_mtime_ns)
+        if self._timeseries[0] != key:
+            with self._lock:
+                if self._timeseries[0] != key:
+                    self._timeseries = (key, TimeseriesStore(ts_dir))
+        return self._timeseries[1]
+
+    def check(self):
+        """Every dataset in the manifest opens with the row count it was published with."""
+        for name, info in (self.manifest or {}).get("datasets", {}).items():
+            rows = self.datasets.table(name).num_rows
+            if rows != info["rows"]:
+                raise ReleaseError(f"❌ {name}: {rows} rows, manifest says {info['rows']}")
+
+    def warm(self):
+        """Open the release's files and precompute what the pages ask for first."""
+        self.check()
+        names = self.manifest["datasets"] if self.manifest else DATASETS
+        steps = [
+            lambda: [self.datasets.table(n) for n in names],
+            self.timeseries,
+            lambda: self.stats.risk_counts("risk_level"),
+            lambda: self.stats.summary("region", "predicted_melt"),
+            lambda: self.stats.top("predicted_melt", 10, True),
+            lambda: self.stats.top("predicted_melt", 3, True),
+            lambda: self.grid.cells(0, -180, -85, 180, 85),
+            self.points.payload,
+            self.exposure.index,
+            self.predictor.warm,
+        ]
+        for step in steps:
+            try:
+                step()
+            except Exception as exc:  # best effort; the endpoint reports it
+                print(f"⚠️ Warming release {self.version}: {exc}")
+
+    def close(self):
+        self.predictor.close()
+
+    def describe(self):
+        manifest = self.manifest or {}
+        return {
+            "version": self.version,
+            "published_at": manifest.get("published_at"),
+            "content_hash": manifest.get("content_hash"),
+            "datasets": manifest.get("datasets", {}),
+        }
+
+
+class ReleaseManager:
+    def __init__(self, data_dir, poll_seconds=POLL_SECONDS):
+        self.data_dir = data_dir
+        self.poll_seconds = poll_seconds
+        self._current = self._open(current_release(data_dir))
+        self._retired = []
+        self._failed = None
+        self._pid = None
+        self._lock = threading.Lock()
+        # Forked web workers (gunicorn --preload) warm up before traffic
+        # arrives rather than on their first request
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def _open(self, pointer):
+        chart_dir = os.path.join(self.data_dir, CHART_DIR)
+        if pointer is None:
+            return Release(self.data_dir, chart_dir=chart_dir)
+        version, path = pointer
+        return Release(path, version, read_manifest(path), chart_dir)
+
+    def current(self):
+        self._ensure_watcher()
+        return self._current
+
+    # ---- background swap ----
+    def _after_fork(self):
+        self._lock = threading.Lock()   # may have been held by a parent thread
+        self._ensure_watcher()
+
+    def _ensure_watcher(self):
+        # Started lazily so each forked web worker polls on its own
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._pid = os.getpid()
+                    threading.Thread(
+                        target=self._watch, name="release-watcher", daemon=True
+                    ).start()
+
+    def _watch(self):
+        # This process's copy of the startup release (never warmed at
+        # import: the model's JIT compile would dominate startup)
+        try:
+            self._current.warm()
+        except (OSError, ReleaseError, ValueError) as exc:
+            print(f"⚠️ Warming release {self._current.version}: {exc}")
+        while True:
+            time.sleep(self.poll_seconds)
+            try:
+                self.poll()
+            except Exception as exc:  # keep serving the current release
+                print(f"⚠️ Release watcher: {exc}")
+
+    def poll(self):
+        """Swap to a newly published release; returns True if it did."""
+        now = time.monotonic()
+        for retired_at, release in list(self._retired):
+            if now - retired_at > RETIRE_AFTER_S:
+                release.close()
+                self._retired.remove((retired_at, release))
+
+        pointer = current_release(self.data_dir)
+        version = pointer[0] if pointer else UNVERSIONED
+        if version == self._current.version or version == self._failed:
+            return False
+
+        try:
+            release = self._open(pointer)
+            t0 = time.perf_counter()
+            release.warm()
+        except (OSError, ReleaseError, ValueError) as exc:
+            self._failed = version
+            print(f"❌ Not switching to release {version}: {exc}")
+            return False
+
+        old, self._current = self._current, release
+        self._retired.append((now, old))
+        print(f"🔄 Switched to release {version} (warmed in {time.perf_counter() - t0:.2f}s)")
+        return True
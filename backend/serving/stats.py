@@ -0,0 +1,170 @@
+"""
+stats.py
+Server-side aggregates over the glacier table for the dashboard pages.
+
+Every result is computed with vectorized Arrow/NumPy operations on the
+memory-mapped dataset and memoized per dataset version, so repeated page
+loads cost a dictionary lookup until the pipeline republishes the data.
+"""
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from backend.serving.cache import LRUCache
+
+DATASET = "glaciers"
+
+CATEGORICAL = ["risk_level", "melt_category", "flood_risk_level"]
+# "region" is the RGI first-order region, derived from glacier_id
+GROUP_COLUMNS = CATEGORICAL + ["region", "basin"]
+
+DEFAULT_BINS = 20
+MAX_BINS = 200
+MAX_TOP = 100
+CACHE_SIZE = 512
+
+
+class StatsError(ValueError):
+    """Bad /api/stats query (reported to the client as HTTP 400)."""
+
+
+class GlacierStats:
+    def __init__(self, datasets, dataset=DATASET):
+        self.datasets = datasets
+        self.dataset = dataset
+        self.cache = LRUCache(CACHE_SIZE)
+
+    # ---- helpers ----
+    def _memo(self, key, compute):
+        key = (self.datasets.version(self.dataset),) + key
+        result = self.cache.get(key)
+        if result is None:
+            result = compute(self.datasets.table(self.dataset))
+            self.cache.put(key, result)
+        return result
+
+    @staticmethod
+    def _numeric(table, col):
+        if col not in table.column_names:
+            raise StatsError(f"unknown column '{col}'")
+        arr = table[col]
+        if not (pa.types.is_floating(arr.type) or pa.types.is_integer(arr.type)):
+            raise StatsError(f"column '{col}' is not numeric")
+        return arr.to_numpy(zero_copy_only=False).astype(np.float64, copy=False)
+
+    @staticmethod
+    def _group_key(table, by):
+        if by not in GROUP_COLUMNS:
+            raise StatsError(f"'by' must be one of {GROUP_COLUMNS}")
+        if by == "region":
+            # RGI2000-v7.0-G-14-00001 -> "14"
+            parts = pc.split_pattern(table["glacier_id"], "-")
+            return pc.list_element(parts, 3)
+        if by not in table.column_names:
+            raise StatsError(f"column '{by}' is not in the published data")
+        return pc.cast(table[by], pa.string())
+
+    # ---- public ----
+    def risk_counts(self, col="risk_level"):
+        if col not in CATEGORICAL:
+            raise StatsError(f"'col' must be one of {CATEGORICAL}")
+
+        def compute(table):
+            counts = pc.value_counts(pc.fill_null(table[col], "Unknown"))
+            return {
+                "column": col,
+                "total": table.num_rows,
+                "counts": {
+                    c["values"]: c["counts"] for c in counts.to_pylist()
+                },
+            }
+        return self._memo(("risk_counts", col), compute)
+
+    def histogram(self, col, bins=DEFAULT_BINS, lo=None, hi=None):
+        if not 1 <= bins <= MAX_BINS:
+            raise StatsError(f"'bins' must be between 1 and {MAX_BINS}")
+
+        def compute(table):
+            values = self._numeric(table, col)
+            valid = values[np.isfinite(values)]
+            rng = None
+            if lo is not None or hi is not None:
+                rng = (
+                    lo if lo is not None else float(valid.min(initial=0.0)),
+                    hi if hi is not None else float(valid.max(initial=0.0)),
+                )
+            try:
+                counts, edges = np.histogram(valid, bins=bins, range=rng)
+            except ValueError as e:
+                raise StatsError(str(e))
+            return {
+                "column": col,
+                "edges": edges.tolist(),
+                "counts": counts.tolist(),
+                "n": int(len(valid)),
+                "missing": int(len(values) - len(valid)),
+            }
+        return self._memo(("histogram", col, bins, lo, hi), compute)
+
+    def summary(self, by, col="predicted_melt"):
+        """Count, mean, min, max of `col` and the risk mix per group."""
+        def compute(table):
+            values = self._numeric(table, col)
+            key = pc.fill_null(self._group_key(table, by), "Unknown")
+
+            grouped = pa.table({
+                "group": key,
+                "value": pa.array(values, mask=np.isnan(values)),
+                "risk": pc.fill_null(table["risk_level"], "Unknown"),
+            })
+            stats = grouped.group_by("group").aggregate([
+                ("group", "count"), ("value", "mean"),
+                ("value", "min"), ("value", "max"),
+            ])
+            mix = grouped.group_by(["group", "risk"]).aggregate([("group", "count")])
+
+            risk = {}
+            for r in mix.to_pylist():
+                risk.setdefault(r["group"], {})[r["risk"]] = r["group_count"]
+
+            rows = [
+                {
+                    by: s["group"],
+                    "glaciers": s["group_count"],
+                    f"mean_{col}": s["value_mean"],
+                    f"min_{col}": s["value_min"],
+                    f"max_{col}": s["value_max"],
+                    "risk_counts": risk.get(s["group"], {}),
+                }
+                for s in stats.to_pylist()
+            ]
+            rows.sort(key=lambda r: -r["glaciers"])
+            return {"by": by, "column": col, "groups": rows}
+        return self._memo(("summary", by, col), compute)
+
+    def top(self, col="predicted_melt", n=10, ascending=True):
+        """
+        The n glaciers with the lowest (or highest) `col`, each with its
+        percentile: the share of glaciers it ranks ahead of.
+        """
+        if not 1 <= n <= MAX_TOP:
+            raise StatsError(f"'n' must be between 1 and {MAX_TOP}")
+
+        def compute(table):
+            values = self._numeric(table, col)
+            finite = np.isfinite(values)
+            keyed = np.where(finite, values if ascending else -values, np.inf)
+
+            # Stable sort: ties keep table order, so results are reproducible
+            idx = np.argsort(keyed, kind="stable")[:min(n, int(finite.sum()))]
+
+            ranked = np.sort(keyed[finite])
+            ahead = len(ranked) - np.searchsorted(ranked, keyed[idx], side="right")
+            pct = 100.0 * ahead / max(len(ranked), 1)
+
+            rows = table.take(pa.array(idx)).to_pylist()
+            for row, p in zip(rows, pct.tolist()):
+                row["percentile"] = p
+            return {"column": col, "ascending": ascending, "glaciers": rows}
+        return self._memo(("top", col, n, ascending), compute)
@@ -1,56 +1,440 @@
-document.addEventListener("DOMContentLoaded", () => {
-  fetch("/api/glaciers")
-    .then(res => res.json())
-    .then(data => initMap(data))
-    .catch(err => console.error("API error:", err));
-});
+// ===============================
+// GLACIER EXPLORER MAP
+// ===============================
+// All glaciers are drawn on one canvas from typed arrays
+// (/api/glaciers/points) instead of a DOM marker per glacier. Clicks are
+// hit-tested against a client-side grid index and a glacier's attributes
+// are only fetched once it is clicked.
 
-function initMap(glaciers) {
+const RISK_LEVELS = ["High", "Medium", "Low", "Unknown"];  // codes in the point buffer
+const INDEX_LEVEL = 16;   // hit-test grid: 2^16 x 2^16 Web Mercator cells
+const HIT_RADIUS = 6;     // click tolerance (CSS px)
+const PAD = 0.2;          // canvas margin around the view, drawn ahead of panning
+const HEATMAP_TILE = 256; // heatmap extents snap to this tile grid (px)
+const HEATMAP_MAX = 1024; // largest raster side the server renders
+const HEATMAP_METRICS = {
+  "": "Points only",
+  count: "Glacier density",
+  mean_melt: "Mean predicted melt",
+  high_risk_fraction: "High-risk share",
+};
 
+document.addEventListener("DOMContentLoaded", () => {
   const map = L.map("map").setView([30.5, 79.5], 6);
 
   L.tileLayer("https://{s}.tile.openstreetmap.org/{z}/{x}/{y}.png", {
     attribution: "&copy; OpenStreetMap"
   }).addTo(map);
 
-  function riskColor(risk) {
-    if (risk === "High") return "#d73027";
-    if (risk === "Medium") return "#fc8d59";
-    return "#1a9850";
+  const layer = new PointLayer().addTo(map);
+  layer.on("select", e => showGlacier(layer, e.index));
+  loadPoints(layer);
+  addHeatmap(map);
+});
+
+function riskColor(risk) {
+  if (risk === "High") return "#d73027";
+  if (risk === "Medium") return "#fc8d59";
+  return "#1a9850";
+}
+
+// ===============================
+// POINT BUFFER
+// ===============================
+function loadPoints(layer) {
+  const t0 = performance.now();
+  let version = "";
+
+  return fetch("/api/glaciers/points")
+    .then(res => {
+      if (!res.ok) throw new Error(`HTTP ${res.status}`);
+      version = (res.headers.get("ETag") || "").replace(/^W\//, "").replace(/"/g, "");
+      return res.arrayBuffer();
+    })
+    .then(buf => {
+      layer.setPoints(unpackPoints(buf, version));
+      console.log(`🗺️ Rendered ${layer.points.n} glaciers in ${(performance.now() - t0).toFixed(0)} ms`);
+    })
+    .catch(err => console.error("API error:", err));
+}
+
+// Layout (little-endian, see backend/serving/points.py):
+// uint32 n | float32 lon[n] | float32 lat[n] | uint32 row[n] | uint8 risk[n]
+function unpackPoints(buf, version) {
+  const n = new DataView(buf).getUint32(0, true);
+  const lon = new Float32Array(buf, 4, n);
+  const lat = new Float32Array(buf, 4 + 4 * n, n);
+  const row = new Uint32Array(buf, 4 + 8 * n, n);
+  const risk = new Uint8Array(buf, 4 + 12 * n, n);
+
+  // Web Mercator world coordinates in [0, 1]; pixel = world * 256 * 2^zoom
+  const mx = new Float64Array(n), my = new Float64Array(n);
+  for (let i = 0; i < n; i++) {
+    const s = Math.min(Math.max(Math.sin(lat[i] * Math.PI / 180), -0.9999), 0.9999);
+    mx[i] = (lon[i] + 180) / 360;
+    my[i] = 0.5 - Math.log((1 + s) / (1 - s)) / (4 * Math.PI);
+  }
+
+  return { n, lon, lat, row, risk, mx, my, version, index: buildIndex(mx, my) };
+}
+
+// ===============================
+// SPATIAL INDEX
+// ===============================
+// Point ids sorted by cell key = y * 2^level + x, so the points of a row
+// of cells are one contiguous run found by binary search (the same
+// layout as the server's grid pyramid).
+function buildIndex(mx, my) {
+  const size = 2 ** INDEX_LEVEL;
+  const cell = v => Math.min(Math.max(Math.floor(v * size), 0), size - 1);
+
+  // key * 2^21 + id stays exact in a double (keys < 2^32, ids < 2^21), so
+  // one native numeric sort orders ids by key without a comparator
+  const packed = new Float64Array(mx.length);
+  for (let i = 0; i < mx.length; i++) packed[i] = (cell(my[i]) * size + cell(mx[i])) * 2 ** 21 + i;
+  packed.sort();
+
+  const order = new Uint32Array(packed.length);
+  const sorted = new Float64Array(packed.length);
+  for (let i = 0; i < packed.length; i++) {
+    sorted[i] = Math.floor(packed[i] / 2 ** 21);
+    order[i] = packed[i] - sorted[i] * 2 ** 21;
   }
 
-  glaciers.forEach(g => {
-    if (g.lat === null || g.lon === null) return;
+  return { size, cell, order, sorted };
+}
 
-    const marker = L.circleMarker([g.lat, g.lon], {
-      radius: 4,
-      color: riskColor(g.risk_level),
-      fillColor: riskColor(g.risk_level),
-      fillOpacity: 0.8
-    }).addTo(map);
+function lowerBound(arr, value) {
+  let lo = 0, hi = arr.length;
+  while (lo < hi) {
+    const mid = (lo + hi) >>> 1;
+    if (arr[mid] < value) lo = mid + 1; else hi = mid;
+  }
+  return lo;
+}
 
-    marker.on("click", () => {
+// Point ids inside a world-coordinate box
+function queryIndex(index, x0, y0, x1, y1) {
+  const { size, cell, order, sorted } = index;
+  const cx0 = cell(x0), cx1 = cell(x1);
+  const out = [];
+  for (let cy = cell(y0); cy <= cell(y1); cy++) {
+    const start = lowerBound(sorted, cy * size + cx0);
+    const stop = lowerBound(sorted, cy * size + cx1 + 1);
+    for (let k = start; k < stop; k++) out.push(order[k]);
+  }
+  return out;
+}
 
-      const area = g.area_km2 !== null ? g.area_km2.toFixed(2) : "NA";
-      const melt = g.predicted_melt !== null ? g.predicted_melt.toFixed(2) : "NA";
+// ===============================
+// CANVAS LAYER
+// ===============================
+const PointLayer = L.Layer.extend({
+  onAdd(map) {
+    this._canvas = L.DomUtil.create("canvas", "glacier-points leaflet-zoom-hide");
+    map.getPanes().overlayPane.appendChild(this._canvas);
+    map.on("moveend zoomend resize", this._redraw, this);
+    map.on("click", this._onClick, this);
+    map.on("mousemove", this._onHover, this);
+    this._redraw();
+  },
 
-      document.getElementById("glacier-info").innerHTML = `
-        <h3>${g.glacier_id}</h3>
+  onRemove(map) {
+    L.DomUtil.remove(this._canvas);
+    map.off("moveend zoomend resize", this._redraw, this);
+    map.off("click", this._onClick, this);
+    map.off("mousemove", this._onHover, this);
+  },
 
-        <p><b>Latitude:</b> ${g.lat.toFixed(4)}</p>
-        <p><b>Longitude:</b> ${g.lon.toFixed(4)}</p>
+  setPoints(points) {
+    this.points = points;
+    this._redraw();
+  },
 
-        <p><b>Area:</b> ${area} km²</p>
-        <p><b>Predicted Melt:</b> ${melt}</p>
+  _scale() {
+    return 256 * 2 ** this._map.getZoom();
+  },
 
-        <p><b>Risk Level:</b>
-          <span style="color:${riskColor(g.risk_level)}; font-weight:600">
-            ${g.risk_level}
-          </span>
-        </p>
-      `;
+  _redraw() {
+    const map = this._map, canvas = this._canvas;
+    if (!map || !this.points) return;
+
+    // Canvas covers the view plus a margin; panning moves it with the
+    // map pane and it is only redrawn once the move ends
+    const size = map.getSize();
+    const pad = size.multiplyBy(PAD).round();
+    const topLeft = map.containerPointToLayerPoint(pad.multiplyBy(-1));
+    const dpr = window.devicePixelRatio || 1;
+    const w = Math.round((size.x + 2 * pad.x) * dpr), h = Math.round((size.y + 2 * pad.y) * dpr);
+
+    L.DomUtil.setPosition(canvas, topLeft);
+    canvas.width = w;
+    canvas.height = h;
+    canvas.style.width = `${w / dpr}px`;
+    canvas.style.height = `${h / dpr}px`;
+
+    const ctx = canvas.getContext("2d");
+    const image = ctx.createImageData(w, h);
+    const pixels = new Uint32Array(image.data.buffer);
+
+    const zoom = map.getZoom();
+    const scale = this._scale() * dpr;
+    // World pixel of the canvas' top-left corner
+    const origin = map.getPixelOrigin().add(topLeft);
+    const ox = origin.x * dpr, oy = origin.y * dpr;
+    const r = Math.max(1, Math.round((zoom < 6 ? 1 : zoom < 9 ? 1.5 : 2.5) * dpr));
+
+    // RGBA bytes of each risk code as one little-endian uint32
+    const colors = Uint32Array.from(RISK_LEVELS, name => {
+      const c = parseInt(riskColor(name).slice(1), 16);
+      return (0xff000000 | ((c & 0xff) << 16) | (c & 0xff00) | (c >> 16)) >>> 0;
+    });
+
+    // Buffer order puts higher risks last, so they end up on top
+    const { n, mx, my, risk } = this.points;
+    for (let i = 0; i < n; i++) {
+      const x = Math.round(mx[i] * scale - ox), y = Math.round(my[i] * scale - oy);
+      if (x < -r || y < -r || x >= w + r || y >= h + r) continue;
+      const color = colors[risk[i]];
+      const ya = Math.max(y - r, 0), yb = Math.min(y + r, h - 1);
+      const xa = Math.max(x - r, 0), xb = Math.min(x + r, w - 1);
+      for (let yy = ya; yy <= yb; yy++) {
+        pixels.fill(color, yy * w + xa, yy * w + xb + 1);
+      }
+    }
+    ctx.putImageData(image, 0, 0);
+  },
+
+  // Nearest point within HIT_RADIUS of a container point, or -1
+  hitTest(containerPoint) {
+    if (!this.points) return -1;
+    const scale = this._scale();
+    const p = this._map.getPixelOrigin().add(this._map.containerPointToLayerPoint(containerPoint));
+    const wx = p.x / scale, wy = p.y / scale;
+    const tol = HIT_RADIUS / scale;
+
+    const { mx, my } = this.points;
+    let best = -1, bestDist = tol * tol;
+    for (const i of queryIndex(this.points.index, wx - tol, wy - tol, wx + tol, wy + tol)) {
+      const d = (mx[i] - wx) ** 2 + (my[i] - wy) ** 2;
+      // On ties, the point drawn on top (later in the buffer) wins
+      if (d < bestDist || (d === bestDist && i > best)) {
+        best = i;
+        bestDist = d;
+      }
+    }
+    return best;
+  },
+
+  _onClick(e) {
+    const index = this.hitTest(e.containerPoint);
+    if (index >= 0) this.fire("select", { index });
+  },
+
+  _onHover(e) {
+    if (this._hoverPending) return;
+    this._hoverPending = true;
+    requestAnimationFrame(() => {
+      this._hoverPending = false;
+      this._map.getContainer().style.cursor = this.hitTest(e.containerPoint) >= 0 ? "pointer" : "";
     });
+  }
+});
+
+// ===============================
+// HEATMAP OVERLAY
+// ===============================
+// Server-rendered density / aggregate rasters (/api/heatmap) under the
+// points. The extent is snapped outward to the tile grid of the zoom
+// level, so returning to a view asks for the same, cached, raster.
+function addHeatmap(map) {
+  map.createPane("heatmap").style.zIndex = 350;  // below the overlay pane
+  let metric = "";
+  let overlay = null;
+  let request = 0;
+
+  const control = L.control({position: "topright"});
+  control.onAdd = () => {
+    const select = L.DomUtil.create("select", "heatmap-select");
+    select.innerHTML = Object.entries(HEATMAP_METRICS)
+      .map(([value, label]) => `<option value="${value}">${label}</option>`).join("");
+    L.DomEvent.disableClickPropagation(select);
+    select.addEventListener("change", () => { metric = select.value; refresh(); });
+    return select;
+  };
+  control.addTo(map);
+
+  function replace(next) {
+    if (overlay) {
+      URL.revokeObjectURL(overlay.objectUrl);
+      map.removeLayer(overlay);
+    }
+    overlay = next;
+  }
+
+  function refresh() {
+    const id = ++request;
+    if (!metric) return replace(null);
+
+    const zoom = map.getZoom();
+    const px = map.getPixelBounds();
+    const nw = map.unproject(px.min.divideBy(HEATMAP_TILE).floor().multiplyBy(HEATMAP_TILE), zoom);
+    const se = map.unproject(px.max.divideBy(HEATMAP_TILE).ceil().multiplyBy(HEATMAP_TILE), zoom);
+    const west = Math.max(nw.lng, -180), east = Math.min(se.lng, 180);
+    const north = Math.min(nw.lat, 85), south = Math.max(se.lat, -85);
+    if (!(west < east && south < north)) return replace(null);
+
+    const p0 = map.project([north, west], zoom), p1 = map.project([south, east], zoom);
+    const scale = Math.min(1, HEATMAP_MAX / Math.max(p1.x - p0.x, p1.y - p0.y));
+    const width = Math.max(1, Math.round((p1.x - p0.x) * scale));
+    const height = Math.max(1, Math.round((p1.y - p0.y) * scale));
+    const bbox = [west, south, east, north].map(v => v.toFixed(6)).join(",");
+
+    fetch(`/api/heatmap?bbox=${bbox}&width=${width}&height=${height}&metric=${metric}`)
+      .then(res => {
+        if (!res.ok) throw new Error(`HTTP ${res.status}`);
+        return res.blob();
+      })
+      .then(blob => {
+        if (id !== request) return;  // the view moved on meanwhile
+        const url = URL.createObjectURL(blob);
+        const next = L.imageOverlay(url, [[south, west], [north, east]], {
+          pane: "heatmap", opacity: 0.85, interactive: false,
+        }).addTo(map);
+        next.objectUrl = url;
+        replace(next);
+      })
+      .catch(err => console.error("Heatmap error:", err));
+  }
+
+  map.on("moveend", refresh);
+}
+
+// ===============================
+// GLACIER DETAILS (LAZY)
+// ===============================
+let selection = 0;
+let highlight = null;
+
+function showGlacier(layer, index) {
+  const points = layer.points;
+  const ticket = ++selection;
+  const row = points.row[index];
+
+  const map = layer._map;
+  if (highlight) highlight.remove();
+  highlight = L.circleMarker([points.lat[index], points.lon[index]], {
+    radius: 7, color: "#212529", weight: 2, fill: false, interactive: false
+  }).addTo(map);
+
+  fetch(`/api/glaciers/points/${row}?v=${encodeURIComponent(points.version)}`)
+    .then(res => {
+      // Republished since the points were loaded: row numbers changed
+      if (res.status === 409) {
+        loadPoints(layer);
+        return null;
+      }
+      return res.ok ? res.json() : null;
+    })
+    .then(g => {
+      // Another glacier may have been clicked meanwhile
+      if (!g || ticket !== selection) return;
+      renderGlacier(g);
+      loadTimeseries(g.glacier_id);
+    })
+    .catch(err => console.error("API error:", err));
+}
+
+function renderGlacier(g) {
+  const area = g.area_km2 !== null ? g.area_km2.toFixed(2) : "NA";
+  const melt = g.predicted_melt !== null ? g.predicted_melt.toFixed(2) : "NA";
+  // Lowest / highest quantile of the per-tree predictions, when published
+  const [lo, hi] = intervalKeys(g);
+  const interval = lo && g[lo] != null && g[hi] != null
+    ? ` <small>(${g[lo].toFixed(2)} to ${g[hi].toFixed(2)})</small>` : "";
+  const riskRange = g.risk_level_min && g.risk_level_min !== g.risk_level_max
+    ? ` <small>(${g.risk_level_min} to ${g.risk_level_max})</small>` : "";
+  const trend = g.mass_change_trend_per_year != null
+    ? `${g.mass_change_trend_per_year.toFixed(3)} /yr` +
+      (g.trend_p_value != null && g.trend_p_value < 0.05 ? " (significant)" : "")
+    : "NA";
+
+  document.getElementById("glacier-info").innerHTML = `
+    <h3>${g.glacier_id}</h3>
+
+    <p><b>Latitude:</b> ${g.lat.toFixed(4)}</p>
+    <p><b>Longitude:</b> ${g.lon.toFixed(4)}</p>
+
+    <p><b>Area:</b> ${area} km²</p>
+    <p><b>Predicted Melt:</b> ${melt}${interval}</p>
+    <p><b>Mass Change Trend:</b> ${trend}</p>
+
+    <p><b>Risk Level:</b>
+      <span style="color:${riskColor(g.risk_level)}; font-weight:600">
+        ${g.risk_level}
+      </span>${riskRange}
+    </p>
+
+    <div id="glacier-series"><p class="hint">Loading history…</p></div>
+  `;
+}
+
+// ===============================
+// PER-GLACIER SPARKLINES
+// ===============================
+function loadTimeseries(glacierId) {
+  fetch(`/api/glaciers/${encodeURIComponent(glacierId)}/timeseries`)
+    .then(res => res.ok ? res.json() : null)
+    .then(ts => {
+      const box = document.getElementById("glacier-series");
+      // Another glacier may have been clicked meanwhile
+      if (!box || !ts || ts.glacier_id !== glacierId) {
+        if (box && !ts) box.innerHTML = "";
+        return;
+      }
+
+      const h = ts.history, p = ts.projection;
+      const bounds = intervalKeys(p);
+      box.innerHTML = `
+        <p><b>Mass Change</b>
+          <small>${h.year[0] ?? ""}–${p.year[p.year.length - 1] ?? ""}</small></p>
+        ${sparkline(h.year.concat(p.year), [
+          { years: h.year, values: h.mass_change, color: "#0d6efd" },
+          ...bounds.map(k => ({ years: p.year, values: p[k], color: "#f4a582" })),
+          { years: p.year, values: p.predicted_melt, color: "#d73027" }
+        ])}
+        <p><b>Runoff (mm)</b></p>
+        ${sparkline(h.year, [
+          { years: h.year, values: h.runoff_mm, color: "#1a9850" }
+        ])}
+      `;
+    })
+    .catch(err => console.error("Timeseries error:", err));
+}
+
+// Lowest and highest predicted_melt_pNN quantile keys, or [] without an interval
+function intervalKeys(obj) {
+  const q = k => parseFloat(k.slice("predicted_melt_p".length).replace("_", "."));
+  const keys = Object.keys(obj).filter(k => /^predicted_melt_p[\d_]+$/.test(k)).sort((a, b) => q(a) - q(b));
+  return keys.length > 1 ? [keys[0], keys[keys.length - 1]] : [];
+}
+
+function sparkline(allYears, lines, width = 240, height = 48) {
+  const values = lines.flatMap(l => l.values).filter(v => v !== null);
+  if (!allYears.length || !values.length) return "<p>NA</p>";
+
+  const x0 = Math.min(...allYears), x1 = Math.max(...allYears);
+  const y0 = Math.min(...values), y1 = Math.max(...values);
+  const sx = y => (x1 > x0 ? (y - x0) / (x1 - x0) : 0.5) * (width - 4) + 2;
+  const sy = v => height - 2 - (y1 > y0 ? (v - y0) / (y1 - y0) : 0.5) * (height - 4);
+
+  const paths = lines.map(l => {
+    const pts = l.years
+      .map((yr, i) => l.values[i] === null ? null : `${sx(yr).toFixed(1)},${sy(l.values[i]).toFixed(1)}`)
+      .filter(Boolean)
+      .join(" ");
+    return `<polyline points="${pts}" fill="none" stroke="${l.color}" stroke-width="1.5"/>`;
   });
 
-  console.log(`🗺️ Rendered ${glaciers.length} glaciers`);
+  return `<svg width="${width}" height="${height}">${paths.join("")}</svg>`;
 }
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# Pipeline modules import each other by bare name (as the stages do)
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "backend", "scripts"))
@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+
+import flood_uncertainty
+from basin_stats import MELT_CATEGORIES, classify_melt, minmax_by_group
+
+MELT_SCORES = [0.2, 0.4, 0.7, 1.0]
+
+
+def _frame():
+    return pd.DataFrame({
+        "basin": ["A"] * 5 + ["B"] * 3,
+        "z_score": [-1.5, 0.2, np.nan, 1.4, 2.5, 0.0, np.nan, 1.0],
+        "peak_z_score": [0.5, np.nan, 2.0, -0.3, 1.1, np.nan, np.nan, np.nan],
+    })
+
+
+def _deterministic(df, weights):
+    """The index as 07_flood_risk_index.py computes it."""
+    score = dict(zip(MELT_CATEGORIES, MELT_SCORES))
+    melt = pd.Series(classify_melt(df["z_score"])).map(score).to_numpy()
+    index = weights[0] * minmax_by_group(df, "z_score").to_numpy() + weights[-1] * melt
+    if len(weights) == 3:
+        index += weights[1] * minmax_by_group(df, "peak_z_score").to_numpy()
+    return index
+
+
+def _bounds(df, col):
+    grouped = df.groupby("basin", sort=False)[col]
+    return grouped.transform("min").to_numpy(), grouped.transform("max").to_numpy()
+
+
+def _simulate(df, weights, with_peak):
+    # No noise and near-fixed weights: every draw is the deterministic index
+    return flood_uncertainty.simulate(
+        df["z_score"].to_numpy(),
+        _bounds(df, "z_score"),
+        MELT_SCORES,
+        weights,
+        peak_z=df["peak_z_score"].to_numpy() if with_peak else None,
+        peak_bounds=_bounds(df, "peak_z_score") if with_peak else None,
+        n_draws=200,
+        z_sd=0.0,
+        boundary_sd=0.0,
+        weight_concentration=1e9,
+    )
+
+
+def test_monte_carlo_mean_matches_deterministic_index():
+    df = _frame()
+    for weights, with_peak in [([0.6, 0.4], False), ([0.4, 0.3, 0.3], True)]:
+        mc = _simulate(df, weights, with_peak)
+        assert np.isfinite(mc["index_mean"]).all()
+        np.testing.assert_allclose(mc["index_mean"], _deterministic(df, weights), atol=1e-6)
+
+
+def test_missing_z_score_counts_as_normal_melt():
+    df = _frame()
+    mc = _simulate(df, [0.6, 0.4], False)
+    # runoff_norm 0, Normal melt (0.4): index 0.16, always Low Risk
+    missing = df["z_score"].isna().to_numpy()
+    np.testing.assert_allclose(mc["index_mean"][missing], 0.4 * 0.4, atol=1e-6)
+    assert (mc["probability"][missing, 0] == 1.0).all()
+
+
+def test_probabilities_sum_to_one():
+    mc = flood_uncertainty.simulate(
+        [0.5, np.nan, 2.0], ([-1, -1, -1], [3, 3, 3]), MELT_SCORES, [0.6, 0.4], n_draws=5000, seed=1,
+    )
+    np.testing.assert_allclose(mc["probability"].sum(axis=1), 1.0)
@@ -0,0 +1,22 @@
+import pytest
+
+from backend.serving.predictor import MeltPredictor, PredictError
+
+
+@pytest.mark.parametrize("value", [float("nan"), "nan", "inf", "-inf", float("inf")])
+def test_non_finite_delta_is_rejected(value):
+    payload = {"glacier_id": "RGI2000-v7.0-G-14-00001", "deltas": {"temp_mean": value}}
+    with pytest.raises(PredictError, match="finite"):
+        MeltPredictor._parse(payload)
+
+
+def test_non_numeric_delta_is_rejected():
+    payload = {"glacier_id": "RGI2000-v7.0-G-14-00001", "deltas": {"temp_mean": "warm"}}
+    with pytest.raises(PredictError, match="not a number"):
+        MeltPredictor._parse(payload)
+
+
+def test_finite_deltas_are_parsed():
+    ids, deltas = MeltPredictor._parse({"glacier_ids": ["a", "b"], "deltas": {"prec_mean": "-0.5"}})
+    assert ids == ["a", "b"]
+    assert deltas[:, 2].tolist() == [-0.5, -0.5]